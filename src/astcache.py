@@ -0,0 +1,160 @@
+"""Module providing an on-disk cache of parsed programs.
+
+Like ``__pycache__``, the AST of ``dir/name.mi`` is stored in
+``dir/__miracache__/name.mi.ast`` unless another cache directory is given.
+An entry starts with a key hashed from the source bytes, the cache format,
+``parse.GRAMMAR_VERSION`` and the Python version, followed by one pickle
+per top level statement. An entry is only used when its key matches the
+current source and versions. Otherwise, or if it cannot be read, the
+source is parsed again and the entry rewritten. Entries are written to a
+temporary file and moved into place once the whole program has parsed, so
+a failed parse never leaves a partial entry behind. A program that stops
+running early is still parsed to the end, to complete its entry.
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+from typing import BinaryIO, Iterable, Iterator
+
+import pyparsing as pp
+
+import parse
+from astnode import AstNode, gc_paused
+
+CACHE_DIR_NAME = "__miracache__"
+# Bump whenever the layout of cache entries changes.
+FORMAT_VERSION = 1
+_MAGIC = b"MIRAAST\n"
+# Parser backends ``run.py`` uses the cache with unless told otherwise. The
+# fast parser takes about as long to parse a program as loading it does.
+CACHED_BY_DEFAULT = ("pyparsing",)
+
+
+def cache_key(source: bytes) -> bytes:
+    """Return the key of the AST of the given source in this interpreter."""
+    versions = (
+        f"{FORMAT_VERSION}:{parse.GRAMMAR_VERSION}:{sys.implementation.cache_tag}"
+    )
+    return hashlib.sha256(versions.encode() + b"\n" + source).digest()
+
+
+def cache_path(filename: str, cache_dir: str | None = None) -> str:
+    """Return the path of the cache entry for the given source file."""
+    name = os.path.basename(filename) + ".ast"
+    if cache_dir is None:
+        return os.path.join(os.path.dirname(filename), CACHE_DIR_NAME, name)
+
+    # Sources with the same name in different directories share cache_dir.
+    digest = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{digest}-{name}")
+
+
+def _load_statements(entry: BinaryIO) -> Iterator[AstNode]:
+    with entry:
+        while True:
+            try:
+                with gc_paused():
+                    statement = pickle.load(entry)
+            except EOFError:
+                return
+            yield statement
+
+
+def load(path: str, key: bytes) -> Iterator[AstNode] | None:
+    """Return the statements of a cache entry, or None if it is not valid."""
+    try:
+        entry = open(path, "rb")
+    except OSError:
+        return None
+
+    try:
+        header = entry.read(len(_MAGIC) + len(key))
+    except OSError:
+        header = b""
+    if header != _MAGIC + key:
+        entry.close()
+        return None
+
+    return _load_statements(entry)
+
+
+def _store(statements: Iterable[AstNode], path: str, key: bytes) -> Iterator[AstNode]:
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        entry = tempfile.NamedTemporaryFile(
+            "wb", dir=os.path.dirname(path) or ".", suffix=".tmp", delete=False
+        )
+    except OSError:
+        # The cache is best effort, e.g. the directory may be read-only.
+        yield from statements
+        return
+
+    try:
+        with entry:
+            try:
+                entry.write(_MAGIC + key)
+                writing = True
+            except OSError:
+                writing = False
+            # Set once the consumer stops reading, e.g. as running the program
+            # failed, after which the rest is parsed to complete the entry.
+            stopped = False
+            try:
+                for statement in statements:
+                    # Store before yielding, as the executor mutates the nodes.
+                    if writing:
+                        try:
+                            pickle.dump(statement, entry, pickle.HIGHEST_PROTOCOL)
+                        except (OSError, RecursionError):
+                            # Such as a statement nested too deeply to pickle.
+                            writing = False
+                    if not stopped:
+                        try:
+                            yield statement
+                        except GeneratorExit:
+                            stopped = True
+            except pp.ParseBaseException:
+                if not stopped:
+                    raise
+                # Nobody is left to report the error, so just skip the entry.
+                writing = False
+
+        if writing:
+            os.replace(entry.name, path)
+    finally:
+        if os.path.exists(entry.name):
+            os.remove(entry.name)
+
+
+def parse_cached(
+    parser: parse.Parser,
+    filename: str,
+    cache_dir: str | None = None,
+    processes: int = 1,
+) -> Iterator[AstNode]:
+    """Yield the top level statements of a source file, using the cache.
+
+    Statements are yielded one at a time both when parsing and when loading
+    a cache entry, as with ``parse.Parser.parse_stream``. With more than
+    one process, a source that is not cached is parsed with
+    ``parse.Parser.parse_parallel`` instead.
+    """
+    with open(filename, "rb") as f:
+        source = f.read()
+
+    key = cache_key(source)
+    path = cache_path(filename, cache_dir)
+    statements = load(path, key)
+    if statements is None:
+        lines = io.StringIO(source.decode("utf-8"), newline=None)
+        if processes > 1:
+            parsed = parser.parse_parallel(lines.read(), processes)
+        else:
+            parsed = parser.parse_stream(lines)
+        statements = _store(parsed, path, key)
+
+    yield from statements
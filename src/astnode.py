@@ -0,0 +1,140 @@
+"""Module providing the node class of the abstract syntax tree."""
+
+import contextlib
+import gc
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+FIELDS = ("col", "children", "type", "line", "start", "end")
+
+
+@contextlib.contextmanager
+def gc_paused() -> Iterator[None]:
+    """Disable the cyclic garbage collector while building large trees.
+
+    Trees are acyclic, so the collection passes triggered by allocating
+    many nodes only repeatedly rescan the growing tree to free nothing.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class AstNode(Mapping):
+    """A node of the abstract syntax tree.
+
+    ``children`` is the source text of leaf nodes (int, num, ident and
+    newline) and a list of nodes and punctuation strings otherwise. Nodes
+    are also mappings from the names in ``FIELDS`` to their values, and
+    support item assignment, so code written against the former dict nodes
+    keeps working. ``as_dict`` converts a whole tree to plain dicts.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        node_type: str,
+        children: Any,
+        line: int,
+        col: int,
+        start: int,
+        end: int,
+    ):
+        self.type = node_type
+        self.children = children
+        self.line = line
+        self.col = col
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def from_dict(cls, node: Mapping[str, Any]) -> "AstNode":
+        """Build a tree of nodes from a tree of dicts."""
+        children = node["children"]
+        if isinstance(children, Mapping):
+            children = cls.from_dict(children)
+        elif isinstance(children, list):
+            children = [
+                cls.from_dict(child) if isinstance(child, Mapping) else child
+                for child in children
+            ]
+        return cls(
+            node["type"],
+            children,
+            node["line"],
+            node["col"],
+            node["start"],
+            node["end"],
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Convert the tree below this node to plain dicts and lists."""
+        children = self.children
+        if isinstance(children, AstNode):
+            children = children.as_dict()
+        elif isinstance(children, list):
+            children = [
+                child.as_dict() if isinstance(child, AstNode) else child
+                for child in children
+            ]
+        return {
+            "col": self.col,
+            "children": children,
+            "type": self.type,
+            "line": self.line,
+            "start": self.start,
+            "end": self.end,
+        }
+
+    def __reduce__(self):
+        # Pickle as constructor arguments, which is far more compact and
+        # faster to load than the generic encoding of slotted objects.
+        return (
+            AstNode,
+            (self.type, self.children, self.line, self.col, self.start, self.end),
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, AstNode):
+            return (
+                self.type == other.type
+                and self.start == other.start
+                and self.end == other.end
+                and self.line == other.line
+                and self.col == other.col
+                and self.children == other.children
+            )
+        if isinstance(other, Mapping):
+            return other.keys() == set(FIELDS) and all(
+                getattr(self, key) == other[key] for key in FIELDS
+            )
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return (
+            f"AstNode({self.type!r}, {self.children!r}, line={self.line}, "
+            + f"col={self.col}, start={self.start}, end={self.end})"
+        )
@@ -0,0 +1,255 @@
+"""Module evaluating callables over whole NumPy arrays at once.
+
+Bytecode compiled by ``vm`` runs once with arrays for values, falling back
+to one call per element where NumPy would not give the results of mira.
+Only this module needs NumPy.
+"""
+
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+
+import execute
+import vm
+
+# Integers up to this size are exact both as int64 and float64.
+MAX_EXACT_INT = 2**53
+
+
+class Unvectorizable(Exception):
+    """Raised when a call cannot be evaluated over whole arrays."""
+
+
+def as_array(name: str, value: Any) -> np.ndarray:
+    """Return an argument as an ``int64`` or ``float64`` array."""
+    array = np.asarray(value)
+    if array.dtype.kind in "iu":
+        if array.size and np.abs(array.astype(np.float64)).max() > MAX_EXACT_INT:
+            raise Unvectorizable(f"Argument {name} has values too large")
+        return array.astype(np.int64)
+    if array.dtype.kind == "f":
+        return array.astype(np.float64)
+    raise TypeError(f"Argument {name} is not an array of numbers: {array.dtype}\n")
+
+
+def is_int(value: np.ndarray) -> bool:
+    return value.dtype.kind == "i"
+
+
+def _check_ints(estimate: np.ndarray):
+    if np.any(np.abs(estimate) > MAX_EXACT_INT):
+        raise Unvectorizable("int result too large")
+
+
+def _check_nums(result: np.ndarray, *operands: np.ndarray):
+    # NumPy gives inf or nan where mira raises, so any new ones are failures.
+    finite = np.isfinite(result)
+    if not np.all(finite):
+        for operand in operands:
+            finite |= ~np.isfinite(operand)
+        if not np.all(finite):
+            raise Unvectorizable("num operation raises")
+
+
+def binary(op: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Apply an arithmetic opcode as ``Int`` and ``Num`` would."""
+    ints = is_int(left) and is_int(right)
+    if op in (vm.ADD, vm.SUB, vm.MUL):
+        ufunc = {vm.ADD: np.add, vm.SUB: np.subtract, vm.MUL: np.multiply}[op]
+        if ints:
+            _check_ints(ufunc(left.astype(np.float64), right))
+        return ufunc(left, right)
+
+    if op == vm.DIV:
+        if np.any(right == 0):
+            raise Unvectorizable("division by zero")
+        result = np.true_divide(left, right)
+        if ints:
+            return np.trunc(result).astype(np.int64)
+        _check_nums(result, left, right)
+        return result
+
+    if op == vm.EXP:
+        if ints:
+            negative = right < 0
+            if np.any(negative & (left == 0)):
+                raise Unvectorizable("zero to a negative power")
+            estimate = np.power(left.astype(np.float64), right)
+            _check_ints(estimate)
+            # Negative powers of ints are floats, truncated back to ints.
+            exact = np.power(left, np.where(negative, 0, right))
+            return np.where(negative, np.trunc(estimate), exact).astype(np.int64)
+        result = np.power(left.astype(np.float64), right)
+        _check_nums(result, left, right)
+        return result
+
+    raise Unvectorizable(f"Opcode {vm.OPNAMES[op]} cannot be vectorized")
+
+
+def convert(return_type: type, value: np.ndarray) -> np.ndarray:
+    """Convert a result to a return type, like ``Callable.call``."""
+    if return_type is execute.Num:
+        return value.astype(np.float64)
+    if is_int(value):
+        return value
+    if not np.all(np.isfinite(value)):
+        raise Unvectorizable("num result cannot be an int")
+    result = np.trunc(value)
+    _check_ints(result)
+    return result.astype(np.int64)
+
+
+class Vectorizer:
+    """Runs the bytecode of callables over arrays.
+
+    Variables not bound by a call are read from ``globals``, and callables
+    from ``callables``, which may hold ``execute.Callable`` or
+    ``vm.Function`` objects. The former are compiled when first called.
+    """
+
+    def __init__(
+        self,
+        globals_: Mapping[str, execute.Val],
+        callables: Mapping[str, Any],
+    ):
+        self.globals = globals_
+        self.callables = callables
+        self.functions: dict[int, vm.Function] = {}
+
+    def function(self, callable_: Any) -> vm.Function:
+        if isinstance(callable_, vm.Function):
+            return callable_
+        function = self.functions.get(id(callable_))
+        if function is None:
+            body = vm.Compiler(vm.Variables(), vm.Slots())
+            body.value(callable_.definition)
+            body.emit(vm.RETURN)
+            function = vm.Function(
+                callable_.name, callable_.type, body.code(), callable_.definition
+            )
+            self.functions[id(callable_)] = function
+        return function
+
+    def load(self, name: str, frame: dict[str, np.ndarray]) -> np.ndarray:
+        value = frame.get(name)
+        if value is not None:
+            return value
+        global_value = self.globals.get(name)
+        if global_value is None:
+            raise Unvectorizable(f"Variable {name} is not defined")
+        return self.constant(global_value.value)
+
+    @staticmethod
+    def constant(value: int | float) -> np.ndarray:
+        if type(value) is int:
+            if abs(value) > MAX_EXACT_INT:
+                raise Unvectorizable("int constant too large")
+            return np.asarray(value, dtype=np.int64)
+        return np.asarray(value, dtype=np.float64)
+
+    def call(
+        self,
+        callable_: Any,
+        args: dict[str, np.ndarray],
+        frame: dict[str, np.ndarray],
+        calling: tuple[str, ...] = (),
+    ) -> np.ndarray:
+        """Evaluate a call with array arguments and return the result.
+
+        ``calling`` holds the names of the callables being called, as
+        recursion never ends without conditionals and so always fails.
+        """
+        if set(args) != set(callable_.type.params):
+            raise Unvectorizable(f"Invalid arguments for {callable_.name}")
+        if callable_.name in calling:
+            raise Unvectorizable(f"Recursive call to {callable_.name}")
+        calling += (callable_.name,)
+
+        frame = {**frame, **args}
+        code = self.function(callable_).code
+        stack: list[Any] = [None] * code.temps
+        for op, arg in zip(code.ops, code.args):
+            if op == vm.LOAD_NAME:
+                stack.append(self.load(code.names[arg], frame))
+            elif op == vm.LOAD_CONST:
+                stack.append(self.constant(code.consts[arg]))
+            elif op in (vm.ADD, vm.SUB, vm.MUL, vm.DIV, vm.EXP):
+                right = stack.pop()
+                stack[-1] = binary(op, stack[-1], right)
+            elif op == vm.LOAD_TEMP:
+                stack.append(stack[arg])
+            elif op == vm.STORE_TEMP:
+                stack[arg] = stack[-1]
+            elif op == vm.LOAD_CALLABLE:
+                callee = self.callables.get(code.callable_names[arg])
+                if callee is None:
+                    raise Unvectorizable(f"Callable {code.callable_names[arg]}")
+                stack.append(callee)
+            elif op == vm.CALL:
+                arg_names = code.consts[arg][0]
+                values = stack[len(stack) - len(arg_names) :]
+                del stack[len(stack) - len(arg_names) :]
+                callee = stack.pop()
+                stack.append(
+                    self.call(callee, dict(zip(arg_names, values)), frame, calling)
+                )
+            elif op == vm.RETURN:
+                return convert(callable_.type.return_type, stack.pop())
+            else:
+                raise Unvectorizable(f"Opcode {vm.OPNAMES[op]} cannot be vectorized")
+        raise Unvectorizable("Missing return")
+
+
+def call_each(
+    executor: "execute.Executor", name: str, arrays: dict[str, np.ndarray]
+) -> np.ndarray:
+    """Call a callable once per element of the broadcast arguments."""
+    if arrays:
+        broadcast = np.broadcast_arrays(*arrays.values())
+        shape = broadcast[0].shape
+        rows = zip(*(array.ravel().tolist() for array in broadcast))
+    else:
+        shape = ()
+        rows = iter([()])
+
+    results = []
+    for row in rows:
+        params = {
+            arg_name: execute.Int(value) if type(value) is int else execute.Num(value)
+            for arg_name, value in zip(arrays, row)
+        }
+        results.append(executor.call(name, params).value)
+
+    return_type = executor.callables[name].type.return_type
+    try:
+        result = np.array(
+            results, dtype=np.int64 if return_type is execute.Int else np.float64
+        )
+    except OverflowError:
+        # Ints beyond int64 are kept as Python ints.
+        result = np.array(results, dtype=object)
+    return result.reshape(shape)
+
+
+def call_batch(executor: "execute.Executor", name: str, **arrays: Any) -> np.ndarray:
+    """Evaluate a callable over arrays of arguments, see ``Executor.call_batch``."""
+    callable_ = executor.callables.get(name)
+    if callable_ is None:
+        raise SyntaxError(f"Callable {name} has not yet been defined.\n")
+
+    try:
+        args = {
+            arg_name: as_array(arg_name, value) for arg_name, value in arrays.items()
+        }
+        shape = np.broadcast_shapes(*(array.shape for array in args.values()))
+        vectorizer = Vectorizer(executor.globals, executor.callables)
+        with np.errstate(all="ignore"):
+            result = vectorizer.call(callable_, args, {})
+        return np.broadcast_to(result, shape).copy()
+    except Unvectorizable:
+        return call_each(
+            executor,
+            name,
+            {arg_name: np.asarray(value) for arg_name, value in arrays.items()},
+        )
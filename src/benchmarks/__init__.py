@@ -0,0 +1,5 @@
+"""Benchmarks for the parser and interpreter.
+
+Run a benchmark from the ``src`` directory, e.g.
+``python -m benchmarks.bench_parse``.
+"""
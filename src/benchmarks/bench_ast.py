@@ -0,0 +1,35 @@
+"""Measure the build time and memory footprint of the AST."""
+
+import tracemalloc
+
+import parse
+from benchmarks.common import best_of, generate_program
+
+
+def ast_memory(parser: parse.Parser, source: str) -> int:
+    """Return the bytes still allocated by the AST after parsing."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ast = parser.parse(source)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del ast
+    return after - before
+
+
+def main():
+    statements = 2000
+    source = generate_program(statements)
+    for backend in parse.BACKENDS:
+        parser = parse.Parser(backend=backend)
+        build = best_of(lambda: parser.parse(source), repeat=3)
+        memory = ast_memory(parser, source)
+        print(
+            f"{backend:>9}: build {build * 1000:9.2f} ms, "
+            + f"AST {memory / 2**20:7.2f} MiB "
+            + f"({memory / statements:7.0f} bytes per statement)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare cold and warm starts with the on-disk AST cache."""
+
+import os
+import shutil
+import tempfile
+
+import astcache
+import parse
+from benchmarks.common import best_of, generate_program
+
+
+def main():
+    statements = 2000
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "prog.mi")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(generate_program(statements))
+        cache_dir = os.path.join(directory, astcache.CACHE_DIR_NAME)
+
+        for backend in parse.BACKENDS:
+            parser = parse.Parser(backend=backend)
+
+            def plain():
+                with open(filename, encoding="utf-8") as f:
+                    for _ in parser.parse_stream(f):
+                        pass
+
+            def cold():
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                list(astcache.parse_cached(parser, filename))
+
+            def warm():
+                list(astcache.parse_cached(parser, filename))
+
+            uncached = best_of(plain, repeat=3)
+            cold_time = best_of(cold, repeat=3)
+            warm_time = best_of(warm, repeat=3)
+            print(
+                f"{backend:>9}: no cache {uncached * 1000:9.2f} ms, "
+                + f"cold {cold_time * 1000:9.2f} ms, "
+                + f"warm {warm_time * 1000:9.2f} ms "
+                + f"({uncached / warm_time:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
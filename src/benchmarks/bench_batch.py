@@ -0,0 +1,34 @@
+"""Compare calling a callable per element with one batch over arrays."""
+
+import numpy as np
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+DEFINITION = "f: num(a: int, b: num) = (a * b + 3) ^ 2 / (a + 1) - a / 2\n"
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    size = 10000
+    a = np.arange(size)
+    b = np.linspace(0.0, 1.0, size)
+    for backend in execute.BACKENDS:
+        executor = execute.Executor(backend=backend)
+        executor.exec(parser.parse(DEFINITION))
+
+        def each():
+            for x, y in zip(a.tolist(), b.tolist()):
+                executor.call("f", {"a": execute.Int(x), "b": execute.Num(y)})
+
+        def batched():
+            executor.call_batch("f", a=a, b=b)
+
+        for label, func in (("each", each), ("batch", batched)):
+            secs = best_of(func, repeat=3)
+            print(f"{backend:>4} {label:>5}: {secs / size * 1e9:9.1f} ns per element")
+
+
+if __name__ == "__main__":
+    main()
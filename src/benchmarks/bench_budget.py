@@ -0,0 +1,56 @@
+"""Measure the cost of execution limits, and how soon they stop a script."""
+
+import copy
+import time
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+f: int(a: int, b: int) = a * b + (a - b) ^ 2
+"""
+STATEMENT = "x = f(a=x, b=2) / f(a=2, b=x) + x * 2 - x\n"
+# Each callable calls the one before twice, about 2^30 calls in all.
+DOUBLING = "g0: int(a: int) = a + 1\n" + "".join(
+    f"g{ii}: int(a: int) = g{ii - 1}(a=a) + g{ii - 1}(a=a)\n" for ii in range(1, 31)
+)
+PATHOLOGICAL = {
+    "powers": ("y: = 99\n" + "y = y ^ y\n" * 3, {"max_int_bits": 1_000_000}),
+    "calls, steps": ("g30(a=1)\n", {"max_steps": 1_000_000}),
+    "calls, time": ("g30(a=1)\n", {"max_seconds": 0.5}),
+}
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    statements = 200
+    program = parser.parse(STATEMENT * statements)
+    for backend in ("tree", "vm"):
+        for limits in ({}, {"max_steps": 10**9, "max_int_bits": 10**6}):
+            executor = execute.Executor(backend=backend)
+            executor.exec(parser.parse(SETUP))
+            # Nodes are built from the tree in place, so each run gets a copy.
+            copies = iter([copy.deepcopy(program) for _ in range(7)])
+            secs = best_of(lambda: executor.exec(next(copies), **limits), repeat=7)
+            label = "limits" if limits else "none"
+            print(
+                f"{backend:>4} {label:>6}: {secs / statements * 1e6:7.2f} us "
+                + "per statement"
+            )
+
+    for backend in execute.BACKENDS:
+        executor = execute.Executor(backend=backend)
+        executor.exec(parser.parse(DOUBLING))
+        for name, (source, limits) in PATHOLOGICAL.items():
+            start = time.perf_counter()
+            try:
+                executor.exec(parser.parse(source), **limits)
+            except execute.LimitExceeded:
+                pass
+            secs = time.perf_counter() - start
+            print(f"{backend:>6} {name:>12}: stopped after {secs * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
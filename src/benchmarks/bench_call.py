@@ -0,0 +1,30 @@
+"""Measure the cost of a call as the number of globals grows."""
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+DEFINITION = "f: num(a: int, b: int) = 1. * a / b + 2 * a\n"
+CALL = "f(a=3, b=2)\n"
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    calls = 200
+    for globals_count in (0, 1000, 5000):
+        executor = execute.Executor(backend="tree")
+        source = "".join(f"g{ii}: = {ii}\n" for ii in range(globals_count))
+        executor.exec(parser.parse(source + DEFINITION))
+        (node,) = parser.parse(CALL)[:1]
+        statement = execute.Node.new_node(node, executor.scope, executor.callables)
+
+        def evaluate():
+            for _ in range(calls):
+                statement.exec()
+
+        secs = best_of(evaluate, repeat=7)
+        print(f"{globals_count:>5} globals: {secs / calls * 1e6:9.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
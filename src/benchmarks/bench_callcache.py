@@ -0,0 +1,50 @@
+"""Compare calls with and without caching their results."""
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+DEFINITIONS = (
+    "k: = 3\n"
+    "g: num(a: int) = (a + k) ^ 2 / (a * a * 1.5 + k) - a * (k - 1) / 7\n"
+    "f: num(a: int, b: int) = g(a=a) * g(a=b) + g(a=a + b) - g(a=a - b)\n"
+)
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    calls = 200
+    for backend in execute.BACKENDS:
+        for cached in (False, True):
+            executor = execute.Executor(backend=backend)
+            if cached:
+                executor.cache_calls("f")
+                executor.cache_calls("g")
+            executor.exec(parser.parse(DEFINITIONS))
+            # A few distinct arguments, called over and over.
+            source = "".join(f"f(a={ii % 5}, b={ii % 3})\n" for ii in range(calls))
+            statements = [
+                execute.Node.new_node(node, executor.scope, executor.callables)
+                for node in parser.parse(source)
+                if node.type != "newline"
+            ]
+            if backend == "vm":
+                codes = [executor.vm.compile(statement) for statement in statements]
+
+                def evaluate():
+                    for code in codes:
+                        executor.vm.run(code)
+
+            else:
+
+                def evaluate():
+                    for statement in statements:
+                        statement.exec()
+
+            secs = best_of(evaluate, repeat=7)
+            label = "cached" if cached else "uncached"
+            print(f"{backend:>4} {label:>8}: {secs / calls * 1e6:9.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
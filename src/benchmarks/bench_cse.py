@@ -0,0 +1,57 @@
+"""Measure statements repeating subexpressions, with and without elimination."""
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+y: num = 2.5
+dist: num(a: num, b: num) = (a * a + b * b) ^ 0.5
+"""
+STATEMENT = (
+    "y = (x * y + 1) * (x * y + 1) + dist(a=x * y + 1, b=y) / dist(a=x * y + 1, b=y)\n"
+)
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    evaluations = 1000
+    for backend in execute.BACKENDS:
+        for cse in (False, True):
+            executor = execute.Executor(backend=backend, cse=cse)
+            statements = [
+                node
+                for node in parser.parse(SETUP + STATEMENT)
+                if node.type != "newline"
+            ]
+            executor.exec(statements[:-1])
+            statement = execute.Node.new_node(
+                statements[-1], executor.scope, executor.callables
+            )
+            if executor.eliminator is not None:
+                executor.eliminator.eliminate(statement)
+            if executor.vm is not None:
+                code = executor.vm.compile(statement)
+                evaluate_once = lambda: executor.vm.run(code)
+            elif executor.python is not None:
+                source = executor.python.statement(statement)
+                code = compile(source, "<mira>", "exec")
+                evaluate_once = lambda: exec(code, executor.python.namespace)
+            else:
+                evaluate_once = statement.exec
+
+            def evaluate():
+                for _ in range(evaluations):
+                    evaluate_once()
+
+            secs = best_of(evaluate, repeat=7)
+            removed = 0 if executor.eliminator is None else executor.eliminator.removed
+            print(
+                f"{backend:>6} {'cse' if cse else 'as is':>5}: "
+                + f"{secs / evaluations * 1e6:7.2f} us per evaluation, "
+                + f"{removed} nodes removed"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Measure the cost of evaluating statements and calls repeatedly."""
+
+from typing import Any, Callable
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+y: num = 2.5
+z: = 0
+w: num = 0
+f: num(a: int, b: int) = 1. * a / b + (3 + 3) ^ 2 - x * y
+"""
+
+CASES = {
+    "expression": "z = x * 2 / 3 + (x - 1) * (x + 1) - 2 ^ 3 + x / 7\n",
+    "call": "w = f(a=x, b=2) + f(a=2, b=x)\n",
+}
+
+
+def evaluator(backend: str, statement: str) -> Callable[[], Any]:
+    """Return a function evaluating an already built statement once."""
+    executor = execute.Executor(backend=backend)
+    parser = parse.Parser(backend="fast")
+    executor.exec(parser.parse(SETUP))
+    (node,) = parser.parse(statement)[:1]
+    compiled = execute.Node.new_node(node, executor.scope, executor.callables)
+    if executor.vm is not None:
+        code = executor.vm.compile(compiled)
+        return lambda: executor.vm.run(code)
+    if executor.python is not None:
+        source = executor.python.statement(compiled)
+        code = compile(source, "<mira>", "exec")
+        return lambda: exec(code, executor.python.namespace)
+    return compiled.exec
+
+
+def main():
+    evaluations = 1000
+    for name, statement in CASES.items():
+        for backend in execute.BACKENDS:
+            evaluate_once = evaluator(backend, statement)
+
+            def evaluate():
+                for _ in range(evaluations):
+                    evaluate_once()
+
+            secs = best_of(evaluate, repeat=7)
+            print(
+                f"{name:>10} {backend:>6}: {secs / evaluations * 1e6:8.2f} us "
+                + "per evaluation"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure statements calling small callables, inlined or not."""
+
+import execute
+import optimize
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+y: num = 2.5
+func: num(a: int, b: int) = 1. * a / b
+sq: int(a: int) = a * a
+"""
+STATEMENT = "y = func(a=x, b=2) + func(a=7, b=x) * sq(a=x)\n"
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    evaluations = 1000
+    for backend in execute.BACKENDS:
+        for inline in (False, True):
+            executor = execute.Executor(backend=backend)
+            inliner = optimize.Inliner()
+            folder = optimize.ConstantFolder()
+            statements = parser.parse(SETUP + STATEMENT)
+            if inline:
+                statements = folder.fold_all(inliner.inline_all(statements))
+            statements = [node for node in statements if node.type != "newline"]
+            executor.exec(statements[:-1])
+            statement = execute.Node.new_node(
+                statements[-1], executor.scope, executor.callables
+            )
+            if executor.vm is not None:
+                code = executor.vm.compile(statement)
+                evaluate_once = lambda: executor.vm.run(code)
+            elif executor.python is not None:
+                source = executor.python.statement(statement)
+                code = compile(source, "<mira>", "exec")
+                evaluate_once = lambda: exec(code, executor.python.namespace)
+            else:
+                evaluate_once = statement.exec
+
+            def evaluate():
+                for _ in range(evaluations):
+                    evaluate_once()
+
+            secs = best_of(evaluate, repeat=7)
+            print(
+                f"{backend:>6} {'inlined' if inline else 'as is':>7}: "
+                + f"{secs / evaluations * 1e6:7.2f} us per evaluation, "
+                + f"{inliner.inlined} calls inlined"
+            )
+
+
+if __name__ == "__main__":
+    main()
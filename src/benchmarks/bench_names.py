@@ -0,0 +1,40 @@
+"""Measure name lookups and parameter binding in the vm backend."""
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+SETUP = "".join(f"g{ii}: = {ii}\n" for ii in range(50)) + (
+    "x: = 2\n"
+    "h: int(c: int, d: int, e: int) = a + c\n"
+    "g: int(b: int, d: int) = h(c=b, d=d, e=x)\n"
+    "f: int(a: int, d: int) = g(b=a, d=d)\n"
+)
+
+CASES = {
+    "lookup": "x\n",
+    "nested calls": "f(a=1, d=x)\n",
+}
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    evaluations = 2000
+    for name, statement in CASES.items():
+        executor = execute.Executor(backend="vm")
+        executor.exec(parser.parse(SETUP))
+        (node,) = parser.parse(statement)[:1]
+        code = executor.vm.compile(
+            execute.Node.new_node(node, executor.scope, executor.callables)
+        )
+
+        def evaluate():
+            for _ in range(evaluations):
+                executor.vm.run(code)
+
+        secs = best_of(evaluate, repeat=30)
+        print(f"{name:>12}: {secs / evaluations * 1e6:8.2f} us per evaluation")
+
+
+if __name__ == "__main__":
+    main()
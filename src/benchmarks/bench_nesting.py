@@ -0,0 +1,28 @@
+"""Measure expressions nested deeper and deeper, run by the tree interpreter."""
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    evaluations = 20
+    for depth in (10, 100, 1000, 10000):
+        source = "(" * depth + "x * 2" + ") + 1" * depth + "\n"
+        (node,) = parser.parse(source)[:1]
+        statement = execute.Node.new_node(node, {"x": execute.Int(3)}, {})
+
+        def evaluate():
+            for _ in range(evaluations):
+                statement.exec()
+
+        secs = best_of(evaluate, repeat=7)
+        print(
+            f"depth {depth:>5}: {secs / evaluations * 1e6:10.2f} us per evaluation, "
+            + f"{secs / evaluations / depth * 1e9:6.1f} ns per level"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure calls to a callable with literal subexpressions, folded or not."""
+
+import execute
+import optimize
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+y: num = 2.5
+f: num(a: int, b: int) = 1. * a / b + (3 + 3) ^ 2 - x * y * (2 * 4 - 1) * 1
+"""
+CALL = "f(a=x, b=2)\n"
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    calls = 1000
+    for backend in execute.BACKENDS:
+        for fold in (False, True):
+            executor = execute.Executor(backend=backend)
+            folder = optimize.ConstantFolder()
+            statements = parser.parse(SETUP)
+            if fold:
+                statements = folder.fold_all(statements)
+            executor.exec(statements)
+            (node,) = parser.parse(CALL)[:1]
+            statement = execute.Node.new_node(node, executor.scope, executor.callables)
+            if executor.vm is None:
+                call = statement.exec
+            else:
+                code = executor.vm.compile(statement)
+                call = lambda: executor.vm.run(code)
+
+            def evaluate():
+                for _ in range(calls):
+                    call()
+
+            secs = best_of(evaluate, repeat=7)
+            print(
+                f"{backend:>4} {'folded' if fold else 'as is':>6}: "
+                + f"{secs / calls * 1e6:7.2f} us per call, "
+                + f"{folder.removed} nodes removed"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Compare serial and parallel parsing of a large program."""
+
+import os
+
+import parse
+from benchmarks.common import best_of, generate_program
+
+
+def main():
+    source = generate_program(5000)
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"{os.cpu_count()} cores")
+    for backend in parse.BACKENDS:
+        parser = parse.Parser(backend=backend)
+        serial = best_of(lambda: parser.parse(source), repeat=3)
+        timings = {
+            processes: best_of(
+                lambda: parser.parse_parallel(source, processes), repeat=3
+            )
+            for processes in counts
+        }
+        print(
+            f"{backend:>9}: serial {serial * 1000:9.2f} ms, "
+            + ", ".join(
+                f"{processes} processes {secs * 1000:9.2f} ms"
+                for processes, secs in timings.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
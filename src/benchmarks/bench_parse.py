@@ -0,0 +1,25 @@
+"""Compare parse time of the parser backends on a large synthetic program."""
+
+import parse
+from benchmarks.common import best_of, generate_program
+
+
+def main():
+    for statements in (100, 1000, 10000):
+        source = generate_program(statements)
+        timings = {}
+        for backend in parse.BACKENDS:
+            parser = parse.Parser(backend=backend)
+            timings[backend] = best_of(lambda: parser.parse(source), repeat=3)
+
+        print(
+            f"{statements:>6} statements: "
+            + ", ".join(
+                f"{name} {secs * 1000:9.2f} ms" for name, secs in timings.items()
+            )
+            + f", speedup {timings['pyparsing'] / timings['fast']:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
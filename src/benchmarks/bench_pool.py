@@ -0,0 +1,54 @@
+"""Compare a pool of workers with a process per program for small programs."""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import parse
+import pool
+from benchmarks.common import generate_program
+
+
+def main():
+    programs = [generate_program(20 + ii % 10) for ii in range(200)]
+    for parser in parse.BACKENDS:
+        with tempfile.TemporaryDirectory() as directory:
+            filenames = []
+            for ii, program in enumerate(programs[:30]):
+                filename = os.path.join(directory, f"program{ii}.mira")
+                with open(filename, "w", encoding="utf-8") as f:
+                    f.write(program)
+                filenames.append(filename)
+
+            start = time.perf_counter()
+            for filename in filenames:
+                subprocess.run(
+                    [sys.executable, "run.py", filename, "--no-cache"]
+                    + ["--parser", parser],
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+            secs = time.perf_counter() - start
+            print(
+                f"{parser:>9} process per program: "
+                + f"{len(filenames) / secs:8.1f} programs/s"
+            )
+
+        for processes in sorted({1, 2, os.cpu_count() or 1}):
+            with pool.Pool(processes, parser=parser) as workers:
+                # The first programs also wait for the workers to start.
+                list(workers.run(programs[:processes]))
+                start = time.perf_counter()
+                results = list(workers.run(programs))
+                secs = time.perf_counter() - start
+            assert all(result.error is None for result in results)
+            print(
+                f"{parser:>9} pool of {processes:>2} processes: "
+                + f"{len(programs) / secs:8.1f} programs/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Measure the cost of creating parsers and parsing small inputs."""
+
+import time
+
+import parse
+from benchmarks.common import best_of
+
+
+def main():
+    start = time.perf_counter()
+    parse.Parser(backend="pyparsing").parse("x = 1\n")
+    first = time.perf_counter() - start
+
+    create = best_of(lambda: parse.Parser(backend="pyparsing"), repeat=20)
+    small = best_of(
+        lambda: parse.Parser(backend="pyparsing").parse("x = 1 + 2\n"), repeat=20
+    )
+    print(
+        f"first parse {first * 1000:8.3f} ms, "
+        + f"new parser {create * 1000:8.3f} ms, "
+        + f"new parser and small parse {small * 1000:8.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare whole-file and streaming parsing of a large program."""
+
+import io
+import time
+import tracemalloc
+from typing import Any, Callable, Iterable
+
+import parse
+from benchmarks.common import generate_program
+
+
+def timings(func: Callable[[], Iterable[Any]]) -> tuple[float, float]:
+    """Return the seconds until the first and the last statement."""
+    start = time.perf_counter()
+    first = None
+    for _ in func():
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return first or total, total
+
+
+def peak_memory(func: Callable[[], Iterable[Any]]) -> int:
+    """Return the peak traced memory in bytes while consuming ``func``."""
+    tracemalloc.start()
+    for _ in func():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    source = generate_program(2000)
+    for backend in parse.BACKENDS:
+        parser = parse.Parser(backend=backend)
+        cases = {
+            "whole file": lambda: parser.parse(source),
+            "streaming": lambda: parser.parse_stream(io.StringIO(source)),
+        }
+        for name, func in cases.items():
+            first, total = timings(func)
+            peak = peak_memory(func)
+            print(
+                f"{backend:>9} {name:>10}: first statement {first * 1000:9.2f} ms, "
+                + f"total {total * 1000:9.2f} ms, peak {peak / 2**20:7.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure well typed statements, run checked or unchecked."""
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+y: num = 2.5
+n: = 0
+mean: num(a: num, b: num) = (a + b) / 2
+scale: int(a: int, b: int) = a * b / 4 + a ^ 2
+"""
+STATEMENT = "n = scale(a=x, b=x + 1) / 3 + x ^ 2 - mean(a=y, b=y / 2) * 2\n"
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    evaluations = 1000
+    for backend in execute.BACKENDS:
+        for unchecked in (False, True):
+            executor = execute.Executor(backend=backend, unchecked=unchecked)
+            statements = [
+                node
+                for node in parser.parse(SETUP + STATEMENT)
+                if node.type != "newline"
+            ]
+            executor.exec(statements[:-1])
+            statement = execute.Node.new_node(
+                statements[-1], executor.scope, executor.callables
+            )
+            if executor.checker is not None:
+                executor.checker.check(statement)
+            if executor.vm is not None:
+                code = executor.vm.compile(statement)
+                evaluate_once = lambda: executor.vm.run(code)
+            elif executor.python is not None:
+                source = executor.python.statement(statement)
+                code = compile(source, "<mira>", "exec")
+                evaluate_once = lambda: exec(code, executor.python.namespace)
+            else:
+                evaluate_once = statement.exec
+
+            def evaluate():
+                for _ in range(evaluations):
+                    evaluate_once()
+
+            secs = best_of(evaluate, repeat=7)
+            print(
+                f"{backend:>6} {'unchecked' if unchecked else 'checked':>9}: "
+                + f"{secs / evaluations * 1e6:7.2f} us per evaluation"
+            )
+
+
+if __name__ == "__main__":
+    main()
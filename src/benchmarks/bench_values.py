@@ -0,0 +1,38 @@
+"""Measure each arithmetic operator on each combination of value types."""
+
+import timeit
+
+import execute
+
+OPERATORS = ("add", "sub", "mul", "div", "exp")
+OPERANDS = {
+    "int": (execute.Int(7), execute.Int(3)),
+    "num": (execute.Num(7.5), execute.Num(1.5)),
+}
+
+
+def main():
+    repeat = 20000
+    print(f"{'':>10}" + "".join(f"{op:>9}" for op in OPERATORS))
+    for left_type, (left, _) in OPERANDS.items():
+        for right_type, (_, right) in OPERANDS.items():
+            timings = []
+            for op in OPERATORS:
+                method = getattr(left, op)
+                secs = min(
+                    timeit.repeat(lambda: method(right), number=repeat, repeat=7)
+                )
+                timings.append(secs / repeat * 1e9)
+            print(
+                f"{left_type + ' ' + right_type:>10}"
+                + "".join(f"{ns:7.0f}ns" for ns in timings)
+            )
+
+    secs = min(timeit.repeat(lambda: execute.Int(5), number=repeat, repeat=7))
+    print(f"{'Int(5)':>10}{secs / repeat * 1e9:7.0f}ns")
+    secs = min(timeit.repeat(lambda: execute.Num(5.0), number=repeat, repeat=7))
+    print(f"{'Num(5.)':>10}{secs / repeat * 1e9:7.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Measure a call-heavy program run by the tree interpreter."""
+
+import copy
+
+import execute
+import parse
+from benchmarks.common import best_of
+
+SETUP = """x: = 3
+y: num = 2.5
+sq: int(a: int) = a * a
+add: int(a: int, b: int) = a + b
+norm: num(a: int, b: num) = add(a=sq(a=a), b=sq(a=a)) + b * b
+"""
+STATEMENT = "y = norm(a=x, b=y) / norm(a=add(a=x, b=1), b=2.) + sq(a=add(a=x, b=x))\n"
+DEFINITIONS = 50
+
+
+def main():
+    parser = parse.Parser(backend="fast")
+    evaluations = 1000
+    executor = execute.Executor(backend="tree")
+    statements = [
+        node for node in parser.parse(SETUP + STATEMENT) if node.type != "newline"
+    ]
+    executor.exec(statements[:-1])
+    statement = execute.Node.new_node(
+        statements[-1], executor.scope, executor.callables
+    )
+
+    def evaluate():
+        for _ in range(evaluations):
+            statement.exec()
+
+    secs = best_of(evaluate, repeat=7)
+    print(f"statement:   {secs / evaluations * 1e6:7.2f} us per evaluation")
+
+    # Running a whole program includes building its nodes, checked once each.
+    # Nodes are built from the tree in place, so each run gets its own copy.
+    program = parser.parse(SETUP * DEFINITIONS + STATEMENT * DEFINITIONS)
+    copies = iter([copy.deepcopy(program) for _ in range(7)])
+    secs = best_of(
+        lambda: execute.Executor(backend="tree").exec(next(copies)), repeat=7
+    )
+    print(f"program:     {secs * 1e3:7.2f} ms per run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Helpers shared by the benchmarks."""
+
+import time
+from typing import Any, Callable
+
+
+def generate_program(statements: int) -> str:
+    """Generate a synthetic mira program with the given number of statements."""
+    lines = [
+        "x: = 3 + 3",
+        "y: int = x * 2",
+        "scale: num(a: int, b: int) = 1. * a / b + (3 + 3) ^ 2",
+    ]
+    for ii in range(statements - len(lines)):
+        match ii % 4:
+            case 0:
+                lines.append(f"v{ii}: = x * {ii} + y / (1 + {ii % 7}) - 2 ^ 3")
+            case 1:
+                lines.append(f"x = x + {ii} * (y - {ii % 5}) / 3")
+            case 2:
+                lines.append(f"v{ii}: num = scale(a={ii}, b=y + 1) * 2.5")
+            case _:
+                lines.append(f"y = (x + y) * (x - y) ^ 2 / ({ii} + x)")
+    return "\n".join(lines) + "\n"
+
+
+def best_of(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Return the fastest wall time of several runs of ``func`` in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,132 @@
+"""Module providing a bounded cache of the results of callables.
+
+Calls are pure, as a body is an expression of the variables it sees, so a
+call to a cached callable with the same values can return the result of an
+earlier one. Bodies see the parameters of their callers and the globals
+as well as their own parameters, so an entry is keyed on the values of
+every name the body reads, including through the callables it calls, not
+just on the arguments. A global changing so selects another entry without
+invalidating any. The names read are worked out from the callables defined
+when the cache is set up, so the ``Executor`` calls ``CallCache.reset``
+whenever a callable is defined or deleted.
+
+Once a cache holds ``size`` entries, the least recently used is evicted.
+Calls that raise are not cached.
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Iterable
+
+DEFAULT_SIZE = 128
+
+
+def key(values: Iterable[Any]) -> tuple:
+    """Return the key of the given values of ``Int`` or ``Num`` variables.
+
+    Values are the Python ``int`` or ``float`` held by a variable, or None
+    if it is not defined. Floats are keyed by their exact text so that
+    ``-0.`` and ``0.`` differ, and neither equals the ``int`` 0.
+    """
+    return tuple(value.hex() if type(value) is float else value for value in values)
+
+
+def read_names(
+    callable_: Any,
+    callables: Mapping[str, Any],
+    known: Mapping[str, tuple[str, ...] | None] | None = None,
+) -> tuple[str, ...] | None:
+    """Return the names whose values the result of a call depends on.
+
+    ``callable_`` is an ``execute.Callable`` or ``vm.Function``, and
+    ``callables`` maps names to those it may call. The parameters come
+    first, in order, followed by the other names read by the body or the
+    callables it calls. Returns None if a call cannot be cached, as when it
+    calls a callable that is not defined or recurses, which always fails.
+    ``known`` may hold what this returned for some of the callables it
+    calls, which are then not visited again.
+    """
+    free: dict[str, set[str]] = {}
+
+    def visit(current: Any, path: tuple[str, ...]) -> set[str] | None:
+        if current.name in path:
+            return None
+        if current.name in free:
+            return free[current.name]
+        if path and known is not None and current.name in known:
+            names = known[current.name]
+            if names is None:
+                return None
+            return set(names[len(current.type.params) :])
+
+        try:
+            names, callees = current.reads()
+        except SyntaxError:
+            return None
+        for callee_name in callees:
+            callee = callables.get(callee_name)
+            if callee is None:
+                return None
+            callee_names = visit(callee, path + (current.name,))
+            if callee_names is None:
+                return None
+            names |= callee_names
+        free[current.name] = names - set(current.type.params)
+        return free[current.name]
+
+    names = visit(callable_, ())
+    if names is None:
+        return None
+    return tuple(callable_.type.params) + tuple(sorted(names))
+
+
+class CallCache:
+    """The results of calls to one callable, with the most recent last.
+
+    ``reads`` is None while calls cannot be cached, and otherwise holds what
+    a backend reads the values of the key from: the names returned by
+    ``read_names`` for the tree walking interpreter, or their slots for the
+    vm.
+    """
+
+    __slots__ = ("size", "entries", "reads", "hits", "misses", "resets")
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        if size < 1:
+            raise ValueError(f"Call cache size must be positive, not {size}\n")
+        self.size = size
+        self.entries: OrderedDict[tuple, Any] = OrderedDict()
+        self.reads: tuple | None = None
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+
+    def get(self, key: tuple) -> Any:
+        """Return the cached result for a key, or None if there is none."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def store(self, key: tuple, value: Any):
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def reset(self, reads: tuple | None):
+        """Drop all entries, as the callables they depend on have changed."""
+        self.entries.clear()
+        self.reads = reads
+        self.resets += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"CallCache(size={self.size}, entries={len(self)}, "
+            + f"hits={self.hits}, misses={self.misses})"
+        )
@@ -1,17 +1,27 @@
 """Module providing the interpreter"""
 
-import copy
-from typing import Any, Type, Union
+import math
+import operator
+import time
+from collections.abc import MutableMapping
+from typing import Any, Iterable, Iterator, Type
 
+import callcache
 import literals
+from astnode import AstNode
 
 
 class Val:
+    __slots__ = ("value",)
     value: Any
 
     def __str__(self):
         return str(self.value)
 
+    def __reduce__(self):
+        # The default would build an empty value, which may be cached.
+        return (type(self), (self.value,))
+
     def _raise_binary(self, op_name: str, other: Any):
         raise SyntaxError(
             f"{op_name} not supported for between type\n"
@@ -19,95 +29,126 @@ class Val:
         )
 
     def add(self, other: Any) -> Any:
-        _ = other
-        self._raise_binary("Addition", other)
+        op = BINARY_OPS.get((type(self), type(other), literals.OP_ADD))
+        if op is None:
+            self._raise_binary("Addition", other)
+        return op[1](op[0](self.value, other.value))
 
     def sub(self, other: Any) -> Any:
-        _ = other
-        self._raise_binary("Subtraction", other)
+        op = BINARY_OPS.get((type(self), type(other), literals.OP_SUB))
+        if op is None:
+            self._raise_binary("Subtraction", other)
+        return op[1](op[0](self.value, other.value))
 
     def mul(self, other: Any) -> Any:
-        _ = other
-        self._raise_binary("Multiplication", other)
+        op = BINARY_OPS.get((type(self), type(other), literals.OP_MUL))
+        if op is None:
+            self._raise_binary("Multiplication", other)
+        return op[1](op[0](self.value, other.value))
 
     def div(self, other: Any) -> Any:
-        _ = other
-        self._raise_binary("Division", other)
+        op = BINARY_OPS.get((type(self), type(other), literals.OP_DIV))
+        if op is None:
+            self._raise_binary("Division", other)
+        return op[1](op[0](self.value, other.value))
 
     def exp(self, other: Any) -> Any:
-        _ = other
-        self._raise_binary("Exponentiation", other)
+        op = BINARY_OPS.get((type(self), type(other), literals.OP_EXP))
+        if op is None:
+            self._raise_binary("Exponentiation", other)
+        return op[1](op[0](self.value, other.value))
 
 
 class Int(Val):
-    def __init__(self, value: int):
-        self.value = int(value)
-
-    def add(self, other: Any):
-        if isinstance(other, Num):
-            return Num(self.value + other.value)
-        elif isinstance(other, Int):
-            return Int(self.value + other.value)
-        self._raise_binary("Addition", other)
-
-    def sub(self, other: Any):
-        if isinstance(other, Num):
-            return Num(self.value - other.value)
-        elif isinstance(other, Int):
-            return Int(self.value - other.value)
-        self._raise_binary("Subtraction", other)
-
-    def mul(self, other: Any):
-        if isinstance(other, Num):
-            return Num(self.value * other.value)
-        elif isinstance(other, Int):
-            return Int(self.value * other.value)
-        self._raise_binary("Multiplication", other)
-
-    def div(self, other: Any):
-        if isinstance(other, Num):
-            return Num(self.value / other.value)
-        elif isinstance(other, Int):
-            return Int(self.value / other.value)
-        self._raise_binary("Division", other)
-
-    def exp(self, other: Any):
-        if isinstance(other, Num):
-            return Num(self.value**other.value)
-        elif isinstance(other, Int):
-            return Int(self.value**other.value)
-        self._raise_binary("Exponentiation", other)
+    __slots__ = ()
+
+    def __new__(cls, value: int):
+        value = int(value)
+        if SMALL_INT_MIN <= value <= SMALL_INT_MAX and cls is Int:
+            return SMALL_INTS[value - SMALL_INT_MIN]
+        self = super().__new__(cls)
+        self.value = value
+        return self
 
 
 class Num(Val):
-    def __init__(self, value: float):
+    __slots__ = ()
+
+    def __new__(cls, value: float):
+        self = super().__new__(cls)
         self.value = float(value)
-        self._operable = Union[Int, Num]
+        return self
+
+
+def _new_int(value: int) -> Int:
+    self = object.__new__(Int)
+    self.value = value
+    return self
+
+
+# Values are never changed once made, so Int shares one instance for each
+# of the most common values, like Python does for small ints.
+SMALL_INT_MIN = -5
+SMALL_INT_MAX = 256
+SMALL_INTS = tuple(_new_int(ii) for ii in range(SMALL_INT_MIN, SMALL_INT_MAX + 1))
+
+# Maps the types of the operands and the operator to the operation on their
+# values and the type of the result. An int only stays an int with another.
+BINARY_OPS: dict[tuple[type, type, str], tuple[Any, Type[Val]]] = {}
+for _left in (Int, Num):
+    for _right in (Int, Num):
+        _result = Int if _left is Int and _right is Int else Num
+        BINARY_OPS[_left, _right, literals.OP_ADD] = (operator.add, _result)
+        BINARY_OPS[_left, _right, literals.OP_SUB] = (operator.sub, _result)
+        BINARY_OPS[_left, _right, literals.OP_MUL] = (operator.mul, _result)
+        BINARY_OPS[_left, _right, literals.OP_DIV] = (operator.truediv, _result)
+        BINARY_OPS[_left, _right, literals.OP_EXP] = (operator.pow, _result)
 
-    def add(self, other: Any):
-        if isinstance(other, self._operable):
-            return Num(self.value + other.value)
-        self._raise_binary("Addition", other)
 
-    def sub(self, other: Any):
-        if isinstance(other, self._operable):
-            return Num(self.value - other.value)
-        self._raise_binary("Subtraction", other)
+def _div_int(left: int, right: int) -> int:
+    return int(left / right)
 
-    def mul(self, other: Any):
-        if isinstance(other, self._operable):
-            return Num(self.value * other.value)
-        self._raise_binary("Multiplication", other)
 
-    def div(self, other: Any):
-        if isinstance(other, self._operable):
-            return Num(self.value / other.value)
-        self._raise_binary("Division", other)
+def _exp_int(left: int, right: int) -> int:
+    return int(left**right)
 
-    def exp(self, other: Any):
-        if isinstance(other, self._operable):
-            return Num(self.value**other.value)
-        self._raise_binary("Exponentiation", other)
+
+def _exp_num(left: Any, right: Any) -> float:
+    # Raises for a complex result, as Num does.
+    return float(left**right)
+
+
+def mul_bits(left: Any, right: Any) -> float:
+    """Estimate the bits of the product of two numbers, 0 unless both are ints."""
+    if type(left) is int and type(right) is int:
+        return left.bit_length() + right.bit_length()
+    return 0
+
+
+def exp_bits(left: Any, right: Any) -> float:
+    """Estimate the bits of a power of two numbers, 0 unless it is a large int."""
+    if type(left) is int and type(right) is int and right > 1:
+        if left > 1 or left < -1:
+            try:
+                return math.log2(abs(left)) * right
+            except OverflowError:
+                # An exponent too large for a float is over any limit.
+                return math.inf
+    return 0
+
+
+# Maps the type of the result and the operator to the operation on values
+# whose types are known, see UncheckedNode. Python already gives a float
+# for +, - and * when either side is one, so only / and ^ differ by type.
+UNCHECKED_OPS: dict[tuple[type, str], Any] = {}
+for _result in (Int, Num):
+    UNCHECKED_OPS[_result, literals.OP_ADD] = operator.add
+    UNCHECKED_OPS[_result, literals.OP_SUB] = operator.sub
+    UNCHECKED_OPS[_result, literals.OP_MUL] = operator.mul
+UNCHECKED_OPS[Int, literals.OP_DIV] = _div_int
+UNCHECKED_OPS[Num, literals.OP_DIV] = operator.truediv
+UNCHECKED_OPS[Int, literals.OP_EXP] = _exp_int
+UNCHECKED_OPS[Num, literals.OP_EXP] = _exp_num
 
 
 class CallableType:
@@ -116,56 +157,291 @@ class CallableType:
         self.return_type = return_type
 
 
-class Callable:
-    def __init__(self, name: str, callable_type: CallableType, definition: "ExprNode"):
-        self.name = name
-        self.type = callable_type
-        self.definition = definition
+def check_params(name: str, callable_type: CallableType, params: dict[str, Val]):
+    """Check that a call passes exactly the parameters of the callable."""
+    if set(params) - set(callable_type.params):
+        extra_params = ""
+        for param in set(params) - set(callable_type.params):
+            extra_params += param + ", "
 
-    def call(self, params: dict[str, Val]):
+        extra_params = extra_params[:-2]
+        raise SyntaxError(
+            f"Callable 'f{name}' recieved unexpected paramuments:\n" + extra_params
+        )
 
-        definition = copy.deepcopy(self.definition)
+    if set(callable_type.params) - set(params):
+        missing_params = ""
+        for param in set(callable_type.params) - set(params):
+            missing_params += param + ", "
 
-        if set(params) - set(self.type.params):
-            extra_params = ""
-            for param in set(params) - set(self.type.params):
-                extra_params += param + ", "
+        missing_params = missing_params[:-2]
+        raise SyntaxError(f"Callable 'f{name}' missing paramuments:\n" + missing_params)
 
-            extra_params = extra_params[:-2]
-            raise SyntaxError(
-                f"Callable 'f{self.name}' recieved unexpected paramuments:\n"
-                + extra_params
-            )
 
-        if set(self.type.params) - set(params):
-            missing_params = ""
-            for param in set(self.type.params) - set(params):
-                missing_params += param + ", "
+def coerce(var_type: Type[Val], var_val: Any, line: int, col: int) -> Val:
+    """Convert the value of a variable definition to its declared type."""
+    if isinstance(var_val, Val):
+        var_val = var_val.value
 
-            missing_params = missing_params[:-2]
-            raise SyntaxError(
-                f"Callable 'f{self.name}' missing paramuments:\n" + missing_params
+    try:
+        return var_type(var_val)
+    except (TypeError, ValueError):
+        raise SyntaxError(
+            f"Invalid variable definition at line {line}, col {col}\n"
+            + f"Incompatible value for type {var_type}: {var_val}\n"
+        )
+
+
+def nesting_error(line: int, col: int) -> SyntaxError:
+    """Return the error for a statement too deeply nested to compile or run."""
+    return SyntaxError(
+        "Maximum recursion depth reached, as the statement is nested too "
+        + f"deeply.\nIn statement at line {line}, col {col}."
+    )
+
+
+class LimitExceeded(SyntaxError):
+    """Raised when running code goes over a limit of its ``Budget``.
+
+    ``line`` and ``col`` give the position of the call or expression that
+    was running.
+    """
+
+    def __init__(self, reason: str, line: int, col: int):
+        super().__init__(f"{reason} at line {line}, col {col}.\n")
+        self.reason = reason
+        self.line = line
+        self.col = col
+
+    def __reduce__(self):
+        return (type(self), (self.reason, self.line, self.col))
+
+
+class Budget:
+    """Limits on the work done by running code, see ``Executor.exec``.
+
+    ``max_steps`` bounds the number of evaluation steps, about one for each
+    operand, operator and call evaluated, ``max_seconds`` the wall time
+    from when the budget is made, and ``max_int_bits`` the estimated size
+    of each ``int`` a ``*`` or ``^`` gives, checked before computing it.
+
+    Steps are spent, and the time checked, whenever an expression or the
+    body of a call starts, so the checks cost little per operation. A
+    single operation is never interrupted, which is why large ints need a
+    limit of their own.
+    """
+
+    __slots__ = ("max_steps", "max_seconds", "max_int_bits", "steps", "deadline")
+
+    def __init__(
+        self,
+        max_steps: int | None = None,
+        max_seconds: float | None = None,
+        max_int_bits: int | None = None,
+    ):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_int_bits = max_int_bits
+        self.steps = 0
+        self.deadline = None
+        if max_seconds is not None:
+            self.deadline = time.monotonic() + max_seconds
+
+    def spend(self, steps: int, line: int, col: int):
+        """Count steps about to run, raising LimitExceeded if over a limit."""
+        self.steps += steps
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise LimitExceeded(f"Step limit of {self.max_steps} exceeded", line, col)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LimitExceeded(
+                f"Time limit of {self.max_seconds} seconds exceeded", line, col
+            )
+
+    def check_int(self, bits: float, line: int, col: int):
+        """Raise LimitExceeded if an int of about ``bits`` bits is too large."""
+        if self.max_int_bits is not None and bits > self.max_int_bits:
+            raise LimitExceeded(
+                f"Integer size limit of {self.max_int_bits} bits exceeded", line, col
             )
 
-        for param_name, param_val in params.items():
-            definition.varspace[param_name] = param_val
 
-        return self.type.return_type(definition.exec().value)
+class Scope(MutableMapping):
+    """The variables visible to running code.
+
+    A call makes a new frame of parameters, which is dropped once the call
+    returns. A frame starts from the frame of the caller, so a body sees its
+    own parameters, then those of its callers, then the globals. Assigning
+    and deleting always act on the globals, as only top level statements
+    define variables.
+
+    ``budget`` holds the limits of the code running, if any, see ``Budget``.
+    """
+
+    __slots__ = ("globals", "frame", "budget")
+
+    def __init__(self, globals_: MutableMapping[str, Val]):
+        self.globals = globals_
+        self.frame: dict[str, Val] = {}
+        self.budget: Budget | None = None
+
+    def lookup(self, name: str) -> Val | None:
+        """Return the value of a variable, or None if it is not defined."""
+        value = self.frame.get(name)
+        if value is None:
+            return self.globals.get(name)
+        return value
+
+    def __getitem__(self, name: str) -> Val:
+        value = self.lookup(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.frame or name in self.globals
+
+    def __setitem__(self, name: str, value: Val):
+        self.globals[name] = value
+
+    def __delitem__(self, name: str):
+        del self.globals[name]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.frame
+        for name in self.globals:
+            if name not in self.frame:
+                yield name
+
+    def __len__(self) -> int:
+        return len(self.frame.keys() | self.globals.keys())
+
+
+class Callable:
+    def __init__(self, name: str, callable_type: CallableType, definition: "ExprNode"):
+        self.name = name
+        self.type = callable_type
+        self.definition = definition
+        # Set by the Executor for callables whose results are cached.
+        self.cache: "callcache.CallCache | None" = None
+
+    def reads(self) -> tuple[set[str], set[str]]:
+        """Return the variables and callables the definition uses directly."""
+        names: set[str] = set()
+        callables: set[str] = set()
+        nodes: list[Node] = [self.definition]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, IdentNode):
+                names.add(node.value)
+            elif isinstance(node, CallNode):
+                callables.add(node.callable_name())
+                nodes.extend(expr for _, expr in node.children[2].items())
+            elif isinstance(node, (ExprNode, TermNode, UncheckedNode)):
+                nodes.append(node.first)
+                nodes.extend(operand for _, operand in node.rest)
+            elif isinstance(node, FactorNode):
+                nodes.append(node.base)
+                nodes.extend(node.exponents)
+            elif isinstance(node, (AtomNode, SubexprNode)):
+                nodes.append(node.value)
+        return names, callables
+
+    def call(
+        self,
+        params: dict[str, Val],
+        caller: dict[str, Val] | None = None,
+        checked: bool = True,
+    ):
+        """Evaluate the definition with the given parameters.
+
+        ``caller`` is the frame of the calling code, whose parameters stay
+        visible to the definition unless shadowed. Unless ``checked``, the
+        parameters are known to match and the definition to evaluate to the
+        return type, as worked out by ``typecheck``.
+        """
+        if checked:
+            check_params(self.name, self.type, params)
+
+        scope: Scope = self.definition.varspace
+        outer = scope.frame
+        if caller is None:
+            caller = outer
+        scope.frame = {**caller, **params} if caller else params
+        try:
+            cache = self.cache
+            if cache is not None and cache.reads is not None:
+                key = callcache.key(
+                    None if value is None else value.value
+                    for value in map(scope.lookup, cache.reads)
+                )
+                result = cache.get(key)
+                if result is None:
+                    result = self.type.return_type(self.definition.exec().value)
+                    cache.store(key, result)
+                return result
+
+            value = self.definition.exec()
+        finally:
+            scope.frame = outer
+
+        if not checked:
+            return value
+        return self.type.return_type(value.value)
 
 
 TYPE_KEYWORDS = {"int": Int, "num": Num}
 
 
 class Node:
+    # The steps evaluating the node, built by evaluate when it runs again.
+    steps: list[tuple[int, Any]] | None = None
+    # Set once evaluated, see evaluate_once.
+    evaluated = False
+
     @staticmethod
     def new_node(
-        node: dict[str, Any] | str,
-        varspace: dict[str, Val],
+        node: AstNode | dict[str, Any] | str,
+        varspace: Scope | dict[str, Val],
         callspace: dict[str, Callable],
     ):
         if isinstance(node, str):
             return node
-        match node["type"]:
+        if not isinstance(varspace, Scope):
+            varspace = Scope(varspace)
+        if isinstance(node, dict):
+            node = AstNode.from_dict(node)
+
+        # Nodes are built after their children, from an explicit stack rather
+        # than by recursion, so nesting is not limited by the Python stack.
+        built: list[Any] = []
+        # A None above a node marks its children as built.
+        stack: list[Any] = [node]
+        while stack:
+            current = stack.pop()
+            if current is None:
+                current = stack.pop()
+                start = len(built) - len(current.children)
+                children = built[start:]
+                del built[start:]
+                built.append(Node._build(current, children, varspace, callspace))
+            elif isinstance(current, str):
+                built.append(current)
+            elif isinstance(current.children, list):
+                stack.append(current)
+                stack.append(None)
+                stack.extend(reversed(current.children))
+            else:
+                built.append(Node._build(current, [], varspace, callspace))
+        return built[0]
+
+    @staticmethod
+    def _build(
+        node: AstNode,
+        children: list[Any],
+        varspace: Scope,
+        callspace: dict[str, Callable],
+    ):
+        match node.type:
             case "int":
                 return IntNode(node, varspace, callspace)
             case "num":
@@ -173,33 +449,33 @@ class Node:
             case "ident":
                 return IdentNode(node, varspace, callspace)
             case "atom":
-                return AtomNode(node, varspace, callspace)
+                return AtomNode(node, varspace, callspace, children)
             case "factor":
-                return FactorNode(node, varspace, callspace)
+                return FactorNode(node, varspace, callspace, children)
             case "term":
-                return TermNode(node, varspace, callspace)
+                return TermNode(node, varspace, callspace, children)
             case "expr":
-                return ExprNode(node, varspace, callspace)
+                return ExprNode(node, varspace, callspace, children)
             case "vardef":
-                return VarDefNode(node, varspace, callspace)
+                return VarDefNode(node, varspace, callspace, children)
             case "varset":
-                return VarSetNode(node, varspace, callspace)
+                return VarSetNode(node, varspace, callspace, children)
             case "echo":
-                return EchoNode(node, varspace, callspace)
+                return EchoNode(node, varspace, callspace, children)
             case "newline":
                 return None
             case "paramlist":
-                return ParamListNode(node, varspace, callspace)
+                return ParamListNode(node, varspace, callspace, children)
             case "callable":
-                return CallableNode(node, varspace, callspace)
+                return CallableNode(node, varspace, callspace, children)
             case "callable_def":
-                return CallableDefNode(node, varspace, callspace)
+                return CallableDefNode(node, varspace, callspace, children)
             case "arglist":
-                return ArgListNode(node, varspace, callspace)
+                return ArgListNode(node, varspace, callspace, children)
             case "call":
-                return CallNode(node, varspace, callspace)
+                return CallNode(node, varspace, callspace, children)
             case _:
-                raise ValueError(f"Unsupported node type: {node['type']}\n")
+                raise ValueError(f"Unsupported node type: {node.type}\n")
 
 
 class ValueNode(Node):
@@ -209,11 +485,11 @@ class ValueNode(Node):
 class IntNode(ValueNode):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
     ):
-        self.value = int(node["children"])
+        self.value = int(node.children)
         self.varspace = varspace
         self.callspace = callspace
 
@@ -224,11 +500,11 @@ class IntNode(ValueNode):
 class NumNode(ValueNode):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
     ):
-        self.value = float(node["children"])
+        self.value = float(node.children)
         self.varspace = varspace
         self.callspace = callspace
 
@@ -239,40 +515,60 @@ class NumNode(ValueNode):
 class IdentNode(ValueNode):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
     ):
-        self.value: str = node["children"]
+        self.value: str = node.children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
+        self.line = node.line
 
     def exec(self):
-        if self.value in self.varspace:
-            return self.varspace[self.value]
-        raise SyntaxError(f"Variable {self.value} is not yet defined.\n")
+        value = self.varspace.lookup(self.value)
+        if value is not None:
+            return value
+        raise SyntaxError(
+            f"Variable {self.value} at line {self.line}, col {self.col} "
+            + "is not yet defined.\n"
+        )
 
 
 class ArgListNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            if isinstance(child, dict):
-                self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
-
-    def exec(self):
-
-        args: dict[str, Val] = {}
+        self.line = node.line
+        # The list is checked once, keeping the arguments before the first
+        # invalid one and the error to report once they are evaluated.
+        self.args: list[tuple[str, ExprNode]] = []
+        self.error: str | None = None
+        try:
+            self.args.extend(self._resolve())
+        except SyntaxError as e:
+            self.error = e.msg
+
+    def items(self) -> Iterator[tuple[str, "ExprNode"]]:
+        """Yield the name and expression of each argument.
+
+        An invalid argument is only reported once the arguments before it
+        have been evaluated, as when running the call.
+        """
+        yield from self.args
+        if self.error is not None:
+            raise SyntaxError(self.error)
+
+    def _resolve(self) -> Iterator[tuple[str, "ExprNode"]]:
+        names: set[str] = set()
         children = self.children.copy()
         while children:
             ident = children.pop(0)
@@ -284,11 +580,12 @@ class ArgListNode(Node):
 
             arg_ident = ident.value
 
-            if arg_ident in args:
+            if arg_ident in names:
                 raise SyntaxError(
                     f"Invalid arglist at line {self.line}, col {self.col}.\n"
                     + f"Argument {arg_ident} is repeated."
                 )
+            names.add(arg_ident)
 
             # Consume '='
             children.pop(0)
@@ -300,81 +597,96 @@ class ArgListNode(Node):
                     + "Expected expression."
                 )
 
-            arg_val = arg_expr.exec()
-
-            args[arg_ident] = arg_val
+            yield arg_ident, arg_expr
 
             if children:
                 # Pop the optional comma
                 children.pop(0)
 
+    def exec(self):
+        args = {arg_ident: arg_expr.exec() for arg_ident, arg_expr in self.args}
+        if self.error is not None:
+            raise SyntaxError(self.error)
+
         return args
 
 
 class CallNode(ValueNode):
+    # Cleared by typecheck for calls whose arguments and result are known
+    # to have the right types, which then skip checking them.
+    checked = True
+
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            if isinstance(child, dict):
-                self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
-
-    def exec(self):
+        self.line = node.line
+        self.name: str = ""
+        self.error: str | None = None
         callable_ident = self.children[0]
-        if not isinstance(callable_ident, IdentNode):
-            raise SyntaxError(
+        if isinstance(callable_ident, IdentNode):
+            self.name = callable_ident.value
+        else:
+            self.error = (
                 f"Invalid call at line {self.line}, col {self.col}.\n"
                 + "Expected identifier."
             )
-        callable_name = callable_ident.value
 
-        if callable_name not in self.callspace:
-            raise SyntaxError(
-                f"Invalid call at line {self.line}, col {self.col}."
-                + f"callable {callable_name} has not yet been defined."
-            )
-
-        arglist: ArgListNode = self.children[2]
+    def callable_name(self) -> str:
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        return self.name
 
-        args = arglist.exec()
+    def lookup(self) -> Callable:
+        """Return the callable to call, checking the call can be made."""
+        if self.error is not None:
+            raise SyntaxError(self.error)
 
-        try:
-            return self.callspace[callable_name].call(args)
-        except RecursionError:
+        callable_ = self.callspace.get(self.name)
+        if callable_ is None:
             raise SyntaxError(
-                "Maximum recursion depth reached during call.\n"
-                + f"In call '{callable_name}' at line {self.line}, col {self.col}."
+                f"Invalid call at line {self.line}, col {self.col}."
+                + f"callable {self.name} has not yet been defined."
             )
+        return callable_
+
+    def exec(self):
+        return evaluate(self)
 
 
 class ParamListNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            if isinstance(child, dict):
-                self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.params: dict[str, Type[Val]] = {}
+        self.error: str | None = None
+        try:
+            self.params = self._resolve()
+        except SyntaxError as e:
+            self.error = e.msg
 
-    def exec(self):
+    def exec(self) -> dict[str, Type[Val]]:
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        return self.params
 
+    def _resolve(self) -> dict[str, Type[Val]]:
         params: dict[str, Type[Val]] = {}
         children = self.children.copy()
         while children:
@@ -421,22 +733,31 @@ class ParamListNode(Node):
 class CallableNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            if isinstance(child, dict):
-                self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        # The type is checked once, with any error raised when defining.
+        self.type: CallableType | None = None
+        self.error: str | None = None
+        try:
+            self.type = self._resolve()
+        except SyntaxError as e:
+            self.error = e.msg
 
-    def exec(self):
-        return_type_ident: IdentNode = self.children.pop(0)
+    def exec(self) -> CallableType:
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        return self.type
+
+    def _resolve(self) -> CallableType:
+        return_type_ident: IdentNode = self.children[0]
 
         return_type = return_type_ident.value
 
@@ -446,12 +767,10 @@ class CallableNode(Node):
                 + f"{return_type} is not a valid return type."
             )
 
-        self.children.pop(0)
-
-        if self.children[0] == ")":
+        if self.children[2] == ")":
             return CallableType(TYPE_KEYWORDS[return_type], {})
 
-        paramlist: ParamListNode = self.children[0]
+        paramlist: ParamListNode = self.children[2]
 
         return CallableType(TYPE_KEYWORDS[return_type], paramlist.exec())
 
@@ -459,19 +778,18 @@ class CallableNode(Node):
 class CallableDefNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            if isinstance(child, dict):
-                self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        # Kept to build the body again once typecheck has rewritten it.
+        self.ast = node
 
     def exec(self):
         callable_name: str = self.children[0].value
@@ -491,21 +809,19 @@ class CallableDefNode(Node):
 class AtomNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        self.col = node["col"]
+        # Children are resolved and checked once, so exec only evaluates.
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.value = self._resolve(children)
 
-    def exec(self) -> Val:
-        children = [
-            Node.new_node(child, self.varspace, self.callspace)
-            for child in self.children
-        ]
+    def _resolve(self, children: list[Any]) -> "ValueNode | ExprNode":
         if not children:
             raise SyntaxError(f"Expected Atom at line {self.line}, col {self.col}\n")
         if children[0] is literals.L_PAREN:
@@ -518,7 +834,7 @@ class AtomNode(Node):
                 raise SyntaxError(
                     f"Expected Expr at line {self.line}, col {self.col}\n"
                 )
-            return value.exec()
+            return value
         if len(children) > 1:
             raise SyntaxError(
                 f"Expected '(' at line {self.line}, col {self.col}\n"
@@ -527,214 +843,240 @@ class AtomNode(Node):
         value = children[0]
         if not isinstance(value, ValueNode):
             raise SyntaxError(f"Expected value at line {self.line}, col {self.col}\n")
-        return value.exec()
+        return value
+
+    def exec(self) -> Val:
+        return self.value.exec()
 
 
 class FactorNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        self.col = node["col"]
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.base, self.exponents = self._resolve(children)
 
-    def exec(self):
-        children = [
-            Node.new_node(child, self.varspace, self.callspace)
-            for child in self.children
-        ]
+    def _resolve(self, children: list[Any]) -> tuple[AtomNode, list["FactorNode"]]:
         if not children:
             raise SyntaxError(f"Expected Factor at line {self.line}, col {self.col}\n")
-        if len(children) == 1:
-            value: Any | AtomNode = children[0]
-            if not isinstance(value, AtomNode):
-                raise SyntaxError(
-                    f"Expected Atom at line {self.line}, col {self.col}\n"
-                )
-
-            return value.exec()
 
-        op: Any | None = None
-
-        right: Any | AtomNode = children.pop(0)
-        if not isinstance(right, AtomNode):
+        base: Any | AtomNode = children.pop(0)
+        if not isinstance(base, AtomNode):
             raise SyntaxError(f"Expected Atom at line {self.line}, col {self.col}\n")
-        right_val: Val = right.exec()
 
+        exponents: list[FactorNode] = []
         while children:
-            if not children:
-                raise SyntaxError(
-                    f"Expected {literals.OP_EXP} at line {self.line}, col {self.col}\n"
-                )
             op = children.pop(0)
-            if op != literals.OP_EXP:
+            if op != literals.OP_EXP or not children:
                 raise SyntaxError(
                     f"Expected {literals.OP_EXP} at line {self.line}, col {self.col}\n"
                 )
-            left: Any | AtomNode = children.pop(0)
-            if not isinstance(left, FactorNode):
+            exponent: Any | FactorNode = children.pop(0)
+            if not isinstance(exponent, FactorNode):
                 raise SyntaxError(
                     f"Expected Factor at line {self.line}, col {self.col}\n"
                 )
+            exponents.append(exponent)
 
-            right_val = right_val.exp(left.exec())
+        return base, exponents
 
-        return right_val
+    def exec(self) -> Val:
+        return evaluate(self)
 
 
 class TermNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        self.col = node["col"]
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.first, self.rest = self._resolve(children)
 
-    def exec(self):
-        children = [
-            Node.new_node(child, self.varspace, self.callspace)
-            for child in self.children
-        ]
+    def _resolve(
+        self, children: list[Any]
+    ) -> tuple[FactorNode, list[tuple[str, FactorNode]]]:
         if not children:
             raise SyntaxError(f"Expected Term at line {self.line}, col {self.col}\n")
-        if len(children) == 1:
-            value: Any | FactorNode = children[0]
-            if not isinstance(value, FactorNode):
-                raise SyntaxError(
-                    f"Expected Factor at line {self.line}, col {self.col}\n"
-                )
 
-            return value.exec()
-
-        op: Any | None = None
-
-        right: Any | FactorNode = children.pop(0)
-        if not isinstance(right, FactorNode):
+        first: Any | FactorNode = children.pop(0)
+        if not isinstance(first, FactorNode):
             raise SyntaxError(f"Expected Factor at line {self.line}, col {self.col}\n")
-        right_val: Val = right.exec()
 
+        rest: list[tuple[str, FactorNode]] = []
         while children:
-            if not children:
-                raise SyntaxError(
-                    f"Expected operator with precidence 2 at line {self.line}, col {self.col}\n"
-                )
             op = children.pop(0)
-            if op not in [literals.OP_MUL, literals.OP_DIV]:
+            if op not in [literals.OP_MUL, literals.OP_DIV] or not children:
                 raise SyntaxError(
                     f"Expected operator with precidence 2 at line {self.line}, col {self.col}\n"
                 )
-            left: Any | FactorNode = children.pop(0)
-            if not isinstance(left, FactorNode):
+            operand: Any | FactorNode = children.pop(0)
+            if not isinstance(operand, FactorNode):
                 raise SyntaxError(
                     f"Expected Factor at line {self.line}, col {self.col}\n"
                 )
-            left_val = left.exec()
-
-            match op:
-                case literals.OP_MUL:
-                    right_val = right_val.mul(left_val)
-                case literals.OP_DIV:
-                    right_val = right_val.div(left_val)
-                case _:
-                    raise SyntaxError(
-                        f"Expected operator with precidence 2 at line {self.line}, col {self.col}\n"
-                    )
+            rest.append((op, operand))
 
-        return right_val
+        return first, rest
+
+    def exec(self) -> Val:
+        return evaluate(self)
 
 
 class ExprNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        self.col = node["col"]
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.first, self.rest = self._resolve(children)
 
-    def exec(self):
-        children = [
-            Node.new_node(child, self.varspace, self.callspace)
-            for child in self.children
-        ]
+    def _resolve(
+        self, children: list[Any]
+    ) -> tuple[TermNode, list[tuple[str, TermNode]]]:
         if not children:
             raise SyntaxError(f"Expected Expr at line {self.line}, col {self.col}\n")
-        if len(children) == 1:
-            value: Any | TermNode = children[0]
-            if not isinstance(value, TermNode):
+
+        first: Any | TermNode = children.pop(0)
+        if not isinstance(first, TermNode):
+            if len(children) == 0:
                 raise SyntaxError(
                     f"Expected TermNode at line {self.line}, col {self.col}\n"
                 )
-            return value.exec()
-
-        op: Any | None = None
-
-        right: Any | TermNode = children.pop(0)
-        if not isinstance(right, TermNode):
             raise SyntaxError(f"Expected Term at line {self.line}, col {self.col}\n")
-        right_val: Val = right.exec()
 
+        rest: list[tuple[str, TermNode]] = []
         while children:
-            if not children:
-                raise SyntaxError(
-                    f"Expected operator with precidence 1 at line {self.line}, col {self.col}\n"
-                )
             op = children.pop(0)
-            if op not in [literals.OP_ADD, literals.OP_SUB]:
+            if op not in [literals.OP_ADD, literals.OP_SUB] or not children:
                 raise SyntaxError(
                     f"Expected operator with precidence 1 at line {self.line}, col {self.col}\n"
                 )
-            left: Any | TermNode = children.pop(0)
-            if not isinstance(left, TermNode):
+            operand: Any | TermNode = children.pop(0)
+            if not isinstance(operand, TermNode):
                 raise SyntaxError(
                     f"Expected Term at line {self.line}, col {self.col}\n"
                 )
-            left_val: Val = left.exec()
-
-            match op:
-                case literals.OP_ADD:
-                    right_val = right_val.add(left_val)
-                case literals.OP_SUB:
-                    right_val = right_val.sub(left_val)
-                case _:
-                    raise SyntaxError(
-                        f"Expected operator with precidence 2 at line {self.line}, col {self.col}\n"
-                    )
+            rest.append((op, operand))
 
-        return right_val
+        return first, rest
+
+    def exec(self) -> Val:
+        return evaluate(self)
+
+
+class SubexprNode(ValueNode):
+    """The first evaluation of a subexpression repeated in a statement.
+
+    The result is kept for the ``SubexprRefNode`` nodes standing in for
+    the later copies, which are always evaluated after this one. Only a
+    recursive call could evaluate the same node again before them, and
+    those always fail.
+    """
+
+    def __init__(self, value: "ValueNode | ExprNode"):
+        self.value = value
+        self.result: Val | None = None
+        self.col = value.col
+        self.varspace = value.varspace
+        self.callspace = value.callspace
+        self.line = value.line
+
+    def exec(self) -> Val:
+        self.result = self.value.exec()
+        return self.result
+
+
+class SubexprRefNode(ValueNode):
+    """A later copy of a repeated subexpression, see ``SubexprNode``."""
+
+    def __init__(self, source: SubexprNode):
+        self.source = source
+        self.col = source.col
+        self.varspace = source.varspace
+        self.callspace = source.callspace
+        self.line = source.line
+
+    def exec(self) -> Val:
+        return self.source.result
+
+
+class UncheckedNode(ValueNode):
+    """An expression, term or factor whose operands have known types.
+
+    Built by ``typecheck`` in place of the node, with the operation for
+    each operator picked ahead of time from ``UNCHECKED_OPS``, so values
+    are only boxed once, as ``type``. ``ops`` holds the operator and the
+    type of the result after each step, for the other backends.
+    """
+
+    def __init__(
+        self,
+        node: Node,
+        first: Any,
+        rest: list[tuple[str, Any]],
+        types: list[Type[Val]],
+    ):
+        self.first = first
+        self.rest = [
+            (UNCHECKED_OPS[result_type, op], operand)
+            for (op, operand), result_type in zip(rest, types)
+        ]
+        self.ops = [(op, result_type) for (op, _), result_type in zip(rest, types)]
+        self.type = types[-1]
+        self.col = node.col
+        self.varspace = node.varspace
+        self.callspace = node.callspace
+        self.line = node.line
+
+    def exec(self) -> Val:
+        return evaluate(self)
 
 
 class VarDefNode(Node):
+    # Cleared by typecheck when the value is known to have the declared type.
+    converts = True
+
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        # The statement is checked once, with any error raised when it runs.
+        self.var_name = ""
+        self.var_type: Type[Val] | None = None
+        self.error: str | None = None
+        try:
+            self.var_name, self.var_type = self._resolve()
+        except SyntaxError as e:
+            self.error = e.msg
 
-    def _exec_explicit(self):
+    def _target_explicit(self) -> tuple[str, Type[Val]]:
         if not isinstance(self.children[0], IdentNode):
             raise SyntaxError(
                 f"Invalid variable definition at line {self.line}, col {self.col}\n"
@@ -761,7 +1103,7 @@ class VarDefNode(Node):
         except KeyError:
             raise SyntaxError(
                 f"Invalid variable definition at line {self.line}, col {self.col}\n"
-                + f"{self.children[2]} is not a valid type.\n"
+                + f"{self.children[2].value} is not a valid type.\n"
             )
 
         if self.children[3] != "=":
@@ -770,26 +1112,9 @@ class VarDefNode(Node):
                 + "Expected '=' to specify value in variable definition.\n"
             )
 
-        var_val = self.children[4].exec()
-
-        if isinstance(var_val, Val):
-            var_val = var_val.value
-
-        try:
-            val = var_type(var_val)
-        except (TypeError, ValueError):
-            raise SyntaxError(
-                f"Invalid variable definition at line {self.line}, col {self.col}\n"
-                + f"Incompatible value for type {var_type}: {var_val}\n"
-            )
+        return var_name, var_type
 
-        self.varspace[var_name] = val
-        if var_name in self.callspace:
-            del self.callspace[var_name]
-
-        return val
-
-    def _exec_implicit(self):
+    def _target_implicit(self) -> tuple[str, None]:
         if not isinstance(self.children[0], IdentNode):
             raise SyntaxError(
                 f"Invalid variable definition at line {self.line}, col {self.col}\n"
@@ -810,11 +1135,36 @@ class VarDefNode(Node):
                 + "Expected '=' to specify value in variable definition.\n"
             )
 
-        value = self.children[3]
+        return var_name, None
+
+    def target(self) -> tuple[str, Type[Val] | None]:
+        """Check the definition and return the name and the declared type."""
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        return self.var_name, self.var_type
 
-        var_val = value.exec()
+    def _resolve(self) -> tuple[str, Type[Val] | None]:
+        if len(self.children) == 5:
+            return self._target_explicit()
 
-        if not isinstance(var_val, Val):
+        if len(self.children) == 4:
+            return self._target_implicit()
+
+        raise SyntaxError(
+            f"Invalid variable definition at line {self.line}, col {self.col}\n"
+            + f"Invalid variable definition at col {self.col}\n"
+        )
+
+    def exec(self):
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        var_name, var_type = self.var_name, self.var_type
+
+        var_val = self.children[-1].exec()
+
+        if var_type is not None and self.converts:
+            var_val = coerce(var_type, var_val, self.line, self.col)
+        elif not isinstance(var_val, Val):
             raise SyntaxError(
                 f"Invalid variable definition at line {self.line}, col {self.col}"
                 + f"Cannot infer type from '{self.children[3]}'\n"
@@ -826,36 +1176,37 @@ class VarDefNode(Node):
 
         return var_val
 
-    def exec(self):
-        if len(self.children) == 5:
-            return self._exec_explicit()
-
-        if len(self.children) == 4:
-            return self._exec_implicit()
-
-        raise SyntaxError(
-            f"Invalid variable definition at line {self.line}, col {self.col}\n"
-            + f"Invalid variable definition at col {self.col}\n"
-        )
-
 
 class VarSetNode(Node):
+    # Cleared by typecheck when the value is known to have the variable's type.
+    converts = True
+
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.var_name = ""
+        self.error: str | None = None
+        try:
+            self.var_name = self._resolve()
+        except SyntaxError as e:
+            self.error = e.msg
 
-    def exec(self):
+    def target(self) -> str:
+        """Check the reset and return the name of the variable."""
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        return self.var_name
+
+    def _resolve(self) -> str:
         if len(self.children) != 3:
             raise SyntaxError(
                 f"Invalid variable reset at line {self.line}, col {self.col}\n"
@@ -868,7 +1219,18 @@ class VarSetNode(Node):
                 + f"Variable reset must begin with an identifier, not {self.children[0]}.\n"
             )
 
-        var_name: str = self.children[0].value
+        if self.children[1] != "=":
+            raise SyntaxError(
+                f"Invalid variable reset at line {self.line}, col {self.col}\n"
+                + "Expected '=' to specify value in variable reset.\n"
+            )
+
+        return self.children[0].value
+
+    def exec(self):
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        var_name = self.var_name
 
         if var_name not in self.varspace:
             raise SyntaxError(
@@ -879,15 +1241,9 @@ class VarSetNode(Node):
 
         var_type = type(self.varspace[var_name])
 
-        if self.children[1] != "=":
-            raise SyntaxError(
-                f"Invalid variable reset at line {self.line}, col {self.col}\n"
-                + "Expected '=' to specify value in variable reset.\n"
-            )
-
         var_val = self.children[2].exec()
 
-        val = var_type(var_val.value)
+        val = var_type(var_val.value) if self.converts else var_val
 
         self.varspace[var_name] = val
 
@@ -897,20 +1253,30 @@ class VarSetNode(Node):
 class EchoNode(Node):
     def __init__(
         self,
-        node: dict[str, Any],
-        varspace: dict[str, Val],
+        node: AstNode,
+        varspace: Scope,
         callspace: dict[str, Callable],
+        children: list[Any],
     ):
-        self.children = node["children"]
-        for ii, child in enumerate(self.children):
-            child: dict[str, Any] | Any
-            self.children[ii] = Node.new_node(child, varspace, callspace)
-        self.col = node["col"]
+        self.children = children
+        self.col = node.col
         self.varspace = varspace
         self.callspace = callspace
-        self.line = node["line"]
+        self.line = node.line
+        self.expr: ExprNode | None = None
+        self.error: str | None = None
+        try:
+            self.expr = self._resolve()
+        except SyntaxError as e:
+            self.error = e.msg
 
-    def exec(self):
+    def expression(self) -> "ExprNode":
+        """Check the statement and return the echoed expression."""
+        if self.error is not None:
+            raise SyntaxError(self.error)
+        return self.expr
+
+    def _resolve(self) -> "ExprNode":
         if len(self.children) != 2:
             raise SyntaxError(
                 f"Invalid echo statement at line {self.line}, col {self.col}"
@@ -919,25 +1285,565 @@ class EchoNode(Node):
         if not isinstance(self.children[1], ExprNode):
             raise SyntaxError(f"Expected Expr at line {self.line}, col {self.col}")
 
-        expr = self.children[1].exec()
+        return self.children[1]
+
+    def exec(self):
+        expr = self.expression().exec()
 
         print(expr, flush=True)
 
         return expr
 
 
+# Calls nested deeper than this fail, as they would never return. Recursion
+# always fails without conditionals, and this bounds the memory it takes.
+MAX_CALL_DEPTH = 1000
+
+# The steps run by evaluate, each an opcode and its argument. Operands come
+# before their operator, and the arguments of a call before the call.
+PUSH = 0  # Push the argument, a value.
+LOAD = 1  # Push the value of a leaf node, from its bound exec method.
+BINARY = 2  # Apply a Val method to the last two values.
+UNBOX = 3  # Replace the last value with the number it holds.
+UNCHECKED = 4  # Apply an operation to the last two, which are numbers.
+BOX = 5  # Replace the last number with a value of the given type.
+STORE = 6  # Keep the last value as the result of a SubexprNode.
+LOOKUP = 7  # Push the callable of a CallNode.
+RAISE = 8  # Raise a SyntaxError with the given message.
+CALL = 9  # Call the callable before the arguments, given a CallNode and names.
+# As BINARY and UNCHECKED, for operations whose ints may grow large, given the
+# operation, the estimate of the size of its result and the node, see Budget.
+GROW = 10
+GROW_UNCHECKED = 11
+
+BINARY_STEPS = {
+    literals.OP_ADD: (BINARY, Val.add),
+    literals.OP_SUB: (BINARY, Val.sub),
+    literals.OP_MUL: (BINARY, Val.mul),
+    literals.OP_DIV: (BINARY, Val.div),
+    literals.OP_EXP: (BINARY, Val.exp),
+}
+# Estimates of the bits of the results of operators that multiply the size
+# of ints, rather than add to it.
+INT_GROWTH = {literals.OP_MUL: mul_bits, literals.OP_EXP: exp_bits}
+
+
+def binary_step(op: str, node: Node) -> tuple[int, Any]:
+    """Return the step applying an operator of a node to values."""
+    bits = INT_GROWTH.get(op)
+    if bits is None:
+        return BINARY_STEPS[op]
+    return (GROW, (BINARY_STEPS[op][1], bits, node))
+
+
+def build_steps(node: Node) -> list[tuple[int, Any]]:
+    """Flatten the expression below a node into the steps evaluating it.
+
+    The tree is walked with a list of the nodes and steps left to emit, so
+    expressions may be nested to any depth.
+    """
+    steps: list[tuple[int, Any]] = []
+    emit = steps.append
+    todo: list[Any] = [node]
+    pop = todo.pop
+    push = todo.append
+    while todo:
+        item = pop()
+        kind = type(item)
+        # Wrappers of a single node have no steps of their own.
+        while True:
+            if kind is AtomNode:
+                item = item.value
+            elif (kind is TermNode or kind is ExprNode) and not item.rest:
+                item = item.first
+            elif kind is FactorNode and not item.exponents:
+                item = item.base
+            else:
+                break
+            kind = type(item)
+
+        # What a node becomes is pushed in reverse, to come out in order.
+        if kind is IdentNode or kind is SubexprRefNode:
+            emit((LOAD, item.exec))
+        elif kind is IntNode or kind is NumNode:
+            emit((PUSH, item.exec()))
+        elif kind is tuple:
+            emit(item)
+        elif kind is TermNode or kind is ExprNode:
+            for op, operand in reversed(item.rest):
+                push(binary_step(op, item))
+                push(operand)
+            push(item.first)
+        elif kind is FactorNode:
+            for exponent in reversed(item.exponents):
+                push(binary_step(literals.OP_EXP, item))
+                push(exponent)
+            push(item.base)
+        elif kind is CallNode:
+            arglist: ArgListNode = item.children[2]
+            push((CALL, (item, tuple(arg_ident for arg_ident, _ in arglist.args))))
+            if arglist.error is not None:
+                # Reported once the arguments before it are evaluated.
+                push((RAISE, arglist.error))
+            for _, arg_expr in reversed(arglist.args):
+                push(arg_expr)
+            emit((LOOKUP, item))
+        elif kind is UncheckedNode:
+            push((BOX, item.type))
+            for (operation, operand), (op, result_type) in reversed(
+                list(zip(item.rest, item.ops))
+            ):
+                if result_type is Int and op in INT_GROWTH:
+                    push((GROW_UNCHECKED, (operation, INT_GROWTH[op], item)))
+                else:
+                    push((UNCHECKED, operation))
+                push(operand)
+            push((UNBOX, None))
+            push(item.first)
+        elif kind is SubexprNode:
+            push((STORE, item))
+            push(item.value)
+        else:
+            emit((LOAD, item.exec))
+    return steps
+
+
+# How deep evaluate_once recurses before evaluating nodes from their steps.
+ONCE_DEPTH = 64
+
+OPERATIONS = {op: operation for op, (_, operation) in BINARY_STEPS.items()}
+
+
+def evaluate_once(node: Node, depth: int) -> Val:
+    """Evaluate an expression by recursing, without building its steps.
+
+    Cheaper than building steps for code evaluated once, as most top level
+    statements are. Calls and nodes below ``ONCE_DEPTH`` are evaluated from
+    their steps, so the recursion is bounded.
+    """
+    kind = type(node)
+    if kind is IdentNode or kind is IntNode or kind is NumNode:
+        return node.exec()
+    if depth < ONCE_DEPTH:
+        depth += 1
+        if kind is AtomNode:
+            return evaluate_once(node.value, depth)
+        if kind is TermNode or kind is ExprNode:
+            value = evaluate_once(node.first, depth)
+            for op, operand in node.rest:
+                value = OPERATIONS[op](value, evaluate_once(operand, depth))
+            return value
+        if kind is FactorNode:
+            value = evaluate_once(node.base, depth)
+            for exponent in node.exponents:
+                value = value.exp(evaluate_once(exponent, depth))
+            return value
+        if kind is UncheckedNode:
+            number = evaluate_once(node.first, depth).value
+            for operation, operand in node.rest:
+                number = operation(number, evaluate_once(operand, depth).value)
+            return node.type(number)
+        if kind is SubexprNode:
+            node.result = evaluate_once(node.value, depth)
+            return node.result
+        if kind is SubexprRefNode:
+            return node.exec()
+    node.evaluated = True
+    return evaluate(node)
+
+
+def evaluate(node: Node) -> Val:
+    """Evaluate an expression without recursing, whatever its depth.
+
+    A node is first evaluated with ``evaluate_once``, and its steps are
+    built when it is evaluated again, and then run with a stack of values. A call runs the steps of the body in place, as
+    ``Callable.call`` would, keeping what it needs to return in a list of
+    frames instead of on the Python stack.
+
+    The steps of the node and of each body called are spent from the
+    ``Budget`` of the scope, if any, before they run.
+    """
+    budget: Budget | None = node.varspace.budget
+    steps = node.steps
+    if steps is None:
+        if not node.evaluated and budget is None:
+            node.evaluated = True
+            return evaluate_once(node, 0)
+        steps = node.steps = build_steps(node)
+    if budget is not None:
+        budget.spend(len(steps), node.line, node.col)
+    if len(steps) == 1:
+        # A single value needs no stack.
+        op, arg = steps[0]
+        if op == PUSH:
+            return arg
+        if op == LOAD:
+            return arg()
+
+    stack: list[Any] = []
+    push = stack.append
+    pop = stack.pop
+    frames: list[tuple] = []
+    remaining = iter(steps)
+    try:
+        while True:
+            for op, arg in remaining:
+                if op == LOAD:
+                    push(arg())
+                elif op == BINARY:
+                    value = pop()
+                    stack[-1] = arg(stack[-1], value)
+                elif op == GROW:
+                    value = pop()
+                    if budget is not None:
+                        _, bits, at = arg
+                        budget.check_int(
+                            bits(stack[-1].value, value.value), at.line, at.col
+                        )
+                    stack[-1] = arg[0](stack[-1], value)
+                elif op == PUSH:
+                    push(arg)
+                elif op == UNCHECKED:
+                    value = pop().value
+                    stack[-1] = arg(stack[-1], value)
+                elif op == GROW_UNCHECKED:
+                    value = pop().value
+                    if budget is not None:
+                        _, bits, at = arg
+                        budget.check_int(bits(stack[-1], value), at.line, at.col)
+                    stack[-1] = arg[0](stack[-1], value)
+                elif op == UNBOX:
+                    stack[-1] = stack[-1].value
+                elif op == BOX:
+                    stack[-1] = arg(stack[-1])
+                elif op == STORE:
+                    arg.result = stack[-1]
+                elif op == LOOKUP:
+                    push(arg.lookup())
+                elif op == RAISE:
+                    raise SyntaxError(arg)
+                elif op == CALL:
+                    call_node, names = arg
+                    count = len(names)
+                    if count:
+                        params = dict(zip(names, stack[-count:]))
+                        del stack[-count:]
+                    else:
+                        params = {}
+                    callable_: Callable = pop()
+                    checked = call_node.checked
+                    if checked:
+                        check_params(callable_.name, callable_.type, params)
+                    if len(frames) >= MAX_CALL_DEPTH:
+                        raise SyntaxError(
+                            "Maximum recursion depth reached during call.\n"
+                            + f"In call '{call_node.name}' at line "
+                            + f"{call_node.line}, col {call_node.col}."
+                        )
+
+                    definition = callable_.definition
+                    scope: Scope = definition.varspace
+                    outer = scope.frame
+                    caller = call_node.varspace.frame
+                    scope.frame = {**caller, **params} if caller else params
+
+                    key = None
+                    cache = callable_.cache
+                    if cache is not None and cache.reads is not None:
+                        key = callcache.key(
+                            None if value is None else value.value
+                            for value in map(scope.lookup, cache.reads)
+                        )
+                        value = cache.get(key)
+                        if value is not None:
+                            scope.frame = outer
+                            push(value)
+                            continue
+
+                    frames.append((remaining, scope, outer, callable_, checked, key))
+                    body_steps = definition.steps
+                    if body_steps is None:
+                        body_steps = definition.steps = build_steps(definition)
+                    if budget is not None:
+                        budget.spend(len(body_steps), call_node.line, call_node.col)
+                    remaining = iter(body_steps)
+                    break
+                else:
+                    raise ValueError(f"Unknown step: {op}\n")
+            else:
+                # The steps are done, so return from the call, if in one.
+                if not frames:
+                    return stack[-1]
+                remaining, scope, outer, callable_, checked, key = frames.pop()
+                scope.frame = outer
+                if key is not None:
+                    value = callable_.type.return_type(stack[-1].value)
+                    callable_.cache.store(key, value)
+                    stack[-1] = value
+                elif checked:
+                    stack[-1] = callable_.type.return_type(stack[-1].value)
+    finally:
+        # Leave the calls left by an error.
+        while frames:
+            _, scope, outer, _, _, _ = frames.pop()
+            scope.frame = outer
+
+
+def resolve_names(
+    ast: Iterable[AstNode | dict[str, Any]],
+    variables: Iterable[str],
+    callables: Iterable[str],
+) -> Iterator[AstNode]:
+    """Yield top level statements, checking the names they use first.
+
+    A statement using a variable or callable that is neither in
+    ``variables`` and ``callables`` nor defined by an earlier statement
+    raises the error running it would, before it is yielded. Bodies see the
+    names of their callers, so are only checked when called. The check
+    walks the statements as parsed, without building nodes.
+    """
+    variables = set(variables)
+    callables = set(callables)
+    for statement in ast:
+        if isinstance(statement, dict):
+            statement = AstNode.from_dict(statement)
+        kind = statement.type
+        todo: list[Any] = []
+        if kind in ("vardef", "varset", "echo"):
+            todo.append(statement.children[-1])
+        elif kind not in ("callable_def", "paramlist", "callable", "newline"):
+            todo.append(statement)
+        # The name a definition or reset is of, if any.
+        target = statement.children[0] if kind != "echo" else None
+        if (
+            kind == "varset"
+            and isinstance(target, AstNode)
+            and target.children not in variables
+        ):
+            raise SyntaxError(
+                f"Invalid variable reset at line {statement.line}, "
+                + f"col {statement.col}\n"
+                + "Can only reset variable reset it's been defined.\n"
+                + f"{target.children} has not yet been defined.\n"
+            )
+
+        # Names are checked in the order they are evaluated. Below a
+        # statement, only the callable of a call and the names of arguments
+        # are identifiers that are not variables.
+        while todo:
+            node = todo.pop()
+            if type(node) is not AstNode:
+                continue
+            kind = node.type
+            if kind == "ident":
+                if node.children not in variables:
+                    raise SyntaxError(
+                        f"Variable {node.children} at line {node.line}, "
+                        + f"col {node.col} is not yet defined.\n"
+                    )
+            elif kind == "call":
+                name = node.children[0]
+                if type(name) is AstNode and name.children not in callables:
+                    raise SyntaxError(
+                        f"Invalid call at line {node.line}, col {node.col}."
+                        + f"callable {name.children} has not yet been defined."
+                    )
+                todo.extend(reversed(node.children[1:]))
+            elif kind == "arglist":
+                todo.extend(reversed(node.children[2::4]))
+            elif type(node.children) is list:
+                todo.extend(reversed(node.children))
+
+        kind = statement.type
+        if kind == "vardef" and isinstance(target, AstNode):
+            variables.add(target.children)
+        elif kind == "callable_def" and isinstance(target, AstNode):
+            callables.add(target.children)
+        yield statement
+
+
+BACKENDS = ("tree", "vm", "python")
+DEFAULT_BACKEND = "tree"
+
+
 class Executor:
-    def __init__(self):
-        self.globals: dict[str, Val] = {}
-        self.callables: dict[str, Callable] = {}
-
-    def exec(self, ast: list[dict[str, Any]]):
-        rv = None
-        for ast_node in ast:
-            node = Node.new_node(ast_node, self.globals, self.callables)
-            if isinstance(node, str):
-                raise SyntaxError(f"{node} cannot be executed.")
-            if node is not None:
-                rv = node.exec()
+    def __init__(
+        self, backend: str | None = None, cse: bool = False, unchecked: bool = False
+    ):
+        if backend is None:
+            backend = DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported executor backend: {backend}\n")
+
+        self.backend = backend
+        self.globals: MutableMapping[str, Val] = {}
+        self.callables: MutableMapping[str, Any] = {}
+        self.vm = None
+        self.python = None
+        if backend == "vm":
+            # Imported here as the vm module builds on this one.
+            import vm
+
+            # The vm keeps values in slots, which also map names to values.
+            self.vm = vm.VM()
+            self.globals = self.vm.variables
+            self.callables = self.vm.callables
+        elif backend == "python":
+            # Imported here as the transpile module builds on this one.
+            import transpile
+
+            # Callables stay interpreted ones, which the program translates.
+            self.python = transpile.Program(self.callables)
+            self.globals = self.python.variables
+        self.scope = Scope(self.globals)
+        # The result caches of callables by name, see cache_calls.
+        self.call_caches: dict[str, callcache.CallCache] = {}
+        self.eliminator = None
+        if cse:
+            # Imported here as the optimize module builds on this one.
+            import optimize
+
+            self.eliminator = optimize.SubexpressionEliminator()
+        self.checker = None
+        if unchecked:
+            # Imported here as the typecheck module builds on this one.
+            import typecheck
+
+            self.checker = typecheck.TypeChecker()
+
+    def cache_calls(self, name: str, size: int = callcache.DEFAULT_SIZE):
+        """Cache the results of the callable with the given name.
+
+        The cache applies to the callable currently defined with that name,
+        if any, and to later definitions, and keeps its statistics when the
+        callable is redefined. It holds up to ``size`` results, evicting the
+        least recently used.
+        """
+        self.call_caches[name] = callcache.CallCache(size)
+        self._reset_call_caches()
+
+    def call(self, name: str, params: dict[str, Val]) -> Val:
+        """Call a callable from top level with the given arguments."""
+        if name not in self.callables:
+            raise SyntaxError(f"Callable {name} has not yet been defined.\n")
+        if self.checker is not None:
+            try:
+                self.checker.check_call(name, params, self.globals, self.callables)
+            except (SyntaxError, RecursionError):
+                # Run checked, as rewritten bodies rely on the declared types.
+                for node in self.checker.restore():
+                    self._exec_node(node, False)
+        callable_ = self.callables[name]
+        if self.vm is not None:
+            return self.vm.call(callable_, params)
+        if self.python is not None:
+            return self.python.call(callable_, params)
+        return callable_.call(params)
+
+    def call_batch(self, name: str, **arrays: Any) -> Any:
+        """Call a callable over NumPy arrays of arguments, returning an array.
+
+        Arrays are broadcast against each other, and an array of ``int``
+        or ``num`` values holds ``Int`` or ``Num`` arguments. The body is
+        evaluated once with vectorized operations where possible, and once
+        per element otherwise, see the ``batch`` module. Requires NumPy.
+        """
+        # Imported here as NumPy is only needed for batches.
+        import batch
+
+        return batch.call_batch(self, name, **arrays)
+
+    def _reset_call_caches(self):
+        # Which names a call reads depends on all the callables it may call.
+        for name, cache in self.call_caches.items():
+            callable_ = self.callables.get(name)
+            if callable_ is None:
+                cache.reset(None)
+                continue
+            callable_.cache = cache
+            reads = callcache.read_names(callable_, self.callables)
+            if reads is not None and self.vm is not None:
+                reads = tuple(self.vm.variables.slot(name) for name in reads)
+            cache.reset(reads)
+        if self.python is not None:
+            # Cached callables are generated with their cache.
+            self.python.define()
+
+    def _new_node(self, ast_node: AstNode | dict[str, Any]) -> Node | None:
+        node = Node.new_node(ast_node, self.scope, self.callables)
+        if isinstance(node, str):
+            raise SyntaxError(f"{node} cannot be executed.")
+        if node is not None and self.eliminator is not None:
+            try:
+                self.eliminator.eliminate(node)
+            except RecursionError:
+                raise nesting_error(node.line, node.col) from None
+        return node
+
+    def exec(
+        self,
+        ast: Iterable[AstNode | dict[str, Any]],
+        max_steps: int | None = None,
+        max_seconds: float | None = None,
+        max_int_bits: int | None = None,
+    ):
+        """Execute top level statements in order.
+
+        Names used by top level code are checked before running the
+        statements, see ``resolve_names``. ``ast`` may also be a generator
+        such as ``parse.Parser.parse_stream``, in which case each statement
+        is checked and runs as soon as it has been parsed. An unchecked
+        executor also checks the types of each statement before it runs,
+        see ``typecheck``, and runs those it cannot prove checked.
+
+        The limits bound the work of all the statements together, see
+        ``Budget``. Going over one raises LimitExceeded, and the statement
+        running has no effect, as for any error. The python backend
+        interprets statements while limits are set.
+        """
+        budget = None
+        if max_steps is not None or max_seconds is not None or max_int_bits is not None:
+            budget = Budget(max_steps, max_seconds, max_int_bits)
+        statements: Iterable[AstNode] = resolve_names(ast, self.globals, self.callables)
+        if not isinstance(ast, Iterator):
+            # Unlike a stream, the whole input is checked before running.
+            statements = list(statements)
+        nodes: Iterable[Node | None] = map(self._new_node, statements)
+        if self.checker is not None:
+            nodes = self.checker.check_all(nodes, self.globals, self.callables)
+
+        self.scope.budget = budget
+        if self.vm is not None:
+            self.vm.budget = budget
+        try:
+            rv = None
+            for node in nodes:
+                if node is not None:
+                    rv = self._exec_node(node, budget is not None)
+        finally:
+            self.scope.budget = None
+            if self.vm is not None:
+                self.vm.budget = None
+
+        return rv
 
+    def _exec_node(self, node: Node, interpret: bool) -> Any:
+        redefines = self.call_caches and (
+            isinstance(node, CallableDefNode)
+            or isinstance(node, VarDefNode)
+            and node.target()[0] in self.callables
+        )
+        try:
+            if self.vm is not None:
+                rv = self.vm.exec(node)
+            elif self.python is not None:
+                # Generated code cannot check limits as it runs.
+                rv = self.python.exec(node, interpret=interpret)
+            else:
+                rv = node.exec()
+        except RecursionError:
+            # Such as compiling a statement for the vm, which recurses.
+            raise nesting_error(node.line, node.col) from None
+        if redefines:
+            self._reset_call_caches()
         return rv
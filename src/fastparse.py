@@ -0,0 +1,474 @@
+"""Module providing a hand-written tokenizer and parser backend.
+
+The grammar mirrors the pyparsing grammar in ``parse.Parser`` and produces
+the same AST, but the input is tokenized in a single regex pass and
+expressions are parsed with an explicit stack instead of combinator
+backtracking, so nesting is not limited by the Python stack. ``echo`` is
+treated as a keyword, so identifiers that merely start with ``echo`` are
+ordinary identifiers.
+"""
+
+import re
+from typing import Any
+
+import pyparsing as pp
+
+import literals
+from astnode import AstNode, gc_paused
+
+# Leading blanks are folded into every match, so each match is one token.
+_TOKEN_RE = re.compile(
+    r"[ \t]*(?:"
+    r"(?P<newline>\n)"
+    r"|(?P<num>\d+(?:\.\d*|[eE][+-]?\d+))"
+    r"|(?P<int>[0-9]+)"
+    r"|(?P<echo>echo(?![_a-zA-Z0-9]))"
+    r"|(?P<ident>[_a-zA-Z][_a-zA-Z0-9]*)"
+    r"|(?P<punct>[-+*/^()=:,])"
+    r")"
+)
+
+EOF = "eof"
+
+# The operators of expressions and terms, which nest to the left, unlike
+# the ``^`` of factors.
+_ADDS = (literals.OP_ADD, literals.OP_SUB)
+_MULS = (literals.OP_MUL, literals.OP_DIV)
+# The rules parsed by ``FastParser._expression``, by level.
+_LEVELS = ("expr", "term", "factor", "atom")
+
+Token = tuple[str, str, int, int, int, int]
+
+
+def tokenize(input_str: str) -> list[Token]:
+    """Split the input into (kind, text, start, end, line, col) tokens.
+
+    Punctuation tokens use their own text as their kind. Lines and columns
+    are tracked while scanning and agree with ``source.SourceFile``. The
+    list always ends with an EOF token.
+    """
+    tokens: list[Token] = []
+    append = tokens.append
+    line = 1
+    line_start = 0
+    position = 0
+
+    for found in _TOKEN_RE.finditer(input_str):
+        if found.start() != position:
+            break
+
+        kind = found.lastgroup
+        start, position = found.span(kind)
+        text = found[kind]
+        if kind == "punct":
+            kind = text
+        append((kind, text, start, position, line, start - line_start + 1))
+        if kind == "newline":
+            line += 1
+            line_start = position
+
+    rest = input_str[position:].lstrip(" \t")
+    if rest:
+        position = len(input_str) - len(rest)
+        raise pp.ParseException(
+            input_str, position, f"Unexpected character {rest[0]!r}"
+        )
+
+    end = len(input_str)
+    append((EOF, "", end, end, line, end - line_start + 1))
+
+    return tokens
+
+
+class FastParser:
+    """Parser over the output of ``tokenize``.
+
+    Statements are parsed by descent, and expressions by ``_expression``.
+    """
+
+    def __init__(self):
+        self.input_str = ""
+        self.tokens: list[Token] = []
+        self.index = 0
+
+        self.rules = {
+            "int": self.int,
+            "num": self.num,
+            "ident": self.ident,
+            "newline": self.newline,
+            "atom": self.atom,
+            "factor": self.factor,
+            "term": self.term,
+            "expr": self.expr,
+            "paramlist": self.paramlist,
+            "callable": self.callable,
+            "callable_def": self.callable_def,
+            "arglist": self.arglist,
+            "call": self.call,
+            "var_def": self.var_def,
+            "var_set": self.var_set,
+            "echo": self.echo,
+        }
+
+    def _reset(self, input_str: str):
+        self.input_str = input_str
+        self.tokens = tokenize(input_str)
+        self.index = 0
+
+    def _fail(self, expected: str):
+        token = self.tokens[self.index]
+        found = "end of text" if token[0] == EOF else repr(token[1])
+        raise pp.ParseException(
+            self.input_str, token[2], f"Expected {expected}, found {found}"
+        )
+
+    def _expect(self, kind: str) -> str:
+        token = self.tokens[self.index]
+        if token[0] != kind:
+            self._fail(repr(kind))
+        self.index += 1
+        return token[1]
+
+    def _peek(self, offset: int = 0) -> str:
+        index = min(self.index + offset, len(self.tokens) - 1)
+        return self.tokens[index][0]
+
+    def _node(self, node_type: str, children: Any, token: Token):
+        """Build a node from its first token up to the last consumed token."""
+        start = token[2]
+        end = self.tokens[self.index - 1][3] if self.index else start
+        return AstNode(node_type, children, token[4], token[5], start, max(start, end))
+
+    def _leaf(self, kind: str) -> AstNode:
+        token = self.tokens[self.index]
+        if token[0] != kind:
+            self._fail(kind)
+        self.index += 1
+        return self._node(kind, token[1], token)
+
+    def _signed(self, kind: str) -> AstNode:
+        """Parse a numeric literal, folding in a directly adjacent sign."""
+        token = self.tokens[self.index]
+        if token[0] in (literals.OP_ADD, literals.OP_SUB):
+            number = self.tokens[self.index + 1]
+            if number[0] != kind or number[2] != token[3]:
+                self._fail(kind)
+            self.index += 2
+            return self._node(kind, token[1] + number[1], token)
+        return self._leaf(kind)
+
+    def int(self):
+        return self._signed("int")
+
+    def num(self):
+        return self._signed("num")
+
+    def ident(self):
+        return self._leaf("ident")
+
+    def newline(self):
+        return self._leaf("newline")
+
+    def _expression(self, level: int) -> AstNode:
+        """Parse the rule at the given level of ``_LEVELS``.
+
+        Parentheses and arguments are parsed with an explicit stack rather
+        than by recursion, so nesting is only limited by memory. A factor
+        keeps its atoms until it ends, then nests them right to left.
+        """
+        tokens = self.tokens
+        # The parentheses and calls around the expression being parsed,
+        # innermost last, each with the state of the expression holding it.
+        enclosing: list[list[Any]] = []
+        # The first token and children of the expression being parsed, of
+        # its last term, and the atoms of its last factor with their tokens.
+        expr_token = term_token = tokens[self.index]
+        expr_children: list[Any] = []
+        term_children: list[Any] = []
+        atoms: list[AstNode] = []
+        atom_tokens: list[Token] = []
+        atom: AstNode | None = None
+        atom_token = expr_token
+        atom_level = len(_LEVELS) - 1
+        node = self._node
+
+        while True:
+            try:
+                if atom is None:
+                    atom_token = tokens[self.index]
+                    kind = atom_token[0]
+                    if kind == literals.L_PAREN or (
+                        kind == "ident"
+                        and tokens[self.index + 1][0] == literals.L_PAREN
+                    ):
+                        state = (
+                            level,
+                            expr_token,
+                            expr_children,
+                            term_token,
+                            term_children,
+                            atoms,
+                            atom_tokens,
+                        )
+                        if kind == "ident":
+                            call = [self.index, state, atom_token]
+                            enclosing.append(call)
+                            call.append([self.ident(), self._expect(literals.L_PAREN)])
+                            call.append(tokens[self.index])
+                            call.append([])
+                            atom = self._argument(call)
+                            if atom is not None:
+                                enclosing.pop()
+                        else:
+                            self.index += 1
+                            enclosing.append([None, state, atom_token])
+                        if atom is None:
+                            level = 0
+                            expr_token = term_token = tokens[self.index]
+                            expr_children, term_children = [], []
+                            atoms, atom_tokens = [], []
+                            continue
+                    elif kind == "ident" or kind == "num" or kind == "int":
+                        atom = node("atom", [self._leaf(kind)], atom_token)
+                    elif kind in (literals.OP_ADD, literals.OP_SUB):
+                        kind = "num" if self._peek(1) == "num" else "int"
+                        atom = self._node("atom", [self._signed(kind)], atom_token)
+                    else:
+                        self._fail("atom")
+
+                if level == atom_level:
+                    value = atom
+                else:
+                    kind = tokens[self.index][0]
+                    if kind == literals.OP_EXP:
+                        atoms.append(atom)
+                        atom_tokens.append(atom_token)
+                        atom = None
+                        self.index += 1
+                        continue
+                    value = node("factor", [atom], atom_token)
+                    atom = None
+                    if atoms:
+                        for index in range(len(atoms) - 1, -1, -1):
+                            value = node(
+                                "factor",
+                                [atoms[index], literals.OP_EXP, value],
+                                atom_tokens[index],
+                            )
+                        atoms, atom_tokens = [], []
+                    if level < 2:
+                        term_children.append(value)
+                        if kind in _MULS:
+                            term_children.append(kind)
+                            self.index += 1
+                            continue
+                        value = node("term", term_children, term_token)
+                        if level < 1:
+                            expr_children.append(value)
+                            if kind in _ADDS:
+                                expr_children.append(kind)
+                                self.index += 1
+                                term_token = tokens[self.index]
+                                term_children = []
+                                continue
+                            value = node("expr", expr_children, expr_token)
+
+                # The expression has ended, and with it what encloses it.
+                if not enclosing:
+                    return value
+                outer = enclosing.pop()
+                (
+                    level,
+                    expr_token,
+                    expr_children,
+                    term_token,
+                    term_children,
+                    atoms,
+                    atom_tokens,
+                ) = outer[1]
+                atom_token = outer[2]
+                if outer[0] is None:
+                    self._expect(literals.R_PAREN)
+                    atom = self._node(
+                        "atom",
+                        [literals.L_PAREN, value, literals.R_PAREN],
+                        atom_token,
+                    )
+                    continue
+                outer[5].append(value)
+                enclosing.append(outer)
+                atom = self._argument(outer)
+                if atom is None:
+                    level = 0
+                    expr_token = term_token = tokens[self.index]
+                    expr_children, term_children = [], []
+                    atoms, atom_tokens = [], []
+                else:
+                    enclosing.pop()
+            except pp.ParseException:
+                # What follows an identifier is only a call if it parses as
+                # one, like the pyparsing grammar, which backtracks.
+                calls = [i for i, outer in enumerate(enclosing) if outer[0] is not None]
+                if not calls:
+                    raise
+                outer = enclosing[calls[-1]]
+                del enclosing[calls[-1] :]
+                (
+                    level,
+                    expr_token,
+                    expr_children,
+                    term_token,
+                    term_children,
+                    atoms,
+                    atom_tokens,
+                ) = outer[1]
+                self.index = outer[0]
+                atom_token = outer[2]
+                atom = self._node("atom", [self.ident()], atom_token)
+
+    def _argument(self, call: list[Any]) -> AstNode | None:
+        """Continue the arguments of a call, after the last one parsed.
+
+        Returns None if another argument follows, up to its expression, or
+        else the atom holding the whole call.
+        """
+        _, _, token, children, arglist_token, args = call
+        if args:
+            if self._peek() != ",":
+                return self._end_call(token, children, arglist_token, args)
+            args.append(self._expect(","))
+        if self._peek() != "ident":
+            return self._end_call(token, children, arglist_token, args)
+        args.append(self.ident())
+        args.append(self._expect("="))
+        return None
+
+    def _end_call(
+        self, token: Token, children: list[Any], arglist_token: Token, args: list[Any]
+    ) -> AstNode:
+        children.append(self._node("arglist", args, arglist_token))
+        children.append(self._expect(literals.R_PAREN))
+        return self._node("atom", [self._node("call", children, token)], token)
+
+    def atom(self):
+        return self._expression(3)
+
+    def factor(self):
+        return self._expression(2)
+
+    def term(self):
+        return self._expression(1)
+
+    def expr(self):
+        return self._expression(0)
+
+    def paramlist(self):
+        token = self.tokens[self.index]
+        children: list[Any] = []
+        while self._peek() == "ident":
+            children.append(self.ident())
+            children.append(self._expect(":"))
+            children.append(self.ident())
+            if self._peek() != ",":
+                break
+            children.append(self._expect(","))
+        return self._node("paramlist", children, token)
+
+    def callable(self):
+        token = self.tokens[self.index]
+        children = [
+            self.ident(),
+            self._expect(literals.L_PAREN),
+            self.paramlist(),
+            self._expect(literals.R_PAREN),
+        ]
+        return self._node("callable", children, token)
+
+    def callable_def(self):
+        token = self.tokens[self.index]
+        children = [
+            self.ident(),
+            self._expect(":"),
+            self.callable(),
+            self._expect("="),
+            self.expr(),
+        ]
+        return self._node("callable_def", children, token)
+
+    def arglist(self):
+        token = self.tokens[self.index]
+        children: list[Any] = []
+        while self._peek() == "ident":
+            children.append(self.ident())
+            children.append(self._expect("="))
+            children.append(self.expr())
+            if self._peek() != ",":
+                break
+            children.append(self._expect(","))
+        return self._node("arglist", children, token)
+
+    def call(self):
+        token = self.tokens[self.index]
+        children = [
+            self.ident(),
+            self._expect(literals.L_PAREN),
+            self.arglist(),
+            self._expect(literals.R_PAREN),
+        ]
+        return self._node("call", children, token)
+
+    def var_def(self):
+        token = self.tokens[self.index]
+        children: list[Any] = [self.ident(), self._expect(":")]
+        if self._peek() == "ident":
+            children.append(self.ident())
+        children.append(self._expect("="))
+        children.append(self.expr())
+        return self._node("vardef", children, token)
+
+    def var_set(self):
+        token = self.tokens[self.index]
+        children = [self.ident(), self._expect("="), self.expr()]
+        return self._node("varset", children, token)
+
+    def echo(self):
+        token = self.tokens[self.index]
+        children = [self._expect("echo"), self.expr()]
+        return self._node("echo", children, token)
+
+    def statement(self) -> AstNode:
+        """Pick the statement kind from the leading tokens."""
+        kind = self._peek()
+        if kind == "newline":
+            return self.newline()
+        if kind == "echo":
+            return self.echo()
+        if kind == "ident":
+            follow = self._peek(1)
+            if follow == ":":
+                if self._peek(2) == "ident" and self._peek(3) == literals.L_PAREN:
+                    return self.callable_def()
+                return self.var_def()
+            if follow == "=":
+                return self.var_set()
+        return self.expr()
+
+    def parse(self, input_str: str) -> list[AstNode]:
+        """Parse a whole program into a list of top level nodes."""
+        self._reset(input_str)
+        tokens = self.tokens
+        statements: list[AstNode] = []
+
+        with gc_paused():
+            while tokens[self.index][0] != EOF:
+                statements.append(self.statement())
+
+        return statements
+
+    def parse_rule(self, rule: str, input_str: str) -> Any:
+        """Parse the whole input as a single grammar rule."""
+        self._reset(input_str)
+        result = self.rules[rule]()
+        if self.tokens[self.index][0] != EOF:
+            self._fail("end of text")
+        return result
@@ -3,6 +3,7 @@ from typing import Any
 
 from lsprotocol import types as lsp
 import pygls.server
+import pyparsing.exceptions
 
 import parse
 
@@ -34,7 +35,33 @@ class Module:
     def __init__(self, name: str, content: str):
         self.name = name
         self.content = content
-        self.ast = parser.parse(content)
+        self.diagnostics: list[lsp.Diagnostic] = []
+        try:
+            self.ast = parser.parse(content)
+            self.source = parser.source
+        except pyparsing.exceptions.ParseBaseException as e:
+            self.ast = []
+            self.source = parser.source
+            self.error(e.loc, e.msg)
+        except SyntaxError as e:
+            # Such as nesting too deep to parse, which has no position.
+            self.ast = []
+            self.source = parser.source
+            self.error(0, str(e).strip())
+
+    def error(self, offset: int, message: str):
+        position = self.position(offset)
+        self.diagnostics.append(
+            lsp.Diagnostic(
+                range=lsp.Range(start=position, end=position),
+                message=message,
+                severity=lsp.DiagnosticSeverity.Error,
+            )
+        )
+
+    def position(self, offset: int) -> lsp.Position:
+        line, col = self.source.location(offset)
+        return lsp.Position(line=line - 1, character=col - 1)
 
 
 log("created server feature")
@@ -47,6 +74,7 @@ def load_new(params: lsp.DidOpenTextDocumentParams):
     log("Opened File: " + file_uri_to_path(uri))
     log(text)
     modules[uri] = Module(uri, text)
+    server.publish_diagnostics(uri, modules[uri].diagnostics)
 
 
 @server.feature(
@@ -0,0 +1,668 @@
+"""Module providing optimization passes over the abstract syntax tree.
+
+``ConstantFolder`` evaluates subtrees made only of literals ahead of time,
+with the ``Int`` and ``Num`` arithmetic of ``execute``, so ``(3 + 3) ^ 2``
+runs as ``36``. Only operations that cannot change a result are rewritten:
+
+- a literal prefix of an expression or term is folded, as in ``2 * 3 * a``,
+  but ``a * 2 * 3`` is kept since ``(a * 2) * 3`` may round differently
+  from ``a * 6`` for a ``num``;
+- ``x * 1``, ``1 * x``, ``x ^ 1`` and ``x - 0`` become ``x`` for an ``int``
+  literal, which keeps the type of ``x``. ``x + 0`` and ``x / 1`` are kept,
+  as they turn ``-0.`` into ``0.`` and round large ``int`` values;
+- parentheses around a single atom, as in ``(a)``, are removed.
+
+An operation that raises, such as ``1 / 0``, is left in place to fail when
+it runs, and so are powers of ``int`` values too large to compute eagerly.
+
+``Inliner`` replaces calls to small callables in top level statements with
+their bodies, the parameters replaced by the arguments, so ``f(a=x)`` runs
+as ``(x * x)`` for ``f: int(a: int) = a * a``. Statements are inlined in
+the order they run in, against the callables defined at that point, so a
+redefinition applies to the calls after it. A call is only inlined when
+that cannot change what it does:
+
+- each argument is a literal or a variable defined by an earlier
+  statement, so it cannot fail and evaluating it where the parameter is
+  used gives the same value;
+- every call left in the body is inlined too, and none of them reads a
+  parameter of a callable it is inlined into, which a call would see;
+- a body of a ``num`` callable that may be an ``int`` is multiplied by
+  ``1.``, which converts it as the return type would. A body of an
+  ``int`` callable must be an ``int``, as no expression truncates a
+  ``num``.
+
+Bodies of callables are not inlined into, as the callables they call may
+be redefined before they run.
+
+``SubexpressionEliminator`` works on the nodes built by
+``execute.Node.new_node`` instead, just before a statement runs. Within one
+statement or callable body every name has one value, and evaluating an
+expression has no effect besides its value or its error, so structurally
+identical operations, such as the two ``(a + b)`` in ``(a + b) * (a + b)``,
+give the same value. Each repeated operation is evaluated once, where it
+first runs, into an ``execute.SubexprNode``, and read back by the later
+copies. The first copy fails exactly where the original would, so errors
+are unchanged. Operations are keyed by hash-consing: each distinct
+structure gets a small ``int`` id, and an operation is keyed on the ids of
+its operands, so keys are compared in constant time.
+"""
+
+import copy
+from typing import Any, Iterable, Iterator
+
+import execute
+import literals
+from astnode import AstNode
+
+# Powers of int literals with larger results are left to run time.
+MAX_FOLDED_BITS = 4096
+# Callables with larger bodies are not inlined.
+MAX_INLINED_NODES = 32
+
+
+def count_nodes(node: AstNode) -> int:
+    """Return the number of nodes in the tree below and including ``node``."""
+    if isinstance(node.children, str):
+        return 1
+    return 1 + sum(
+        count_nodes(child) for child in node.children if isinstance(child, AstNode)
+    )
+
+
+def literal_value(node: AstNode) -> execute.Val | None:
+    """Return the value of an atom, factor, term or expr holding one literal."""
+    while node.type in ("expr", "term", "factor", "atom"):
+        if len(node.children) != 1:
+            return None
+        node = node.children[0]
+    if node.type == "int":
+        return execute.Int(int(node.children))
+    if node.type == "num":
+        return execute.Num(float(node.children))
+    return None
+
+
+def is_int_literal(node: AstNode, value: int) -> bool:
+    literal = literal_value(node)
+    return isinstance(literal, execute.Int) and literal.value == value
+
+
+def wrap(node: AstNode, node_type: str, pos: AstNode) -> AstNode:
+    """Wrap ``node`` in the nodes leading down to it from ``node_type``."""
+    for wrapper in ("atom", "factor", "term", "expr"):
+        node = AstNode(wrapper, [node], pos.line, pos.col, pos.start, pos.end)
+        if wrapper == node_type:
+            return node
+    raise ValueError(f"Cannot wrap a value in {node_type}\n")
+
+
+def literal_node(
+    value: execute.Val, node_type: str, first: AstNode, last: AstNode
+) -> AstNode:
+    """Return a node of the given type holding a literal for ``value``.
+
+    The node spans the source from ``first`` to ``last``.
+    """
+    pos = AstNode(node_type, [], first.line, first.col, first.start, last.end)
+    if isinstance(value, execute.Int):
+        leaf_type, text = "int", str(value.value)
+    else:
+        leaf_type, text = "num", repr(value.value)
+    leaf = AstNode(leaf_type, text, pos.line, pos.col, pos.start, pos.end)
+    return wrap(leaf, node_type, pos)
+
+
+def apply(op: str, left: execute.Val, right: execute.Val) -> execute.Val | None:
+    """Apply an operator as the interpreter does, or return None if it fails."""
+    if (
+        op == literals.OP_EXP
+        and isinstance(left, execute.Int)
+        and isinstance(right, execute.Int)
+        and abs(left.value) > 1
+        and right.value * left.value.bit_length() > MAX_FOLDED_BITS
+    ):
+        return None
+
+    try:
+        match op:
+            case literals.OP_ADD:
+                return left.add(right)
+            case literals.OP_SUB:
+                return left.sub(right)
+            case literals.OP_MUL:
+                return left.mul(right)
+            case literals.OP_DIV:
+                return left.div(right)
+            case literals.OP_EXP:
+                return left.exp(right)
+    except (ArithmeticError, TypeError, ValueError, SyntaxError):
+        return None
+    return None
+
+
+class ConstantFolder:
+    """Fold literal subtrees of statements, counting the nodes removed."""
+
+    def __init__(self):
+        self.removed = 0
+
+    def fold_all(self, statements: Iterable[AstNode]) -> Iterator[AstNode]:
+        """Fold statements one at a time, e.g. from ``parse_stream``.
+
+        Statements nested too deeply to fold are left as they are.
+        """
+        for statement in statements:
+            try:
+                self.fold(statement)
+            except RecursionError:
+                # What was folded by then stays, as each fold holds on its own.
+                pass
+            yield statement
+
+    def fold(self, statement: AstNode) -> AstNode:
+        """Fold a top level statement in place and return it."""
+        before = count_nodes(statement)
+        self._statement(statement)
+        self.removed += before - count_nodes(statement)
+        return statement
+
+    def _statement(self, node: AstNode):
+        match node.type:
+            case "vardef" | "varset" | "echo":
+                node.children[-1] = self._expr(node.children[-1])
+            case "callable_def":
+                node.children[4] = self._expr(node.children[4])
+            case "expr":
+                self._expr(node)
+            case "arglist":
+                self._arglist(node)
+
+    def _arglist(self, node: AstNode):
+        for ii, child in enumerate(node.children):
+            if isinstance(child, AstNode) and child.type == "expr":
+                node.children[ii] = self._expr(child)
+
+    def _binary(self, node: AstNode, child_fold, identities) -> AstNode:
+        # Shared by expr and term, which are lists of operands and operators.
+        children = [
+            child_fold(child) if isinstance(child, AstNode) else child
+            for child in node.children
+        ]
+
+        value = literal_value(children[0])
+        while value is not None and len(children) >= 3:
+            right = literal_value(children[2])
+            if right is None:
+                break
+            folded = apply(children[1], value, right)
+            if folded is None:
+                break
+            value = folded
+            children[:3] = [
+                literal_node(value, children[0].type, children[0], children[2])
+            ]
+
+        node.children = identities(children)
+        return node
+
+    def _expr(self, node: AstNode) -> AstNode:
+        def identities(children: list) -> list:
+            kept = children[:1]
+            for op, operand in zip(children[1::2], children[2::2]):
+                if op == literals.OP_SUB and is_int_literal(operand, 0):
+                    continue
+                kept += [op, operand]
+            return kept
+
+        return self._binary(node, self._term, identities)
+
+    def _term(self, node: AstNode) -> AstNode:
+        def identities(children: list) -> list:
+            if (
+                len(children) >= 3
+                and children[1] == literals.OP_MUL
+                and is_int_literal(children[0], 1)
+            ):
+                children = children[2:]
+            kept = children[:1]
+            for op, operand in zip(children[1::2], children[2::2]):
+                if op == literals.OP_MUL and is_int_literal(operand, 1):
+                    continue
+                kept += [op, operand]
+            return kept
+
+        return self._binary(node, self._factor, identities)
+
+    def _factor(self, node: AstNode) -> AstNode:
+        children = [node.children[0]] if node.children else []
+        if children:
+            children[0] = self._atom(children[0])
+        for exponent in node.children[2::2]:
+            exponent = self._factor(exponent)
+            if not is_int_literal(exponent, 1):
+                children += [literals.OP_EXP, exponent]
+        node.children = children
+
+        value = literal_value(children[0]) if children else None
+        for exponent in children[2::2]:
+            if value is None:
+                break
+            right = literal_value(exponent)
+            value = None if right is None else apply(literals.OP_EXP, value, right)
+        if value is not None and len(children) > 1:
+            return literal_node(value, "factor", node, node)
+        return node
+
+    def _atom(self, node: AstNode) -> AstNode:
+        children = node.children
+        if children and children[0] == literals.L_PAREN and len(children) == 3:
+            inner = self._expr(children[1])
+            children[1] = inner
+            # Unwrap (x) when the expression is a single atom.
+            for _ in range(3):
+                if not isinstance(inner, AstNode) or len(inner.children) != 1:
+                    break
+                inner = inner.children[0]
+            else:
+                if isinstance(inner, AstNode) and inner.type == "atom":
+                    node.children = inner.children
+        elif children and isinstance(children[0], AstNode):
+            if children[0].type == "call" and len(children[0].children) > 2:
+                arglist = children[0].children[2]
+                if isinstance(arglist, AstNode):
+                    self._arglist(arglist)
+        return node
+
+
+def leaves(node: AstNode) -> Iterator[AstNode]:
+    """Yield the leaves below ``node`` that are values, not names of calls."""
+    if isinstance(node.children, str):
+        yield node
+    elif node.type == "call":
+        for child in node.children[2].children[2::4]:
+            yield from leaves(child)
+    else:
+        for child in node.children:
+            if isinstance(child, AstNode):
+                yield from leaves(child)
+
+
+def single_leaf(node: AstNode) -> AstNode | None:
+    """Return the leaf of an expression that is just a literal or a name."""
+    while node.type in ("expr", "term", "factor", "atom"):
+        if len(node.children) != 1:
+            return None
+        node = node.children[0]
+    return node if isinstance(node.children, str) else None
+
+
+class Definition:
+    """What the inliner knows of a callable."""
+
+    __slots__ = ("return_type", "params", "body")
+
+    def __init__(self, return_type: str, params: tuple[str, ...], body: AstNode):
+        self.return_type = return_type
+        self.params = params
+        self.body = body
+
+    @classmethod
+    def from_statement(cls, node: AstNode) -> "Definition | None":
+        """Return the definition of a callable_def, or None if it is invalid."""
+        callable_node = node.children[2]
+        return_type = callable_node.children[0].children
+        params = []
+        if callable_node.children[2] != literals.R_PAREN:
+            paramlist = callable_node.children[2].children
+            params = [param.children for param in paramlist[0::4]]
+            if any(
+                param_type.children not in ("int", "num")
+                for param_type in paramlist[2::4]
+            ):
+                return None
+        if return_type not in ("int", "num") or len(set(params)) != len(params):
+            return None
+        # The executor builds its nodes from the tree, so keep a copy.
+        return cls(return_type, tuple(params), copy.deepcopy(node.children[4]))
+
+
+class Inliner:
+    """Inline calls to small callables in statements, counting the calls."""
+
+    def __init__(self, max_nodes: int = MAX_INLINED_NODES):
+        self.max_nodes = max_nodes
+        self.inlined = 0
+        self.definitions: dict[str, Definition] = {}
+        # The type of each defined variable, or None if it is not known.
+        self.types: dict[str, str | None] = {}
+
+    def inline_all(self, statements: Iterable[AstNode]) -> Iterator[AstNode]:
+        """Inline statements one at a time, e.g. from ``parse_stream``.
+
+        Statements nested too deeply to inline are left as they are, and
+        what they define is not known.
+        """
+        for statement in statements:
+            try:
+                self.inline(statement)
+            except RecursionError:
+                if statement.type == "vardef":
+                    self.definitions.pop(statement.children[0].children, None)
+                    self.types[statement.children[0].children] = None
+                elif statement.type == "callable_def":
+                    self.definitions.pop(statement.children[0].children, None)
+                    self.types.pop(statement.children[0].children, None)
+            yield statement
+
+    def inline(self, statement: AstNode) -> AstNode:
+        """Inline calls in a top level statement in place and return it."""
+        match statement.type:
+            case "vardef":
+                self._inline(statement.children[-1], frozenset(), ())
+                name = statement.children[0].children
+                if len(statement.children) == 5:
+                    var_type = statement.children[2].children
+                    self.types[name] = var_type if var_type in ("int", "num") else None
+                else:
+                    self.types[name] = self.value_type(statement.children[-1])
+                self.definitions.pop(name, None)
+            case "varset" | "echo" | "expr" | "arglist":
+                self._inline(statement, frozenset(), ())
+            case "callable_def":
+                name = statement.children[0].children
+                definition = Definition.from_statement(statement)
+                if definition is None:
+                    self.definitions.pop(name, None)
+                else:
+                    self.definitions[name] = definition
+                self.types.pop(name, None)
+        return statement
+
+    def value_type(self, node: AstNode) -> str | None:
+        """Return "int" or "num" if that is the type of every value of node."""
+        if node.type in ("int", "num"):
+            return node.type
+        if node.type == "ident":
+            return self.types.get(node.children)
+        if node.type == "call":
+            definition = self.definitions.get(node.children[0].children)
+            return None if definition is None else definition.return_type
+        types = {
+            self.value_type(child)
+            for child in node.children
+            if isinstance(child, AstNode)
+        }
+        if None in types or not types:
+            return None
+        return "num" if "num" in types else "int"
+
+    def _inline(
+        self, node: AstNode, shadowed: frozenset[str], calling: tuple[str, ...]
+    ) -> bool:
+        # Returns whether every call below node was inlined.
+        if isinstance(node.children, str):
+            return True
+        inlined = True
+        for child in node.children:
+            if not isinstance(child, AstNode):
+                continue
+            if child.type == "atom" and len(child.children) == 1:
+                call = child.children[0]
+                if isinstance(call, AstNode) and call.type == "call":
+                    body = self._expand(call, shadowed, calling)
+                    if body is not None:
+                        child.children = [literals.L_PAREN, body, literals.R_PAREN]
+                        self.inlined += 1
+                        continue
+                    if calling:
+                        return False
+            inlined = self._inline(child, shadowed, calling) and inlined
+            if calling and not inlined:
+                return False
+        return inlined
+
+    def _args(self, arglist: AstNode) -> dict[str, AstNode] | None:
+        children = arglist.children
+        args: dict[str, AstNode] = {}
+        for ii in range(0, len(children), 4):
+            if ii + 2 >= len(children) or children[ii + 1] != "=":
+                return None
+            if not isinstance(children[ii], AstNode) or children[ii].type != "ident":
+                return None
+            name = children[ii].children
+            leaf = single_leaf(children[ii + 2])
+            if name in args or leaf is None:
+                return None
+            if leaf.type == "ident" and leaf.children not in self.types:
+                return None
+            args[name] = leaf
+        return args
+
+    def _expand(
+        self, call: AstNode, shadowed: frozenset[str], calling: tuple[str, ...]
+    ) -> AstNode | None:
+        """Return the inlined body of a call, or None to keep the call."""
+        name = call.children[0].children
+        definition = self.definitions.get(name)
+        if (
+            definition is None
+            or name in calling
+            or count_nodes(definition.body) > self.max_nodes
+        ):
+            return None
+        args = self._args(call.children[2])
+        params = set(definition.params)
+        if args is None or set(args) != params:
+            return None
+
+        body = copy.deepcopy(definition.body)
+        for leaf in leaves(body):
+            if leaf.type == "ident" and leaf.children not in params:
+                if leaf.children in shadowed:
+                    return None
+        for leaf in leaves(body):
+            if leaf.type == "ident" and leaf.children in params:
+                arg = args[leaf.children]
+                leaf.type, leaf.children = arg.type, arg.children
+        if not self._inline(body, shadowed | params, calling + (name,)):
+            return None
+
+        body_type = self.value_type(body)
+        if definition.return_type == "int":
+            return body if body_type == "int" else None
+        if body_type == "num":
+            return body
+        # Converts an int to a num exactly, as Num does.
+        one = AstNode("num", "1.", body.line, body.col, body.start, body.end)
+        inner = AstNode(
+            "atom",
+            [literals.L_PAREN, body, literals.R_PAREN],
+            body.line,
+            body.col,
+            body.start,
+            body.end,
+        )
+        term = AstNode(
+            "term",
+            [
+                AstNode("factor", [inner], body.line, body.col, body.start, body.end),
+                literals.OP_MUL,
+                wrap(one, "factor", body),
+            ],
+            body.line,
+            body.col,
+            body.start,
+            body.end,
+        )
+        return AstNode("expr", [term], body.line, body.col, body.start, body.end)
+
+
+def operands(node: Any) -> list[Any]:
+    """Return the nodes an execute node evaluates, in the order it does.
+
+    Raises SyntaxError for a call with an invalid name or arguments.
+    """
+    if isinstance(node, (execute.ExprNode, execute.TermNode)):
+        return [node.first] + [operand for _, operand in node.rest]
+    if isinstance(node, execute.FactorNode):
+        return [node.base] + node.exponents
+    if isinstance(node, (execute.AtomNode, execute.SubexprNode)):
+        return [node.value]
+    if isinstance(node, execute.CallNode):
+        node.callable_name()
+        return [expr for _, expr in node.children[2].items()]
+    return []
+
+
+def is_operation(node: Any) -> bool:
+    """Return whether a node computes a value, rather than wrapping one."""
+    if isinstance(node, (execute.ExprNode, execute.TermNode)):
+        return bool(node.rest)
+    if isinstance(node, execute.FactorNode):
+        return bool(node.exponents)
+    return isinstance(node, execute.CallNode)
+
+
+def count_nodes_below(node: Any) -> int:
+    """Return the number of execute nodes evaluated for ``node``."""
+    try:
+        return 1 + sum(count_nodes_below(child) for child in operands(node))
+    except SyntaxError:
+        return 1
+
+
+class SubexpressionEliminator:
+    """Evaluate repeated operations in statements once, counting the nodes."""
+
+    def __init__(self):
+        self.removed = 0
+
+    def eliminate(self, statement: execute.Node) -> execute.Node:
+        """Eliminate repeated operations in a top level statement in place.
+
+        A callable definition has its body rewritten, which is evaluated
+        apart from the statement, in the frame of each call.
+        """
+        expr = None
+        if isinstance(statement, execute.ExprNode):
+            expr = statement
+        elif isinstance(statement, execute.CallableDefNode):
+            expr = statement.children[4]
+        elif isinstance(statement, (execute.VarDefNode, execute.EchoNode)):
+            expr = statement.children[-1]
+        elif isinstance(statement, execute.VarSetNode) and len(statement.children) > 2:
+            expr = statement.children[2]
+        if isinstance(expr, execute.ExprNode):
+            self._eliminate(expr)
+        return statement
+
+    def _eliminate(self, expr: execute.ExprNode):
+        ids: dict[tuple, int] = {}
+        keys: dict[int, int] = {}
+        self._key(expr, ids, keys)
+
+        # Occurrences of each operation, not counting those inside a copy
+        # that is read back, as they no longer run.
+        counts: dict[int, int] = {}
+        nodes = [expr]
+        while nodes:
+            node = nodes.pop()
+            key = keys[id(node)]
+            if is_operation(node):
+                counts[key] = counts.get(key, 0) + 1
+                if counts[key] > 1:
+                    continue
+            # Reversed so nodes are popped in the order they run.
+            nodes.extend(reversed(self._operands(node)))
+
+        repeated = {key for key, count in counts.items() if count > 1}
+        if repeated:
+            self._rewrite(expr, keys, repeated, {})
+
+    @staticmethod
+    def _operands(node: Any) -> list[Any]:
+        try:
+            return operands(node)
+        except SyntaxError:
+            # Left to fail as it runs.
+            return []
+
+    def _key(self, node: Any, ids: dict[tuple, int], keys: dict[int, int]) -> int:
+        """Return the id of the structure of a node, recording those below it."""
+        children = [self._key(child, ids, keys) for child in self._operands(node)]
+        if isinstance(node, execute.ExprNode) and node.rest:
+            ops = tuple(op for op, _ in node.rest)
+            structure: tuple = ("expr", ops, tuple(children))
+        elif isinstance(node, execute.TermNode) and node.rest:
+            ops = tuple(op for op, _ in node.rest)
+            structure = ("term", ops, tuple(children))
+        elif isinstance(node, execute.FactorNode) and node.exponents:
+            structure = ("factor", tuple(children))
+        elif isinstance(node, execute.CallNode):
+            try:
+                names = tuple(name for name, _ in node.children[2].items())
+                structure = ("call", node.callable_name(), names, tuple(children))
+            except SyntaxError:
+                structure = ("invalid", id(node))
+        elif isinstance(node, execute.IntNode):
+            structure = ("int", node.value)
+        elif isinstance(node, execute.NumNode):
+            structure = ("num", node.value.hex())
+        elif isinstance(node, execute.IdentNode):
+            structure = ("ident", node.value)
+        elif len(children) == 1:
+            # Wrappers such as atoms are the same as what they hold.
+            keys[id(node)] = children[0]
+            return children[0]
+        else:
+            structure = ("unknown", id(node))
+
+        key = ids.setdefault(structure, len(ids))
+        keys[id(node)] = key
+        return key
+
+    def _rewrite(
+        self,
+        node: Any,
+        keys: dict[int, int],
+        repeated: set[int],
+        sources: dict[int, execute.SubexprNode],
+    ) -> Any:
+        """Rewrite the operands of a node, returning what replaces it."""
+        key = keys[id(node)]
+        if is_operation(node) and key in repeated:
+            source = sources.get(key)
+            if source is not None:
+                self.removed += count_nodes_below(node) - 1
+                return execute.SubexprRefNode(source)
+
+        if isinstance(node, (execute.ExprNode, execute.TermNode)):
+            node.first = self._rewrite(node.first, keys, repeated, sources)
+            node.rest = [
+                (op, self._rewrite(operand, keys, repeated, sources))
+                for op, operand in node.rest
+            ]
+        elif isinstance(node, execute.FactorNode):
+            node.base = self._rewrite(node.base, keys, repeated, sources)
+            node.exponents = [
+                self._rewrite(exponent, keys, repeated, sources)
+                for exponent in node.exponents
+            ]
+        elif isinstance(node, execute.AtomNode):
+            node.value = self._rewrite(node.value, keys, repeated, sources)
+        elif isinstance(node, execute.CallNode) and self._operands(node):
+            arglist = node.children[2]
+            for ii, (name, arg_expr) in enumerate(arglist.args):
+                expr = self._rewrite(arg_expr, keys, repeated, sources)
+                if not isinstance(expr, execute.ExprNode):
+                    # Arguments must be expressions, so wrap the value.
+                    wrapper = copy.copy(arg_expr)
+                    wrapper.first, wrapper.rest = expr, []
+                    expr = wrapper
+                arglist.args[ii] = name, expr
+
+        if is_operation(node) and key in repeated:
+            sources[key] = execute.SubexprNode(node)
+            return sources[key]
+        return node
@@ -1,64 +1,124 @@
-from typing import Any
+import os
+import pickle
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
 
 import pyparsing as pp
 
+import fastparse
 import literals
+from astnode import AstNode, gc_paused
+from source import SourceFile
 
 pp.ParserElement.set_default_whitespace_chars(" \t")
 
+BACKENDS = ("pyparsing", "fast")
+DEFAULT_BACKEND = "pyparsing"
+# Bump whenever the AST produced for some program changes, so that ASTs
+# cached on disk by an older version are not used.
+GRAMMAR_VERSION = 1
 
-def compute_column(full_text: str, position: int):
-    if not full_text:
-        return 0
+_BLANKS = re.compile(r"[ \t]*")
 
-    if position >= len(full_text):
-        position = len(full_text) - 1
+IDENT_PATTERN = r"[_a-zA-Z]+[_a-zA-Z0-9]*"
 
-    start_position = position
 
-    while position and full_text[position] != "\n":
-        position -= 1
+def skip_blanks(text: str, position: int) -> int:
+    """Return the first offset at or after position that is not a blank."""
+    return _BLANKS.match(text, position).end()  # type: ignore
 
-    return start_position - position + 1
 
+def split_lines(input_str: str, chunks: int) -> list[tuple[int, int, str]]:
+    """Split the input at line ends into about ``chunks`` similar pieces.
 
-def results_to_list(
-    parse_result: pp.ParseResults | list[dict[str, Any]] | Any,
-) -> list[dict[str, Any]] | dict[str, Any]:
-    if isinstance(parse_result, pp.ParseResults):
-        flat_results: list[Any] = parse_result.as_list()
-    else:
-        flat_results: list[Any] = parse_result.copy()
+    Returns (offset, lines before, text) for each piece, as expected by
+    ``shift_node``.
+    """
+    size = max(1, len(input_str) // max(1, chunks))
+    pieces = []
+    start = 0
+    lines = 0
+    while start < len(input_str):
+        end = input_str.find("\n", start + size - 1) + 1 or len(input_str)
+        pieces.append((start, lines, input_str[start:end]))
+        lines += input_str.count("\n", start, end)
+        start = end
+    return pieces
 
-    for ii, res in enumerate(flat_results):
-        res: pp.ParseResults | list[dict[str, Any]] | Any
-        if isinstance(res, pp.ParseResults):
-            flat_results[ii] = results_to_list(res)
 
-        elif isinstance(res, list):
-            if len(res) == 1 and isinstance(res[0], list):
-                flat_results[ii] = results_to_list(res[0])
-            else:
-                for jj, res2 in enumerate(res):
-                    if isinstance(res2, (pp.ParseResults, list)):
-                        flat_results[ii][jj] = results_to_list(res2)
+def shift_node(node: AstNode, offset: int, lines: int):
+    """Move a node parsed from a fragment of a file to its place in the file.
 
-    return flat_results
+    ``offset`` is the offset of the fragment and ``lines`` the number of
+    lines before it. Columns are unchanged, as fragments start a line.
+    """
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        current.start += offset
+        current.end += offset
+        current.line += lines
+        children = current.children
+        if isinstance(children, list):
+            stack.extend(child for child in children if isinstance(child, AstNode))
 
 
-class Parser:
+class Dispatch(pp.ParserElement):
+    """Choose between alternatives by looking ahead, without backtracking.
+
+    ``lookahead`` is matched once at the current position. The alternative
+    named by its matching group is parsed, or ``default`` if nothing
+    matched. The other alternatives are never attempted.
+    """
+
+    def __init__(
+        self,
+        lookahead: re.Pattern[str],
+        alternatives: dict[str, pp.ParserElement],
+        default: pp.ParserElement,
+    ):
+        super().__init__()
+        self.lookahead = lookahead
+        self.alternatives = alternatives
+        self.default = default
+        self.mayReturnEmpty = False
+
+    def _generateDefaultName(self) -> str:
+        return "statement"
+
+    def parseImpl(self, instring: str, loc: int, do_actions: bool = True):
+        found = self.lookahead.match(instring, loc)
+        if found is None:
+            element = self.default
+        else:
+            element = self.alternatives[found.lastgroup]  # type: ignore
+        return element._parse(instring, loc, do_actions)
+
+
+class Grammar:
+    """The pyparsing grammar, built once per process and shared by parsers.
+
+    Parse actions call the method of the same name on ``parser``, the
+    ``Parser`` currently parsing, so that per-parse state stays on it. Parses
+    are serialized by ``lock``.
+    """
 
     def __init__(self):
+        self.parser: Parser | None = None
+        self.lock = threading.RLock()
 
-        self.line_count = 1
         self.int = pp.Regex(r"[+-]?[0-9]+")
-        self.int.add_parse_action(self.consume_int)
+        self.int.add_parse_action(self._action("consume_int"))
         self.num = pp.Regex(r"[+-]?\d+(\.\d*|[eE][+-]?\d+)")
-        self.num.add_parse_action(self.consume_num)
-        self.ident = pp.Regex(r"[_a-zA-Z]+[_a-zA-Z0-9]*")
-        self.ident.add_parse_action(self.consume_ident)
+        self.num.add_parse_action(self._action("consume_num"))
+        self.ident = pp.Regex(IDENT_PATTERN)
+        self.ident.add_parse_action(self._action("consume_ident"))
 
-        self.newline = pp.Literal("\n").add_parse_action(self.consume_newline)
+        self.newline = pp.Literal("\n").add_parse_action(
+            self._action("consume_newline")
+        )
 
         self.plus = pp.Literal(literals.OP_ADD)
         self.minus = pp.Literal(literals.OP_SUB)
@@ -77,62 +137,173 @@ class Parser:
         self.call = pp.Forward()
 
         self.atom = (
-            self.call
+            (pp.FollowedBy(pp.Regex(IDENT_PATTERN + r"[ \t]*\(")) + self.call)
             | (self.num | self.int | self.ident)
             | (self.lparen + self.expr + self.rparen)
         )
-        self.atom.add_parse_action(self.consume_atom)
+        self.atom.add_parse_action(self._action("consume_atom"))
 
         self.factor = pp.Forward()
         self.factor <<= self.atom + pp.ZeroOrMore(self.op_prec[-1] + self.factor)
-        self.factor.add_parse_action(self.consume_factor)
+        self.factor.add_parse_action(self._action("consume_factor"))
 
         self.term = self.factor + pp.ZeroOrMore(self.op_prec[-2] + self.factor)
-        self.term.add_parse_action(self.consume_term)
+        self.term.add_parse_action(self._action("consume_term"))
 
         self.expr <<= self.term + pp.ZeroOrMore(self.op_prec[-3] + self.term)
-        self.expr.add_parse_action(self.consume_expr)
+        self.expr.add_parse_action(self._action("consume_expr"))
 
-        self.paramlist = pp.ZeroOrMore(
-            self.ident + ":" + self.ident + ","
-        ) + pp.Optional(self.ident + ":" + self.ident + pp.Optional(","))
-        self.paramlist.add_parse_action(self.consume_paramlist)
+        param = self.ident + ":" + self.ident
+        self.paramlist = pp.Optional(
+            param + pp.ZeroOrMore("," + param) + pp.Optional(",")
+        )
+        self.paramlist.add_parse_action(self._action("consume_paramlist"))
 
         self.callable = self.ident + "(" + pp.Optional(self.paramlist) + ")"
-        self.callable.add_parse_action(self.consume_callable)
+        self.callable.add_parse_action(self._action("consume_callable"))
 
         self.callable_def = self.ident + ":" + (self.callable) + "=" + self.expr
-        self.callable_def.add_parse_action(self.consume_callable_def)
+        self.callable_def.add_parse_action(self._action("consume_callable_def"))
 
-        self.arglist = pp.ZeroOrMore(self.ident + "=" + self.expr + ",") + pp.Optional(
-            self.ident + "=" + self.expr + pp.Optional(",")
-        )
-        self.arglist.add_parse_action(self.consume_arglist)
+        arg = self.ident + "=" + self.expr
+        self.arglist = pp.Optional(arg + pp.ZeroOrMore("," + arg) + pp.Optional(","))
+        self.arglist.add_parse_action(self._action("consume_arglist"))
 
         self.call <<= self.ident + "(" + self.arglist + ")"
-        self.call.add_parse_action(self.consume_call)
+        self.call.add_parse_action(self._action("consume_call"))
 
-        self.var_def = (self.ident + ":" + self.ident + "=" + self.expr) | (
-            self.ident + ":" + "=" + self.expr
-        )
-        self.var_def.add_parse_action(self.consume_var_def)
+        self.var_def = self.ident + ":" + pp.Optional(self.ident) + "=" + self.expr
+        self.var_def.add_parse_action(self._action("consume_var_def"))
 
         self.var_set = self.ident + "=" + self.expr
-        self.var_set.add_parse_action(self.consume_var_set)
-
-        self.echo = pp.Literal("echo") + self.expr
-        self.echo.add_parse_action(self.consume_echo)
-
-        self.prog = pp.ZeroOrMore(
-            self.echo
-            | self.callable_def
-            | self.var_def
-            | self.var_set
-            | self.expr
-            | self.newline
+        self.var_set.add_parse_action(self._action("consume_var_set"))
+
+        self.echo = pp.Keyword("echo", ident_chars=pp.identbodychars) + self.expr
+        self.echo.add_parse_action(self._action("consume_echo"))
+
+        # Statement kinds are told apart by their leading tokens, so each
+        # statement is parsed exactly once.
+        self.statement = Dispatch(
+            re.compile(
+                r"(?P<newline>\n)"
+                + r"|(?P<echo>echo(?![_a-zA-Z0-9]))"
+                + rf"|(?P<callable_def>{IDENT_PATTERN}[ \t]*:[ \t]*"
+                + rf"{IDENT_PATTERN}[ \t]*\()"
+                + rf"|(?P<var_def>{IDENT_PATTERN}[ \t]*:)"
+                + rf"|(?P<var_set>{IDENT_PATTERN}[ \t]*=)"
+            ),
+            {
+                "newline": self.newline,
+                "echo": self.echo,
+                "callable_def": self.callable_def,
+                "var_def": self.var_def,
+                "var_set": self.var_set,
+            },
+            self.expr,
         )
 
-        self.ast: list[dict[str, Any]] = []
+        self.prog = pp.ZeroOrMore(self.statement)
+        self.prog.parse_with_tabs()
+
+    def _action(self, name: str) -> Callable[[str, int, pp.ParseResults], Any]:
+        def action(input_str: str, position: int, parse_result: pp.ParseResults):
+            return getattr(self.parser, name)(input_str, position, parse_result)
+
+        return action
+
+
+_grammar: Grammar | None = None
+_grammar_lock = threading.Lock()
+
+
+def grammar() -> Grammar:
+    """Return the shared grammar, building it on first use."""
+    global _grammar
+    with _grammar_lock:
+        if _grammar is None:
+            _grammar = Grammar()
+        return _grammar
+
+
+class Parser:
+
+    def __init__(self, backend: str | None = None):
+        if backend is None:
+            backend = DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported parser backend: {backend}\n")
+
+        self.backend = backend
+        self.fast = fastparse.FastParser() if backend == "fast" else None
+
+        self.source = SourceFile("")
+        self.ast: list[AstNode] = []
+
+    @property
+    def grammar(self) -> Grammar:
+        return grammar()
+
+    def _parse_rule(self, rule: str, input_str: str) -> Any:
+        """Parse the whole input string as the given grammar rule."""
+        if self.fast is not None:
+            return [self.fast.parse_rule(rule, input_str)]
+
+        element: pp.ParserElement = getattr(self.grammar, rule)
+        return self._parse_string(element.parse_with_tabs(), input_str)
+
+    def _parse_string(
+        self, element: pp.ParserElement, input_str: str
+    ) -> pp.ParseResults:
+        """Parse the whole input string with an element of the grammar."""
+        grammar = self.grammar
+        with grammar.lock:
+            previous = grammar.parser
+            grammar.parser = self
+            try:
+                return element.parse_string(input_str, parse_all=True)
+            except RecursionError:
+                raise SyntaxError(
+                    "Maximum recursion depth reached while parsing, as the "
+                    + "input is nested too deeply.\n"
+                ) from None
+            finally:
+                grammar.parser = previous
+
+    def _source(self, input_str: str) -> SourceFile:
+        """Return the source map for the string currently being parsed."""
+        if self.source.text is not input_str:
+            self.source = SourceFile(input_str)
+        return self.source
+
+    def _new_node(
+        self,
+        node_type: str,
+        children: Any,
+        input_str: str,
+        position: int,
+    ) -> AstNode:
+        """Build an AST node spanning the given children.
+
+        Children are laid out left to right separated only by blanks, so the
+        end offset follows from the last child.
+        """
+        source = self._source(input_str)
+        start = skip_blanks(input_str, position)
+
+        if isinstance(children, str):
+            end = start + len(children)
+        elif isinstance(children, AstNode):
+            end = children.end
+        else:
+            end = start
+            for child in children:
+                if isinstance(child, AstNode):
+                    end = child.end
+                else:
+                    end = skip_blanks(input_str, end) + len(child)
+
+        line, col = source.location(start)
+        return AstNode(node_type, children, line, col, start, end)
 
     def consume_newline(
         self,
@@ -141,17 +312,9 @@ class Parser:
         parse_result: pp.ParseResults | None = None,
     ):
         if parse_result is None:
-            parse_result = self.newline.parse_string(input_str, parse_all=True)
-
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": parse_result[0],
-            "type": "newline",
-            "line": self.line_count,
-        }
+            parse_result = self._parse_rule("newline", input_str)
 
-        self.line_count += 1
-        return new_ast
+        return self._new_node("newline", parse_result[0], input_str, position)
 
     def consume_paramlist(
         self,
@@ -160,15 +323,9 @@ class Parser:
         parse_result: pp.ParseResults | None = None,
     ):
         if parse_result is None:
-            parse_result = self.paramlist.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("paramlist", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "paramlist",
-            "line": self.line_count,
-        }
-        return new_ast
+        return self._new_node("paramlist", list(parse_result), input_str, position)
 
     def consume_callable(
         self,
@@ -177,15 +334,9 @@ class Parser:
         parse_result: pp.ParseResults | None = None,
     ):
         if parse_result is None:
-            parse_result = self.callable.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("callable", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "callable",
-            "line": self.line_count,
-        }
-        return new_ast
+        return self._new_node("callable", list(parse_result), input_str, position)
 
     def consume_callable_def(
         self,
@@ -194,15 +345,9 @@ class Parser:
         parse_result: pp.ParseResults | None = None,
     ):
         if parse_result is None:
-            parse_result = self.callable_def.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("callable_def", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "callable_def",
-            "line": self.line_count,
-        }
-        return new_ast
+        return self._new_node("callable_def", list(parse_result), input_str, position)
 
     def consume_arglist(
         self,
@@ -211,15 +356,9 @@ class Parser:
         parse_result: pp.ParseResults | None = None,
     ):
         if parse_result is None:
-            parse_result = self.arglist.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("arglist", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "arglist",
-            "line": self.line_count,
-        }
-        return new_ast
+        return self._new_node("arglist", list(parse_result), input_str, position)
 
     def consume_call(
         self,
@@ -228,15 +367,9 @@ class Parser:
         parse_result: pp.ParseResults | None = None,
     ):
         if parse_result is None:
-            parse_result = self.call.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("call", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "call",
-            "line": self.line_count,
-        }
-        return new_ast
+        return self._new_node("call", list(parse_result), input_str, position)
 
     def consume_ident(
         self,
@@ -246,16 +379,9 @@ class Parser:
     ):
         """Parse a given string for an identifier."""
         if parse_result is None:
-            parse_result = self.ident.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("ident", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": parse_result[0],
-            "type": "ident",
-            "line": self.line_count,
-        }
-
-        return new_ast
+        return self._new_node("ident", parse_result[0], input_str, position)
 
     def consume_int(
         self,
@@ -265,16 +391,9 @@ class Parser:
     ):
         """Parse a given string for an integer literal."""
         if parse_result is None:
-            parse_result = self.int.parse_string(input_str, parse_all=True)
-
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": parse_result[0],
-            "type": "int",
-            "line": self.line_count,
-        }
+            parse_result = self._parse_rule("int", input_str)
 
-        return new_ast
+        return self._new_node("int", parse_result[0], input_str, position)
 
     def consume_num(
         self,
@@ -284,16 +403,9 @@ class Parser:
     ):
         """Parse a given string for a number literal."""
         if parse_result is None:
-            parse_result = self.num.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("num", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": parse_result[0],
-            "type": "num",
-            "line": self.line_count,
-        }
-
-        return new_ast
+        return self._new_node("num", parse_result[0], input_str, position)
 
     def consume_atom(
         self,
@@ -303,16 +415,9 @@ class Parser:
     ):
         """Parse a given string for an atom."""
         if parse_result is None:
-            parse_result = self.atom.parse_string(input_str, parse_all=True)
-
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "atom",
-            "line": self.line_count,
-        }
+            parse_result = self._parse_rule("atom", input_str)
 
-        return new_ast
+        return self._new_node("atom", list(parse_result), input_str, position)
 
     def consume_factor(
         self,
@@ -322,16 +427,9 @@ class Parser:
     ):
         """Parse a given string for a factor."""
         if parse_result is None:
-            parse_result = self.factor.parse_string(input_str, parse_all=True)
-
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "factor",
-            "line": self.line_count,
-        }
+            parse_result = self._parse_rule("factor", input_str)
 
-        return new_ast
+        return self._new_node("factor", list(parse_result), input_str, position)
 
     def consume_term(
         self,
@@ -341,16 +439,9 @@ class Parser:
     ):
         """Parse a given string for a term."""
         if parse_result is None:
-            parse_result = self.term.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("term", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "term",
-            "line": self.line_count,
-        }
-
-        return new_ast
+        return self._new_node("term", list(parse_result), input_str, position)
 
     def consume_expr(
         self,
@@ -360,16 +451,9 @@ class Parser:
     ):
         """Parse a given string for an expr."""
         if parse_result is None:
-            parse_result = self.expr.parse_string(input_str, parse_all=True)
-
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "expr",
-            "line": self.line_count,
-        }
+            parse_result = self._parse_rule("expr", input_str)
 
-        return new_ast
+        return self._new_node("expr", list(parse_result), input_str, position)
 
     def consume_var_def(
         self,
@@ -379,16 +463,9 @@ class Parser:
     ):
         """Parse a given string for a variable definition."""
         if parse_result is None:
-            parse_result = self.var_def.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("var_def", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "vardef",
-            "line": self.line_count,
-        }
-
-        return new_ast
+        return self._new_node("vardef", list(parse_result), input_str, position)
 
     def consume_var_set(
         self,
@@ -398,16 +475,9 @@ class Parser:
     ):
         """Parse a given string for a variable reset."""
         if parse_result is None:
-            parse_result = self.var_set.parse_string(input_str, parse_all=True)
-
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "varset",
-            "line": self.line_count,
-        }
+            parse_result = self._parse_rule("var_set", input_str)
 
-        return new_ast
+        return self._new_node("varset", list(parse_result), input_str, position)
 
     def consume_echo(
         self,
@@ -417,19 +487,109 @@ class Parser:
     ):
         """Parse a given string for an echo statement."""
         if parse_result is None:
-            parse_result = self.echo.parse_string(input_str, parse_all=True)
+            parse_result = self._parse_rule("echo", input_str)
 
-        new_ast: dict[str, Any] = {
-            "col": compute_column(input_str, position),
-            "children": results_to_list(parse_result),
-            "type": "echo",
-            "line": self.line_count,
-        }
-
-        return new_ast
+        return self._new_node("echo", list(parse_result), input_str, position)
 
     def parse(self, input_str: str) -> Any:
-        """Run the parser on the input string."""
-        return results_to_list(
-            self.prog.parse_string(input_str, parse_all=True).as_list()
-        )
+        """Run the parser on the input string.
+
+        The source map of the input is left in ``self.source``.
+        """
+        self.source = SourceFile(input_str)
+        if self.fast is not None:
+            return self.fast.parse(input_str)
+
+        return list(self._parse_string(self.grammar.prog, input_str))
+
+    def parse_stream(self, lines: Iterable[str]) -> Iterator[AstNode]:
+        """Parse a program line by line, yielding one statement at a time.
+
+        ``lines`` is typically an open file. Statements never span lines, so
+        only the current line is held in memory. Positions of the yielded
+        nodes and of parse errors are relative to the whole input.
+        """
+        offset = 0
+        for line_number, line in enumerate(lines):
+            try:
+                statements = self.parse(line)
+            except pp.ParseBaseException as e:
+                # Pad the text so the error reports the line in the input.
+                raise type(e)(
+                    "\n" * line_number + line,
+                    line_number + e.loc,
+                    e.msg,
+                    e.parser_element,
+                ) from None
+
+            for statement in statements:
+                shift_node(statement, offset, line_number)
+                yield statement
+            offset += len(line)
+
+    def parse_parallel(
+        self, input_str: str, processes: int | None = None
+    ) -> list[AstNode]:
+        """Parse a program in pieces across a pool of worker processes.
+
+        Statements never span lines, so the input is split at line ends and
+        the pieces are parsed independently, then their statements are moved
+        to their place in the whole input. The result equals ``parse``.
+        """
+        processes = processes or os.cpu_count() or 1
+        self.source = SourceFile(input_str)
+        # A few pieces per process even out pieces that parse slowly.
+        pieces = split_lines(input_str, processes * 4)
+        if processes == 1 or len(pieces) <= 1:
+            return self.parse(input_str)
+
+        with ProcessPoolExecutor(
+            processes,
+            initializer=_init_worker,
+            initargs=(self.backend,),
+        ) as pool:
+            results = pool.map(_parse_piece, [piece[2] for piece in pieces])
+            statements: list[AstNode] = []
+            for (offset, lines, text), (pickled, error) in zip(pieces, results):
+                if error is not None:
+                    error_type, loc, msg = error
+                    raise error_type(input_str, offset + loc, msg)
+
+                if pickled is None:
+                    piece_statements = Parser(self.backend).parse(text)
+                else:
+                    with gc_paused():
+                        piece_statements = pickle.loads(pickled)
+                for statement in piece_statements:
+                    shift_node(statement, offset, lines)
+                statements.extend(piece_statements)
+
+        return statements
+
+
+# Parser of a worker process of Parser.parse_parallel.
+_worker_parser: Parser | None = None
+
+
+def _init_worker(backend: str):
+    global _worker_parser
+    _worker_parser = Parser(backend)
+
+
+def _parse_piece(
+    input_str: str,
+) -> tuple[bytes | None, tuple[type, int, str] | None]:
+    # Parse errors refer to the parser, which is not sent back, so only the
+    # parts needed to raise them again in the parent are returned.
+    try:
+        statements = _worker_parser.parse(input_str)  # type: ignore
+    except pp.ParseBaseException as e:
+        return b"", (type(e), e.loc, e.msg)
+
+    # Pickled here rather than by the pool, to keep the collector paused.
+    with gc_paused():
+        try:
+            return pickle.dumps(statements, pickle.HIGHEST_PROTOCOL), None
+        except RecursionError:
+            # Statements nested too deeply to pickle are parsed by the parent.
+            return None, None
@@ -0,0 +1,310 @@
+"""Module running many independent mira programs on a pool of processes.
+
+Each program runs with a fresh ``execute.Executor``, and a worker that
+times out or dies is replaced. Run as a script like ``run.py``.
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any, Iterable, Iterator
+
+import pyparsing.exceptions
+
+import execute
+import parse
+
+
+class JobResult:
+    """The outcome of running one program.
+
+    ``output`` holds what the program echoed, ``value`` the value of its
+    last statement, and ``error`` the message of the error it failed with,
+    or None if it ran to the end. ``seconds`` is the time from handing the
+    program to a worker to getting the result back.
+    """
+
+    __slots__ = ("output", "value", "error", "timed_out", "seconds")
+
+    def __init__(
+        self,
+        output: str = "",
+        value: int | float | None = None,
+        error: str | None = None,
+        timed_out: bool = False,
+        seconds: float = 0.0,
+    ):
+        self.output = output
+        self.value = value
+        self.error = error
+        self.timed_out = timed_out
+        self.seconds = seconds
+
+    def __repr__(self) -> str:
+        return (
+            f"JobResult(output={self.output!r}, value={self.value!r}, "
+            + f"error={self.error!r}, timed_out={self.timed_out!r})"
+        )
+
+
+def run_program(
+    parser: parse.Parser, source: str, backend: str | None, limits: dict[str, Any]
+) -> tuple[str, int | float | None, str | None]:
+    """Run a program with a new executor, returning its output, value and error.
+
+    Errors are reported as ``run.py`` prints them, without the stack of
+    parse errors.
+    """
+    output = io.StringIO()
+    value = None
+    error = None
+    with contextlib.redirect_stdout(output):
+        try:
+            result = execute.Executor(backend=backend).exec(
+                parser.parse(source), **limits
+            )
+            if isinstance(result, execute.Val):
+                value = result.value
+        except pyparsing.exceptions.ParseBaseException as e:
+            error = e.explain(depth=0)  # type: ignore
+        except SyntaxError as e:
+            error = str(e)
+        except Exception as e:
+            # Such as an overflow, which the program fails with all the same.
+            error = f"{type(e).__name__}: {e}"
+    return output.getvalue(), value, error
+
+
+def _work(
+    connection: Connection,
+    parser_backend: str | None,
+    backend: str | None,
+    limits: dict[str, Any],
+):
+    # Runs in a worker process, until the pool sends None or goes away.
+    parser = parse.Parser(backend=parser_backend)
+    while True:
+        try:
+            source = connection.recv()
+        except EOFError:
+            return
+        if source is None:
+            return
+        connection.send(run_program(parser, source, backend, limits))
+
+
+class Worker:
+    """A worker process, with the job it is running, if any."""
+
+    __slots__ = ("process", "connection", "job", "started")
+
+    def __init__(self, process: multiprocessing.Process, connection: Connection):
+        self.process = process
+        self.connection = connection
+        # The index of the running program and when it was handed over.
+        self.job = -1
+        self.started = 0.0
+
+    def exit_message(self) -> str:
+        self.process.join(1)
+        return f"Worker process exited with code {self.process.exitcode}.\n"
+
+    def stop(self):
+        with contextlib.suppress(OSError):
+            self.connection.send(None)
+        self.connection.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class Pool:
+    """A pool of worker processes running independent programs.
+
+    ``processes`` defaults to the number of cores. ``parser`` and
+    ``backend`` pick the parser and executor backends, and ``max_steps``,
+    ``max_seconds`` and ``max_int_bits`` are passed to ``Executor.exec``
+    for each program. A program still running after ``timeout`` seconds
+    has its worker killed. Use as a context manager, or call ``close``.
+    """
+
+    def __init__(
+        self,
+        processes: int | None = None,
+        timeout: float | None = None,
+        parser: str | None = None,
+        backend: str | None = None,
+        max_steps: int | None = None,
+        max_seconds: float | None = None,
+        max_int_bits: int | None = None,
+    ):
+        self.timeout = timeout
+        self.parser = parser
+        self.backend = backend
+        self.limits = {
+            "max_steps": max_steps,
+            "max_seconds": max_seconds,
+            "max_int_bits": max_int_bits,
+        }
+        self.workers = [self._start() for _ in range(processes or os.cpu_count() or 1)]
+
+    def _start(self) -> Worker:
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_work,
+            args=(child_connection, self.parser, self.backend, self.limits),
+            daemon=True,
+        )
+        process.start()
+        child_connection.close()
+        return Worker(process, connection)
+
+    def _replace(self, worker: Worker) -> Worker:
+        worker.kill()
+        new_worker = self._start()
+        self.workers[self.workers.index(worker)] = new_worker
+        return new_worker
+
+    def run(self, programs: Iterable[str]) -> Iterator[JobResult]:
+        """Run programs, yielding their results in the order of the programs.
+
+        Programs are taken from ``programs`` as workers become free, so it
+        may be a generator or a queue being filled as results come in.
+        """
+        sources = enumerate(programs)
+        idle = list(self.workers)
+        busy: dict[Connection, Worker] = {}
+        # Results of programs that finished before one handed out earlier.
+        done: dict[int, JobResult] = {}
+        next_job = 0
+        exhausted = False
+        try:
+            while True:
+                while idle and not exhausted:
+                    job = next(sources, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    worker = idle.pop()
+                    if not worker.process.is_alive():
+                        # Killed from outside since its last program.
+                        worker = self._replace(worker)
+                    worker.job, source = job
+                    worker.started = time.monotonic()
+                    worker.connection.send(source)
+                    busy[worker.connection] = worker
+                if not busy:
+                    break
+
+                timeout = None
+                if self.timeout is not None:
+                    first = min(worker.started for worker in busy.values())
+                    timeout = max(0.0, first + self.timeout - time.monotonic())
+                for connection in wait(list(busy), timeout):
+                    worker = busy.pop(connection)  # type: ignore
+                    seconds = time.monotonic() - worker.started
+                    try:
+                        output, value, error = connection.recv()  # type: ignore
+                    except (EOFError, OSError):
+                        done[worker.job] = JobResult(
+                            error=worker.exit_message(), seconds=seconds
+                        )
+                        idle.append(self._replace(worker))
+                        continue
+                    done[worker.job] = JobResult(output, value, error, seconds=seconds)
+                    idle.append(worker)
+
+                if self.timeout is not None:
+                    now = time.monotonic()
+                    for connection, worker in list(busy.items()):
+                        seconds = now - worker.started
+                        if seconds >= self.timeout:
+                            del busy[connection]
+                            done[worker.job] = JobResult(
+                                error=f"Timed out after {self.timeout} seconds.\n",
+                                timed_out=True,
+                                seconds=seconds,
+                            )
+                            idle.append(self._replace(worker))
+
+                while next_job in done:
+                    yield done.pop(next_job)
+                    next_job += 1
+        finally:
+            # Programs left running when the caller stops reading are dropped.
+            for worker in busy.values():
+                self._replace(worker)
+
+    def close(self):
+        """Stop the worker processes."""
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def __enter__(self) -> "Pool":
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+
+def main(args: argparse.Namespace):
+    """Run mira files on a pool of processes."""
+    sources = []
+    for filename in args.filenames:
+        with open(filename, "r", encoding="utf-8") as f:
+            sources.append(f.read())
+
+    start = time.perf_counter()
+    failed = 0
+    timed_out = 0
+    with Pool(
+        args.processes,
+        args.timeout,
+        args.parser,
+        args.backend,
+        args.max_steps,
+        args.max_seconds,
+        args.max_int_bits,
+    ) as pool:
+        for filename, result in zip(args.filenames, pool.run(sources)):
+            if len(args.filenames) > 1:
+                print(f"==> {filename} <==")
+            print(result.output, end="")
+            if result.error is not None:
+                failed += 1
+                timed_out += result.timed_out
+                print(result.error)
+    print(
+        f"Ran {len(sources)} programs in {time.perf_counter() - start:.3f} s, "
+        + f"{failed} failed, {timed_out} timed out.",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    _argparser = argparse.ArgumentParser()
+    _argparser.add_argument("filenames", nargs="+", metavar="filename")
+    _argparser.add_argument("--processes", type=int)
+    _argparser.add_argument("--timeout", type=float)
+    _argparser.add_argument(
+        "--parser", choices=parse.BACKENDS, default=parse.DEFAULT_BACKEND
+    )
+    _argparser.add_argument(
+        "--backend", choices=execute.BACKENDS, default=execute.DEFAULT_BACKEND
+    )
+    _argparser.add_argument("--max-steps", type=int)
+    _argparser.add_argument("--max-seconds", type=float)
+    _argparser.add_argument("--max-int-bits", type=int)
+    main(_argparser.parse_args())
@@ -1,21 +1,59 @@
 import argparse
+import contextlib
+import sys
+from typing import Iterable
 
 import pyparsing.exceptions
 
+import astcache
+import callcache
 import execute
+import optimize
 import parse
+from astnode import AstNode
 
 
 def main(args: argparse.Namespace):
     """Execute the mira file."""
-    parser = parse.Parser()
-    executor = execute.Executor()
+    parser = parse.Parser(backend=args.parser)
+    executor = execute.Executor(
+        backend=args.backend, cse=args.cse, unchecked=args.unchecked
+    )
+    for name in args.cache_calls:
+        executor.cache_calls(name, args.call_cache_size)
 
-    with open(args.filename, "r", encoding="utf-8") as f:
-        mira_file = f.read()
+    folder = optimize.ConstantFolder() if args.optimize else None
+    inliner = optimize.Inliner(args.inline_size) if args.inline else None
 
+    def run(statements: Iterable[AstNode]):
+        # Inlined bodies may fold further, e.g. with literal arguments.
+        if inliner is not None:
+            statements = inliner.inline_all(statements)
+        if folder is not None:
+            statements = folder.fold_all(statements)
+        executor.exec(
+            statements,
+            max_steps=args.max_steps,
+            max_seconds=args.max_seconds,
+            max_int_bits=args.max_int_bits,
+        )
+
+    cache = args.cache
+    if cache is None:
+        cache = args.parser in astcache.CACHED_BY_DEFAULT
     try:
-        executor.exec(parser.parse(mira_file))
+        if cache:
+            # Closed as soon as running stops, so the entry is completed.
+            with contextlib.closing(
+                astcache.parse_cached(parser, args.filename, args.cache_dir, args.jobs)
+            ) as statements:
+                run(statements)
+        elif args.jobs > 1:
+            with open(args.filename, "r", encoding="utf-8") as f:
+                run(parser.parse_parallel(f.read(), args.jobs))
+        else:
+            with open(args.filename, "r", encoding="utf-8") as f:
+                run(parser.parse_stream(f))
     except pyparsing.exceptions.ParseBaseException as e:
         explanation = e.explain()  # type: ignore
         for line in explanation.split("\n")[:-2]:
@@ -23,9 +61,58 @@ def main(args: argparse.Namespace):
     except SyntaxError as e:
         print(e)
 
+    if args.dump_python is not None:
+        if executor.python is None:
+            print("--dump-python needs --backend=python.", file=sys.stderr)
+        else:
+            with open(args.dump_python, "w", encoding="utf-8") as f:
+                f.write(executor.python.source())
+
+    if inliner is not None:
+        print(f"Inlined {inliner.inlined} calls.", file=sys.stderr)
+    if folder is not None:
+        print(f"Constant folding removed {folder.removed} nodes.", file=sys.stderr)
+    if executor.eliminator is not None:
+        print(
+            "Subexpression elimination removed "
+            + f"{executor.eliminator.removed} nodes.",
+            file=sys.stderr,
+        )
+    for name, cache in executor.call_caches.items():
+        print(
+            f"Calls to {name}: {cache.hits} cached, {cache.misses} evaluated.",
+            file=sys.stderr,
+        )
+
 
 if __name__ == "__main__":
     _argparser = argparse.ArgumentParser()
     _argparser.add_argument("filename")
+    _argparser.add_argument(
+        "--parser", choices=parse.BACKENDS, default=parse.DEFAULT_BACKEND
+    )
+    _argparser.add_argument("--optimize", action="store_true")
+    _argparser.add_argument("--inline", action="store_true")
+    _argparser.add_argument(
+        "--inline-size", type=int, default=optimize.MAX_INLINED_NODES
+    )
+    _argparser.add_argument("--cse", action="store_true")
+    _argparser.add_argument("--unchecked", action="store_true")
+    _argparser.add_argument(
+        "--backend", choices=execute.BACKENDS, default=execute.DEFAULT_BACKEND
+    )
+    _argparser.add_argument(
+        "--cache-calls", action="append", default=[], metavar="CALLABLE"
+    )
+    _argparser.add_argument(
+        "--call-cache-size", type=int, default=callcache.DEFAULT_SIZE
+    )
+    _argparser.add_argument("--max-steps", type=int)
+    _argparser.add_argument("--max-seconds", type=float)
+    _argparser.add_argument("--max-int-bits", type=int)
+    _argparser.add_argument("--dump-python", metavar="FILE")
+    _argparser.add_argument("--cache", action=argparse.BooleanOptionalAction)
+    _argparser.add_argument("--cache-dir")
+    _argparser.add_argument("--jobs", type=int, default=1)
     _args = _argparser.parse_args()
     main(_args)
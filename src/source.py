@@ -0,0 +1,34 @@
+"""Module providing the source map shared by the parser, executor and LSP."""
+
+import bisect
+import itertools
+
+
+class SourceFile:
+    """Source text with a precomputed table of line start offsets.
+
+    Lines and columns are 1-based, offsets are 0-based indices into
+    ``text``. A newline character belongs to the line it ends.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        line_lengths = (len(line) + 1 for line in text.split("\n"))
+        self.line_starts = list(itertools.accumulate(line_lengths, initial=0))[:-1]
+
+    def line(self, offset: int) -> int:
+        """Return the line containing the given offset."""
+        return bisect.bisect_right(self.line_starts, offset)
+
+    def col(self, offset: int) -> int:
+        """Return the column of the given offset within its line."""
+        return offset - self.line_starts[self.line(offset) - 1] + 1
+
+    def location(self, offset: int) -> tuple[int, int]:
+        """Return the (line, col) pair of the given offset."""
+        line = bisect.bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def offset(self, line: int, col: int) -> int:
+        """Return the offset of the given (line, col) pair."""
+        return self.line_starts[line - 1] + col - 1
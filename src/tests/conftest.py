@@ -0,0 +1,10 @@
+import pytest
+
+import parse
+
+
+@pytest.fixture(autouse=True, params=parse.BACKENDS)
+def parser_backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch):
+    """Run every test once against each parser backend."""
+    monkeypatch.setattr(parse, "DEFAULT_BACKEND", request.param)
+    return request.param
@@ -0,0 +1,10 @@
+import pytest
+
+import execute
+
+
+@pytest.fixture(autouse=True, params=execute.BACKENDS)
+def executor_backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch):
+    """Run every executor test once against each executor backend."""
+    monkeypatch.setattr(execute, "DEFAULT_BACKEND", request.param)
+    return request.param
@@ -0,0 +1,115 @@
+import itertools
+
+import pytest
+
+import batch
+import execute
+import parse
+
+np = pytest.importorskip("numpy")
+
+BODIES = [
+    "a + b * 2 - k",
+    "a / b",
+    "a ^ b",
+    "(a + 0.5) ^ b",
+    "a ^ (b / 3.)",
+    "a * 1.5 / b",
+    "a / 2 + g(c=b)",
+]
+
+
+def executor_with(definitions: str) -> execute.Executor:
+    executor = execute.Executor()
+    executor.exec(parse.Parser().parse(definitions))
+    return executor
+
+
+def call_each(executor: execute.Executor, a, b) -> "np.ndarray":
+    def val(value):
+        return execute.Int(value) if type(value) is int else execute.Num(value)
+
+    return np.array(
+        [
+            executor.call("f", {"a": val(x), "b": val(y)}).value
+            for x, y in zip(a.tolist(), b.tolist())
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "body, return_type, a_type, b_type",
+    list(itertools.product(BODIES, ("int", "num"), ("int", "num"), ("int", "num"))),
+)
+def test_batch_matches_calls(body, return_type, a_type, b_type):
+    executor = executor_with(
+        f"k: = 3\ng: int(c: {b_type}) = c * a\n"
+        + f"f: {return_type}(a: {a_type}, b: {b_type}) = {body}\n"
+    )
+    rng = np.random.default_rng(1)
+    a = rng.integers(-6, 7, 50) * (0.75 if a_type == "num" else 1)
+    b = rng.integers(-4, 5, 50) * (0.5 if b_type == "num" else 1)
+
+    try:
+        expected = call_each(executor, a, b)
+    except (SyntaxError, ArithmeticError, TypeError, ValueError) as e:
+        with pytest.raises(type(e)):
+            executor.call_batch("f", a=a, b=b)
+        return
+
+    result = executor.call_batch("f", a=a, b=b)
+    assert result.dtype == expected.dtype
+    assert np.array_equal(result, expected, equal_nan=True)
+
+
+def test_batch_vectorizes():
+    executor = executor_with("k: = 2\nf: int(a: int, b: num) = a / 2 * k + b\n")
+    vectorizer = batch.Vectorizer(executor.globals, executor.callables)
+
+    result = vectorizer.call(
+        executor.callables["f"], {"a": np.array([-3, 5]), "b": np.array(0.5)}, {}
+    )
+    assert result.dtype == np.int64
+    assert result.tolist() == [-1, 4]
+
+
+def test_batch_broadcasts():
+    executor = executor_with("f: num(a: int, b: num) = a * b\n")
+
+    result = executor.call_batch("f", a=np.arange(3)[:, None], b=np.array([1.0, 2.0]))
+    assert result.shape == (3, 2)
+    assert result.tolist() == [[0.0, 0.0], [1.0, 2.0], [2.0, 4.0]]
+
+
+def test_batch_large_ints_fall_back():
+    executor = executor_with("f: int(a: int) = a ^ 5\n")
+
+    result = executor.call_batch("f", a=np.array([10, 10000]))
+    assert result.tolist() == [100000, 10000**5]
+    with pytest.raises(batch.Unvectorizable):
+        batch.binary(
+            batch.vm.EXP,
+            np.array([10000]),
+            np.array([5]),
+        )
+
+
+def test_batch_errors_fall_back():
+    executor = executor_with("f: num(a: num) = 1 / a\n")
+
+    with pytest.raises(ZeroDivisionError):
+        executor.call_batch("f", a=np.array([1.0, 0.0]))
+
+
+def test_batch_undefined_callable():
+    executor = execute.Executor()
+
+    with pytest.raises(SyntaxError, match="f has not yet been defined"):
+        executor.call_batch("f", a=np.array([1]))
+
+
+def test_batch_invalid_array():
+    executor = executor_with("f: int(a: int) = a\n")
+
+    with pytest.raises(TypeError):
+        executor.call_batch("f", a=np.array(["1"]))
@@ -0,0 +1,123 @@
+import pickle
+from typing import Any
+
+import pytest
+
+import execute
+import parse
+
+# Each callable calls the one before twice, so f20 makes about 2^20 calls.
+DOUBLING = "f0: int(a: int) = a + 1\n" + "".join(
+    f"f{ii}: int(a: int) = f{ii - 1}(a=a) + f{ii - 1}(a=a)\n" for ii in range(1, 21)
+)
+
+
+def run(program: str, **limits: Any) -> tuple[execute.Executor, Any]:
+    executor = execute.Executor()
+    result = executor.exec(parse.Parser().parse(program), **limits)
+    return executor, result
+
+
+def test_steps_limited():
+    executor, _ = run(DOUBLING + "x: = 1\n")
+
+    with pytest.raises(execute.LimitExceeded, match="Step limit of 1000 exceeded"):
+        executor.exec(parse.Parser().parse("x = f20(a=x)\n"), max_steps=1000)
+    assert executor.globals["x"].value == 1
+
+
+def test_steps_count_all_statements():
+    program = parse.Parser().parse("x: = 1\n" + "x = x + 1\n" * 20)
+    executor = execute.Executor()
+
+    with pytest.raises(execute.LimitExceeded) as error:
+        executor.exec(program, max_steps=10)
+    # The statements before the one going over the limit have run.
+    assert 1 < error.value.line < 10
+    assert executor.globals["x"].value == error.value.line - 1
+
+
+def test_time_limited():
+    executor, _ = run(DOUBLING)
+
+    with pytest.raises(execute.LimitExceeded, match="Time limit of 0.01 seconds"):
+        executor.exec(parse.Parser().parse("f20(a=1)\n"), max_seconds=0.01)
+    assert executor.scope.frame == {}
+
+
+def test_int_size_limited(capsys):
+    program = "x: = 99\nx = x ^ x\necho x\nx = x ^ x\necho 1\n"
+    executor = execute.Executor()
+
+    with pytest.raises(execute.LimitExceeded) as error:
+        executor.exec(parse.Parser().parse(program), max_int_bits=1000)
+    assert str(error.value) == (
+        "Integer size limit of 1000 bits exceeded at line 4, col 5.\n"
+    )
+    assert (error.value.line, error.value.col) == (4, 5)
+    assert capsys.readouterr().out == f"{99**99}\n"
+    assert executor.globals["x"].value == 99**99
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "2 * 3 ^ 2000\n",
+        "f: int(a: int) = a ^ 2000\nf(a=3)\n",
+        "x: = 3\ny: = x * x ^ 2000\n",
+    ],
+    ids=["expression", "call", "variable"],
+)
+def test_int_size_estimated(source: str):
+    run(source, max_int_bits=4000)
+    with pytest.raises(execute.LimitExceeded, match="Integer size limit"):
+        run(source.replace("2000", "3000"), max_int_bits=4000)
+
+
+def test_huge_exponent_limited():
+    executor, _ = run("x: = 10 ^ 400\n")
+
+    with pytest.raises(execute.LimitExceeded, match="at line 1, col 6"):
+        executor.exec(parse.Parser().parse("y: = 2 ^ x\n"), max_int_bits=2000)
+    assert "y" not in executor.globals
+
+
+def test_num_size_not_limited():
+    _, result = run("2. ^ 1000 * 3\n", max_int_bits=10)
+    assert result.value == 2.0**1000 * 3
+
+
+def test_unchecked_int_size_limited():
+    executor = execute.Executor(unchecked=True)
+    program = parse.Parser().parse("x: int = 7\ny: = x * x ^ 5000\n")
+
+    with pytest.raises(execute.LimitExceeded, match="at line 2, col 10"):
+        executor.exec(program, max_int_bits=1000)
+
+
+@pytest.mark.parametrize("unchecked", [False, True])
+def test_limits_with_cached_calls(unchecked: bool):
+    executor = execute.Executor(unchecked=unchecked)
+    executor.cache_calls("g")
+    program = "g: int(a: int) = a + 1\nf: int(a: int) = g(a=a) * 2\nf(a=1)\n"
+
+    assert executor.exec(parse.Parser().parse(program)).value == 4
+    result: Any = executor.exec(parse.Parser().parse("f(a=1)\n"), max_steps=1000)
+    assert result.value == 4
+    assert executor.call_caches["g"].hits == 1
+
+
+def test_limits_apply_to_one_exec():
+    executor, _ = run(DOUBLING + "x: = 99\n", max_steps=1000)
+
+    result: Any = executor.exec(parse.Parser().parse("f10(a=1)\nx ^ x\n"))
+    assert result.value == 99**99
+    assert executor.scope.budget is None
+
+
+def test_limit_exceeded_pickles():
+    error = execute.LimitExceeded("Step limit of 10 exceeded", 3, 4)
+    copy = pickle.loads(pickle.dumps(error))
+
+    assert str(copy) == str(error)
+    assert (copy.line, copy.col) == (3, 4)
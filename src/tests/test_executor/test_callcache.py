@@ -0,0 +1,178 @@
+from typing import Any
+
+import pytest
+
+import callcache
+import execute
+import parse
+
+
+def run(executor: execute.Executor, program: str) -> Any:
+    result: Any = executor.exec(parse.Parser().parse(program))
+    return result.value
+
+
+def test_repeated_call_hits():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    assert run(executor, "f: int(a: int) = a * a\nf(a=3) + f(a=3) + f(a=4)\n") == 34
+    cache = executor.call_caches["f"]
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+
+def test_argument_types_keyed_apart():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    run(executor, "f: num(a: num) = a / 2\nf(a=0.)\n")
+    assert run(executor, "f(a=-0.)\n") == -0.0
+    assert str(run(executor, "f(a=-0.)\n")) == "-0.0"
+    assert executor.call_caches["f"].hits == 1
+
+
+def test_global_change_selects_new_entry():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    assert run(executor, "k: = 2\nf: int(a: int) = a * k\nf(a=5)\n") == 10
+    assert run(executor, "k = 3\nf(a=5)\n") == 15
+    assert run(executor, "k = 2\nf(a=5)\n") == 10
+    assert executor.call_caches["f"].hits == 1
+
+
+def test_caller_params_are_keyed():
+    executor = execute.Executor()
+    executor.cache_calls("g")
+
+    result = run(
+        executor,
+        "k: = 1\ng: int() = k + 1\nf: int(k: int) = g()\nf(k=5) + g() + f(k=5)\n",
+    )
+    assert result == 14
+    assert executor.call_caches["g"].hits == 1
+
+
+def test_redefinition_resets():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    assert run(executor, "f: int(a: int) = a + 1\nf(a=1)\n") == 2
+    assert run(executor, "f: int(a: int) = a + 2\nf(a=1)\n") == 3
+    cache = executor.call_caches["f"]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_callee_redefinition_resets():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    run(executor, "g: int() = 1\nf: int(a: int) = a + g()\nf(a=1)\n")
+    assert run(executor, "g: int() = 2\nf(a=1)\n") == 3
+    assert run(executor, "g: = 1\nf: int(a: int) = a + g\nf(a=1)\n") == 2
+    assert executor.call_caches["f"].hits == 0
+
+
+def test_cache_applies_to_defined_callable():
+    executor = execute.Executor()
+
+    run(executor, "f: int(a: int) = a\nf(a=1)\n")
+    executor.cache_calls("f")
+    run(executor, "f(a=1) + f(a=1)\n")
+    assert executor.call_caches["f"].hits == 1
+
+
+def test_least_recently_used_evicted():
+    executor = execute.Executor()
+    executor.cache_calls("f", size=2)
+
+    run(executor, "f: int(a: int) = a\nf(a=1) + f(a=2) + f(a=1) + f(a=3)\n")
+    cache = executor.call_caches["f"]
+    assert len(cache) == 2
+    run(executor, "f(a=1)\n")
+    assert cache.hits == 2
+    run(executor, "f(a=2)\n")
+    assert cache.hits == 2
+
+
+def test_failed_call_not_cached():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    executor.exec(parse.Parser().parse("f: int(a: int) = a + y\n"))
+    for _ in range(2):
+        with pytest.raises(SyntaxError):
+            run(executor, "f(a=1)\n")
+    assert len(executor.call_caches["f"]) == 0
+    run(executor, "y: = 1\n")
+    assert run(executor, "f(a=1)\n") == 2
+
+
+def test_failed_statement_counts_calls_once():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+    executor.cache_calls("g")
+
+    executor.exec(parse.Parser().parse("f: int(a: int) = a * a\ng: int() = y\n"))
+    with pytest.raises(ZeroDivisionError):
+        run(executor, "x: = f(a=2) + 1 / 0\n")
+    with pytest.raises(SyntaxError, match="Variable y"):
+        run(executor, "x: = f(a=3) + g()\n")
+    cache = executor.call_caches["f"]
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 2)
+    assert (executor.call_caches["g"].hits, executor.call_caches["g"].misses) == (
+        0,
+        1,
+    )
+
+
+def test_failed_statement_reads_cached_results():
+    executor = execute.Executor()
+    executor.cache_calls("g")
+
+    assert run(executor, "g: int(a: int) = a + 1\ng(a=1)\n") == 2
+    with pytest.raises(SyntaxError, match="unexpected paramuments"):
+        run(executor, "g(a=1) * 2 + g(b=1)\n")
+    assert run(executor, "g(a=1) * 2\n") == 4
+    cache = executor.call_caches["g"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_failed_call_counts_calls_once():
+    executor = execute.Executor()
+    executor.cache_calls("g")
+
+    executor.exec(
+        parse.Parser().parse("g: int(a: int) = a + 1\nf: int(a: int) = g(a=a) / a\n")
+    )
+    with pytest.raises(ZeroDivisionError):
+        executor.call("f", {"a": execute.Int(0)})
+    cache = executor.call_caches["g"]
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_recursive_callable_not_cached():
+    executor = execute.Executor()
+    executor.cache_calls("f")
+
+    executor.exec(parse.Parser().parse("f: int(a: int) = f(a=a)\n"))
+    assert executor.call_caches["f"].reads is None
+
+
+def test_read_names():
+    executor = execute.Executor()
+    run(executor, "g: int(b: int) = b + c\nf: int(a: int) = g(b=a) + d * a\n1\n")
+
+    assert callcache.read_names(executor.callables["f"], executor.callables) == (
+        "a",
+        "c",
+        "d",
+    )
+    assert callcache.read_names(
+        executor.callables["f"], executor.callables, {"g": ("b", "e")}
+    ) == ("a", "d", "e")
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        callcache.CallCache(0)
@@ -0,0 +1,114 @@
+from typing import Any
+
+import pytest
+
+import execute
+import parse
+
+# Deeper than parsing, building or evaluating could go by recursing with the
+# default limit.
+DEPTH = 3000
+
+
+def build(source: str) -> execute.Node:
+    (statement,) = parse.Parser(backend="fast").parse(source)[:1]
+    return execute.Node.new_node(statement, {"x": execute.Int(2)}, {})
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(" * DEPTH + "x" + ")" * DEPTH, 2),
+        ("1" + " + (1" * DEPTH + ")" * DEPTH, DEPTH + 1),
+        ("x" + " ^ 1" * DEPTH, 2),
+        ("(" * DEPTH + "x * 3 - 1" + ") * 2 / 2" * DEPTH, 5),
+    ],
+    ids=["parens", "sum", "exponents", "terms"],
+)
+def test_deeply_nested_expression(source: str, expected: int):
+    node = build(source + "\n")
+
+    result: Any = node.exec()
+    assert result.value == expected
+    assert node.exec().value == expected
+
+
+@pytest.mark.parametrize("options", [{}, {"unchecked": True}, {"cse": True}])
+def test_deep_statements(executor_backend: str, options: dict[str, bool]):
+    parser = parse.Parser(backend="fast")
+    executor = execute.Executor(**options)
+    program = (
+        "x: = " + "(" * DEPTH + "1" + ")" * DEPTH + "\n"
+        "f: int(a: int) = a" + " ^ 1" * DEPTH + "\n"
+        "y: = f(a=x) + 1\n"
+    )
+    if executor_backend == "vm" or options.get("cse"):
+        # Compiling for the vm and eliminating subexpressions recurse.
+        with pytest.raises(SyntaxError, match="Maximum recursion depth"):
+            executor.exec(parser.parse(program))
+        assert "x" not in executor.globals
+        return
+
+    # The python backend interprets what it cannot translate.
+    executor.exec(parser.parse(program))
+    assert executor.globals["y"].value == 2
+
+
+def test_builds_steps_when_evaluated_again():
+    node = build("(x + 1) * 3\n")
+
+    assert node.exec().value == 9
+    assert node.steps is None
+    assert node.exec().value == 9
+    assert node.steps is not None
+
+
+def test_deep_call_chain():
+    parser = parse.Parser()
+    executor = execute.Executor()
+    program = "f0: int(a: int) = a\n" + "".join(
+        f"f{ii}: int(a: int) = f{ii - 1}(a=a) + 1\n" for ii in range(1, 300)
+    )
+
+    executor.exec(parser.parse(program))
+    result: Any = executor.exec(parser.parse("f299(a=1)\n"))
+    assert result.value == 300
+
+
+def test_recursion_fails_and_leaves_call():
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    with pytest.raises(SyntaxError, match="In call 'f' at line 2, col 22"):
+        executor.exec(parser.parse("a: = 2\nf: int(a: int) = a + f(a=a)\nf(a=1)\n"))
+    assert executor.scope.frame == {}
+    result: Any = executor.exec(parser.parse("a\n"))
+    assert result.value == 2
+
+
+def test_call_depth_limited(monkeypatch):
+    monkeypatch.setattr(execute, "MAX_CALL_DEPTH", 10)
+    parser = parse.Parser()
+    executor = execute.Executor(backend="tree")
+    program = "f0: int() = 1\n" + "".join(
+        f"f{ii}: int() = f{ii - 1}()\n" for ii in range(1, 12)
+    )
+    executor.exec(parser.parse(program))
+
+    result: Any = executor.exec(parser.parse("f9()\n"))
+    assert result.value == 1
+    with pytest.raises(SyntaxError, match="In call 'f1' at line 3, col 13"):
+        executor.exec(parser.parse("f11()\n"))
+
+
+def test_steps_skip_wrappers():
+    node = build("x * (x + 1)\n")
+    steps = execute.build_steps(node)
+
+    assert [op for op, _ in steps] == [
+        execute.LOAD,
+        execute.LOAD,
+        execute.PUSH,
+        execute.BINARY,
+        execute.GROW,
+    ]
@@ -0,0 +1,215 @@
+from typing import Any
+
+import pytest
+
+import execute
+import optimize
+import parse
+
+PROGRAMS = [
+    "echo (3 + 3) ^ 2\n",
+    "echo 7 / 2 * 2\n",
+    "echo 1. * 2 / 4 + x\n",
+    "echo 2 * 3 * x\n",
+    "echo x * 2 * 3\n",
+    "echo x * 1 - 0 + 0\n",
+    "echo 1 * x / 1\n",
+    "echo ((x)) ^ 1\n",
+    "echo 2 ^ 3 ^ 2 - 2 ^ -1\n",
+    "echo (2 - 3) * 4. ^ 0.5\n",
+    "echo 1 / 0\n",
+    "echo (0 - 8.) ^ 0.5\n",
+    "f: num(a: int) = 1. * a / 2 + (3 + 3) ^ 2\necho f(a=(2 * 2))\n",
+]
+
+
+def run(program: str, fold: bool, capsys: pytest.CaptureFixture) -> tuple:
+    parser = parse.Parser()
+    executor = execute.Executor()
+    executor.globals["x"] = execute.Num(-0.0)
+    statements = parser.parse(program)
+    if fold:
+        statements = list(optimize.ConstantFolder().fold_all(statements))
+    try:
+        result: Any = executor.exec(statements)
+    except (ArithmeticError, TypeError, SyntaxError) as e:
+        result = repr(e)
+    else:
+        result = result.value
+    return capsys.readouterr().out, result
+
+
+@pytest.mark.parametrize("program", PROGRAMS)
+def test_folding_keeps_results(program, capsys):
+    assert run(program, True, capsys) == run(program, False, capsys)
+
+
+def test_folds_literals():
+    parser = parse.Parser()
+    folder = optimize.ConstantFolder()
+
+    statement = folder.fold(parser.parse("y: = 2 * (3 + 3) ^ 2 - x\n")[0])
+    first, _, second = statement.children[-1].children
+    assert optimize.literal_value(first).value == 72
+    assert optimize.literal_value(second) is None
+    assert folder.removed == 14
+
+
+def test_keeps_unsafe_identities():
+    parser = parse.Parser()
+    folder = optimize.ConstantFolder()
+
+    folder.fold(parser.parse("x + 0\n")[0])
+    folder.fold(parser.parse("x / 1\n")[0])
+    folder.fold(parser.parse("x * 1.\n")[0])
+    assert folder.removed == 0
+
+
+def test_large_power_left_to_run_time():
+    parser = parse.Parser()
+    folder = optimize.ConstantFolder()
+
+    statement = folder.fold(parser.parse("9 ^ 9 ^ 9\n")[0])
+    factor = statement.children[0].children[0]
+    assert optimize.literal_value(factor.children[2]).value == 9**9
+    assert optimize.literal_value(factor) is None
+
+
+INLINED_PROGRAMS = [
+    "y: = 3\nf: num(a: int, b: int) = 1. * a / b\necho f(a=y, b=2)\necho f(b=y, a=7)\n",
+    "y: = 3\nf: int(a: int) = a * a\necho f(a=y)\nf: int(a: int) = a + 1\necho f(a=y)\n",
+    "y: = 3.5\nf: int(a: int) = a * 2\necho f(a=y)\n",
+    "y: = 3\nf: num(a: int) = a * 2\necho f(a=y)\n",
+    "a: = 1\ng: int() = a + 1\nf: int(a: int) = g() * 2\necho f(a=5)\n",
+    "k: = 2\ng: int(c: int) = c * k\nf: int(a: int) = g(c=a) + a\necho f(a=5)\n",
+    "f: num(a: int) = a + y\necho f(a=1)\n",
+    "f: int(a: int) = f(a=a)\necho f(a=1)\n",
+    "f: int(a: int) = a\necho f(a=1, b=2)\n",
+    "f: num(a: num) = a\necho f(a=-0.)\necho f(a=x)\n",
+    "f: int(a: int) = a\nf: = 2\necho f\n",
+    "f: num(a: int, b: int) = (a + b) ^ 2 / 3\necho f(a=2, b=f(a=1, b=2))\n",
+]
+
+
+def run_inlined(program: str, inline: bool, capsys: pytest.CaptureFixture) -> tuple:
+    parser = parse.Parser()
+    executor = execute.Executor()
+    statements = parser.parse(program)
+    if inline:
+        statements = list(optimize.Inliner().inline_all(statements))
+    try:
+        result: Any = executor.exec(statements)
+    except (ArithmeticError, TypeError, SyntaxError) as e:
+        result = repr(e)
+    else:
+        result = result.value
+    return capsys.readouterr().out, result
+
+
+@pytest.mark.parametrize("program", INLINED_PROGRAMS)
+def test_inlining_keeps_results(program, capsys):
+    assert run_inlined(program, True, capsys) == run_inlined(program, False, capsys)
+
+
+def test_inlines_small_callables():
+    parser = parse.Parser()
+    inliner = optimize.Inliner()
+
+    statements = list(
+        inliner.inline_all(
+            parser.parse("y: = 2\nf: num(a: int) = a * y\nf(a=3) + f(a=y)\n")
+        )
+    )
+    assert inliner.inlined == 2
+    statement = optimize.ConstantFolder().fold(statements[-2])
+    assert "call" not in repr(statement)
+
+
+def test_inlining_follows_redefinitions():
+    parser = parse.Parser()
+    inliner = optimize.Inliner()
+    folder = optimize.ConstantFolder()
+
+    program = "f: int() = 1\nf()\nf: = 2\nf: int() = 3\nf()\n"
+    statements = [
+        folder.fold(statement)
+        for statement in inliner.inline_all(parser.parse(program))
+        if statement.type != "newline"
+    ]
+    assert inliner.inlined == 2
+    assert optimize.literal_value(statements[1]).value == 1
+    assert optimize.literal_value(statements[4]).value == 3
+
+
+def test_inlining_threshold():
+    parser = parse.Parser()
+    inliner = optimize.Inliner(max_nodes=5)
+
+    list(inliner.inline_all(parser.parse("f: int() = 1 + 2\nf()\ng: int() = 1\ng()\n")))
+    assert inliner.inlined == 1
+
+
+REPEATED_PROGRAMS = [
+    "x: = 3\ny: = 4.5\necho (x + y) * (x + y) ^ 2\n",
+    "x: = 2\necho x ^ x ^ x + x ^ x ^ x - x ^ x\n",
+    "x: = 2\ny: = x * x + (x * x + 1) * (x * x + 1)\necho y\n",
+    "x: = 2\ny: = 0\ny = (x - 1) * (x - 1) / (x - 1)\necho y\n",
+    "x: = 3\nf: int(a: int, b: int) = a * b + a * b\n"
+    + "echo f(b=x + 1, a=x + 1) + f(a=x + 1, b=2) * (x + 1)\n",
+    "x: = 3\ng: num(a: num) = a / 2\necho (g(a=x) + g(a=x)) * (g(a=x) + g(a=x))\n",
+    "x: = 1.5\ng: int() = x * x\nf: num(x: num) = g() + x * x\necho f(x=2.) + x * x\n",
+    "x: = 0\necho (1 / x) + (1 / x)\n",
+    "x: = 1\nf: int(a: int) = q + q * a + q * a\necho f(a=x)\n",
+    "f: int(a: int) = a\necho f(a=1, a=2) + f(a=1, a=2)\n",
+    "x: = 0.\necho x * -1. + x * -1 + x * -1.\n",
+]
+
+
+def run_eliminated(program: str, cse: bool, capsys: pytest.CaptureFixture) -> tuple:
+    executor = execute.Executor(cse=cse)
+    try:
+        result: Any = executor.exec(parse.Parser().parse(program))
+    except (ArithmeticError, TypeError, SyntaxError) as e:
+        result = repr(e)
+    else:
+        result = result.value
+    return capsys.readouterr().out, result
+
+
+@pytest.mark.parametrize("program", REPEATED_PROGRAMS)
+def test_elimination_keeps_results(program, capsys):
+    assert run_eliminated(program, True, capsys) == run_eliminated(
+        program, False, capsys
+    )
+
+
+def test_eliminates_repeated_operations():
+    executor = execute.Executor(cse=True)
+
+    executor.exec(parse.Parser().parse("x: = 2\n(x + 1) * (x + 1) + x * x\n"))
+    # The second x + 1 is read back: expr, 2 terms, 2 factors and 2 atoms.
+    assert executor.eliminator.removed == 8
+    executor.exec(parse.Parser().parse("x * (x + 1) + x * (x + 1)\n"))
+    # Only the outer repeated term is read back, not the x + 1 inside it.
+    assert executor.eliminator.removed == 8 + 14
+
+
+def test_elimination_in_bodies():
+    executor = execute.Executor(cse=True)
+
+    program = "a: = 2\nf: int(a: int) = (a + 1) * (a + 1)\nf(a=3) + f(a=4) + (a + 1)\n"
+    assert executor.exec(parse.Parser().parse(program)).value == 16 + 25 + 3
+    assert executor.eliminator.removed == 8
+
+
+def test_elimination_keeps_different_operations():
+    eliminator = optimize.SubexpressionEliminator()
+    executor = execute.Executor()
+
+    executor.exec(parse.Parser().parse("x: = 2.\ny: = 3\n"))
+    for program in ("x - y + (y - x)\n", "x * 0. + x * -0.\n", "x / y + x / 3\n"):
+        statement = execute.Node.new_node(
+            parse.Parser().parse(program)[0], executor.scope, executor.callables
+        )
+        eliminator.eliminate(statement)
+    assert eliminator.removed == 0
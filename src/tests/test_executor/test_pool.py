@@ -0,0 +1,53 @@
+import threading
+
+import parse
+import pool
+from tests.test_executor.test_budget import DOUBLING
+from tests.test_executor.test_vm import PROGRAMS
+
+
+def test_pool_matches_run():
+    programs = PROGRAMS + ["x: = \n", "y = 3\n"]
+    parser = parse.Parser()
+    expected = [pool.run_program(parser, program, None, {}) for program in programs]
+
+    with pool.Pool(2) as workers:
+        results = list(workers.run(programs))
+    assert [(r.output, r.value, r.error) for r in results] == expected
+
+
+def test_programs_isolated():
+    with pool.Pool(1) as workers:
+        first, second = workers.run(["x: = 1\necho x\n", "echo x\n"])
+    assert (first.output, first.error) == ("1\n", None)
+    assert "Variable x at line 1, col 6 is not yet defined" in second.error
+
+
+def test_timeout_replaces_worker():
+    with pool.Pool(1, timeout=0.2) as workers:
+        slow, fast = workers.run([DOUBLING + "f20(a=1)\n", "echo 1\n"])
+    assert slow.timed_out
+    assert slow.error == "Timed out after 0.2 seconds.\n"
+    assert (fast.output, fast.value, fast.timed_out) == ("1\n", 1, False)
+
+
+def test_crash_replaces_worker():
+    with pool.Pool(1) as workers:
+        # The worker dies while running the slow program, whatever the way
+        # processes are started.
+        timer = threading.Timer(0.2, lambda: workers.workers[0].process.kill())
+        timer.start()
+        try:
+            results = list(workers.run([DOUBLING + "f20(a=1)\n", "echo 2\n"]))
+        finally:
+            timer.cancel()
+    assert [result.output for result in results] == ["", "2\n"]
+    assert results[0].error.startswith("Worker process exited with code")
+    assert not results[0].timed_out
+
+
+def test_limits_passed():
+    with pool.Pool(1, max_int_bits=1000) as workers:
+        (result,) = workers.run(["x: = 99\nx = x ^ x\nx = x ^ x\n"])
+    assert result.error.startswith("Integer size limit of 1000 bits exceeded")
+    assert not result.timed_out
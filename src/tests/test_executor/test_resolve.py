@@ -0,0 +1,149 @@
+import io
+import sys
+from typing import Any
+
+import pytest
+
+import execute
+import literals
+import parse
+from astnode import AstNode
+
+
+def test_expression_resolved_once(monkeypatch):
+    parser = parse.Parser()
+    executor = execute.Executor()
+    executor.exec(parser.parse("x: = 4\n"))
+
+    (statement,) = parser.parse("x * (x + 1) ^ 2 - 3 / x")
+    node = execute.Node.new_node(statement, executor.globals, executor.callables)
+
+    def fail(*_):
+        raise AssertionError("Node created during exec.")
+
+    monkeypatch.setattr(execute.Node, "new_node", fail)
+    result: Any = node.exec()
+    second: Any = node.exec()
+    assert result.value == second.value == 100
+
+
+def test_callable_body_resolved_once(monkeypatch):
+    parser = parse.Parser()
+    executor = execute.Executor()
+    statements = parser.parse("f: int(a: int) = a * a + 1\nf(a=2) + f(a=3)\n")
+    new_node = execute.Node.new_node
+    built: list[Any] = []
+
+    def counted(node: Any, *args: Any):
+        built.append(node)
+        return new_node(node, *args)
+
+    monkeypatch.setattr(execute.Node, "new_node", counted)
+    result: Any = executor.exec(statements)
+    assert result.value == 15
+    assert built == statements
+
+
+def test_malformed_expression_rejected_before_exec():
+    term = parse.Parser().consume_term("1")["children"][0]
+    node = AstNode("expr", [term, "*", term], 1, 1, 0, 5)
+
+    with pytest.raises(SyntaxError, match="precidence 1 at line 1, col 1"):
+        execute.Node.new_node(node, {}, {})
+
+
+def test_deep_nesting_built_iteratively():
+    node = parse.Parser().consume_expr("2")["children"][0]
+    for _ in range(5 * sys.getrecursionlimit()):
+        atom = AstNode("atom", [literals.L_PAREN, node, literals.R_PAREN], 1, 1, 0, 5)
+        term = AstNode("term", [AstNode("factor", [atom], 1, 1, 0, 5)], 1, 1, 0, 5)
+        node = AstNode("expr", [term], 1, 1, 0, 5)
+
+    result: Any = execute.Node.new_node(node, {}, {}).exec()
+    assert result.value == 2
+
+
+def test_statements_checked_once(monkeypatch):
+    parser = parse.Parser()
+    executor = execute.Executor()
+    program = "f: int(a: int, b: int) = a * b\nx: int = f(a=2, b=3)\nx = x + 1\n"
+    nodes = [
+        execute.Node.new_node(statement, executor.globals, executor.callables)
+        for statement in parser.parse(program)
+    ]
+
+    def fail(*_):
+        raise AssertionError("Statement checked during exec.")
+
+    for node_type in (
+        execute.ArgListNode,
+        execute.ParamListNode,
+        execute.CallableNode,
+        execute.VarDefNode,
+        execute.VarSetNode,
+    ):
+        monkeypatch.setattr(node_type, "_resolve", fail)
+    results: list[Any] = [node.exec() for node in nodes if node is not None]
+    assert results[-1].value == 7
+
+
+@pytest.mark.parametrize(
+    "program, message",
+    [
+        ("f: int(a: int, a: int) = a\n", "line 1, col 8.Parameter a is repeated"),
+        ("f: int(a: str) = a\n", "str is not a valid type"),
+        ("f: str(a: int) = a\n", "str is not a valid return type"),
+        ("f: int(a: int) = a\nf(a=1, a=2)\n", "line 2, col 3.\nArgument a is repeated"),
+    ],
+)
+def test_invalid_statement_raises_when_run(program: str, message: str):
+    parser = parse.Parser()
+    executor = execute.Executor()
+    nodes = [
+        execute.Node.new_node(statement, executor.globals, executor.callables)
+        for statement in parser.parse(program)
+        if statement.type != "newline"
+    ]
+
+    for node in nodes[:-1]:
+        node.exec()
+    for _ in range(2):
+        with pytest.raises(SyntaxError, match=message):
+            nodes[-1].exec()
+
+
+def test_undefined_name_reported_before_running(capsys):
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    with pytest.raises(SyntaxError, match="Variable y at line 2, col 6"):
+        executor.exec(parser.parse("echo 1\necho y\n"))
+    with pytest.raises(SyntaxError, match="Variable y at line 1, col 14"):
+        executor.exec(parser.parse("echo 1 / 0 + y\n"))
+    with pytest.raises(SyntaxError, match="callable g has not yet been defined"):
+        executor.exec(parser.parse("echo 1 / 0 + g()\n"))
+    with pytest.raises(SyntaxError, match="y has not yet been defined"):
+        executor.exec(parser.parse("echo 1\ny = 1 / 0\n"))
+    assert capsys.readouterr().out == ""
+
+
+def test_names_defined_by_earlier_statements(capsys):
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    with pytest.raises(ZeroDivisionError):
+        executor.exec(parser.parse("echo 1\nx: = 1 / 0\necho x\n"))
+    with pytest.raises(SyntaxError, match="Variable x at line 1, col 6"):
+        executor.exec(parser.parse("echo x\n"))
+    result: Any = executor.exec(parser.parse("f: int() = x\nx: = 2\nf() + x\n"))
+    assert result.value == 4
+    assert capsys.readouterr().out == "1\n"
+
+
+def test_stream_checked_per_statement(capsys):
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    with pytest.raises(SyntaxError, match="Variable y at line 2, col 6"):
+        executor.exec(parser.parse_stream(io.StringIO("echo 1\necho y\n")))
+    assert capsys.readouterr().out == "1\n"
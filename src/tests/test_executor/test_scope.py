@@ -0,0 +1,52 @@
+from typing import Any
+
+import pytest
+
+import execute
+import parse
+
+
+def test_call_sees_caller_params():
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    result: Any = executor.exec(
+        parser.parse(
+            "a: = 1\ng: int() = a * 10\nf: int(a: int) = g() + a\nf(a=2) + g()\n"
+        )
+    )
+    assert result.value == 32
+
+
+def test_call_leaves_globals_untouched():
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    executor.exec(parser.parse("a: = 1\nf: int(a: int) = a\nb: = f(a=5)\n"))
+    assert executor.globals["a"].value == 1
+    assert executor.globals["b"].value == 5
+    assert executor.scope.frame == {}
+
+
+def test_frame_dropped_after_error():
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    executor.exec(parser.parse("f: int(a: int) = a + y\n"))
+    with pytest.raises(SyntaxError):
+        executor.exec(parser.parse("f(a=1)\n"))
+    assert executor.scope.frame == {}
+
+    with pytest.raises(SyntaxError):
+        executor.exec(parser.parse("a\n"))
+
+
+def test_scope_assigns_globals():
+    globals_: dict[str, execute.Val] = {"x": execute.Int(1)}
+    scope = execute.Scope(globals_)
+    scope.frame = {"a": execute.Int(2)}
+
+    scope["y"] = execute.Int(3)
+    assert sorted(scope) == ["a", "x", "y"]
+    assert scope["a"].value == 2
+    assert "a" not in globals_ and globals_["y"].value == 3
@@ -0,0 +1,30 @@
+import io
+
+import pytest
+import pyparsing.exceptions
+
+import execute
+import parse
+
+
+def test_exec_stream(capsys):
+    """Test that statements run as they are parsed."""
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    program = io.StringIO("x: = 2\necho x * 3\ny: = (\n")
+    with pytest.raises(pyparsing.exceptions.ParseBaseException):
+        executor.exec(parser.parse_stream(program))
+
+    assert capsys.readouterr().out == "6\n"
+    assert executor.globals["x"].value == 2
+
+
+def test_exec_stream_result():
+    """Test that executing a stream returns the last statement's value."""
+    parser = parse.Parser()
+    executor = execute.Executor()
+
+    program = io.StringIO("f: int(a: int) = a * a\nx: int = f(a=4)\nx + 1\n")
+    result = executor.exec(parser.parse_stream(program))
+    assert result.value == 17
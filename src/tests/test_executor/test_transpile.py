@@ -0,0 +1,115 @@
+from typing import Any
+
+import pytest
+
+import execute
+import parse
+import transpile
+from tests.test_executor.test_vm import PROGRAMS, run
+
+
+@pytest.mark.parametrize("program", PROGRAMS)
+def test_python_matches_tree(program, capsys):
+    tree = run("tree", program, capsys)
+    assert run("python", program, capsys) == tree
+
+
+def test_python_mutual_recursion_error():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="python")
+
+    with pytest.raises(SyntaxError, match="Maximum recursion depth"):
+        executor.exec(
+            parser.parse("f: int() = g()\ng: int() = f()\nf: int() = g()\nf()\n")
+        )
+
+
+def test_python_interprets_what_python_cannot_compile():
+    parser = parse.Parser(backend="fast")
+    executor = execute.Executor(backend="python")
+
+    # Translates to calls nested deeper than Python compiles.
+    executor.exec(
+        parser.parse(
+            "f: int(a: int) = a + 1\ng: int(a: int) = a" + " ^ 1" * 250 + "\n"
+            "x: = f(a=1) + g(a=2)\n"
+        )
+    )
+    source = executor.python.source()
+    assert "def c_f(v_a):" in source
+    assert "def c_g(*args):\n    _fail()\n" in source
+    assert executor.globals["x"].value == 4
+
+
+def test_python_source():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="python")
+
+    executor.exec(parser.parse("k: = 2\nf: int(a: int) = a / k\nx: num = f(a=7) ^ 2\n"))
+    source = executor.python.source()
+    assert "def c_f(v_a, v_k):\n    return int(_div(v_a, v_k))\n" in source
+    assert "_result = v_x = float(_exp(c_f(7, v_k), 2))\n" in source
+    assert executor.globals["x"].value == 9.0
+
+
+def test_python_source_runs(capsys):
+    parser = parse.Parser()
+    executor = execute.Executor(backend="python")
+
+    executor.exec(
+        parser.parse("g: int() = a * 2\nf: num(a: int) = g() + 0.5\necho f(a=3)\n")
+    )
+    assert capsys.readouterr().out == "6.5\n"
+    exec(compile(executor.python.source(), "<test>", "exec"), {})
+    assert capsys.readouterr().out == "6.5\n"
+
+
+def test_python_redefinition_regenerates():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="python")
+
+    result: Any = executor.exec(
+        parser.parse(
+            "g: int() = 1\nf: int(a: int) = a + g()\ng: int() = b\nb: = 5\nf(a=1)\n"
+        )
+    )
+    assert result.value == 6
+    assert executor.python.signatures["f"] == ("a", "b")
+
+
+def test_python_definition_regenerates_changed_functions():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="python")
+
+    executor.exec(
+        parser.parse("g: int() = 1\nf: int(a: int) = a + g()\nh: int() = 2\n")
+    )
+    h = executor.python.namespace["c_h"]
+    executor.exec(parser.parse("g: int() = b\nb: = 5\n"))
+    assert executor.python.namespace["c_h"] is h
+    assert executor.python.signatures["f"] == ("a", "b")
+
+    source = executor.python.source()
+    assert source.count("def c_g(") == 1
+    assert "def c_f(v_a, v_b):\n" in source
+    executor.exec(parser.parse("f: int() = 3\n"))
+    assert executor.python.source().count("def c_f(") == 1
+
+
+def test_python_call_caches():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="python")
+    executor.cache_calls("f")
+
+    result: Any = executor.exec(
+        parser.parse("f: int(a: int) = a * a\nf(a=3) + f(a=3)\n")
+    )
+    assert result.value == 18
+    cache = executor.call_caches["f"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_literal():
+    assert transpile.literal(3) == "3"
+    assert transpile.literal(0.1) == "0.1"
+    assert transpile.literal(float("inf")) == "float('inf')"
@@ -0,0 +1,95 @@
+import io
+from typing import Any
+
+import pyparsing.exceptions
+import pytest
+
+import execute
+import parse
+from tests.test_executor.test_optimize import INLINED_PROGRAMS, REPEATED_PROGRAMS
+from tests.test_executor.test_vm import PROGRAMS
+
+
+def run(program: str, capsys: pytest.CaptureFixture, **options: Any) -> tuple:
+    executor = execute.Executor(**options)
+    try:
+        result: Any = executor.exec(parse.Parser().parse(program))
+    except (ArithmeticError, TypeError, SyntaxError) as e:
+        result = repr(e)
+    else:
+        result = getattr(result, "value", type(result).__name__)
+    return capsys.readouterr().out, result
+
+
+@pytest.mark.parametrize("cse", [False, True])
+@pytest.mark.parametrize("program", PROGRAMS + REPEATED_PROGRAMS + INLINED_PROGRAMS)
+def test_unchecked_keeps_results(program, cse, capsys):
+    checked = run(program, capsys, cse=cse)
+    assert run(program, capsys, cse=cse, unchecked=True) == checked
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        "echo 1\nf: num(a: num) = a / 2\necho f(a=3)\n",
+        "x: = 20.\ny: = 1\nf: num(a: int) = a - y\necho f(a=y - x)\n",
+        "f: num(a: int) = a / 2\necho f(a=3.)\necho f(a=3)\n",
+        "k: = 2\ng: int(c: int) = c / k\nf: int(k: num) = g(c=k)\necho f(k=1.5)\n",
+        "f: int(a: int) = f(a=a)\nf(a=1)\n",
+        "f: int(a: int) = a + y\nf(a=1)\n",
+        "f: int(a: int) = a + y\ny: num = 2\necho f(a=1)\necho f(a=1)\n",
+    ],
+)
+def test_runs_unproven_statements_checked(program, capsys):
+    checked = run(program, capsys)
+    assert run(program, capsys, unchecked=True) == checked
+
+
+def test_checks_statements_as_they_run(capsys):
+    executor = execute.Executor(unchecked=True)
+    program = io.StringIO("echo 1\nf: num(a: num) = a / 2\necho f(a=3)\ny: = (\n")
+    with pytest.raises(pyparsing.exceptions.ParseBaseException):
+        executor.exec(parse.Parser().parse_stream(program))
+    assert capsys.readouterr().out == "1\n1.0\n"
+
+
+def test_rewrites_typed_operations():
+    executor = execute.Executor(unchecked=True)
+    parser = parse.Parser()
+
+    executor.exec(parser.parse("x: = 7\ny: num = x\nf: int(a: int) = a / 2 + z\n"))
+    statement = executor._new_node(parser.parse("y = x / 2 + y\n")[0])
+    list(executor.checker.check_all([statement], executor.globals, executor.callables))
+    assert isinstance(statement.children[2].first, execute.UncheckedNode)
+    assert not statement.converts
+    assert executor.exec([parser.parse("y = x / 2 + y\n")[0]]).value == 10.0
+
+    # The body only knows the type of its parameter, not of z.
+    body = executor.callables["f"].definition
+    assert isinstance(body.first, execute.UncheckedNode)
+    assert isinstance(body.rest[0][1], execute.IdentNode)
+
+
+def test_follows_types_between_statements():
+    executor = execute.Executor(unchecked=True)
+    parser = parse.Parser()
+
+    executor.exec(parser.parse("k: = 3\ng: num() = k / 2\n"))
+    assert executor.exec(parser.parse("g()\n")).value == 1.0
+    executor.exec(parser.parse("k: = 3.\n"))
+    assert executor.exec(parser.parse("g()\n")).value == 1.5
+    with pytest.raises(ZeroDivisionError):
+        executor.exec(parser.parse("k: int = 1 / 0\n"))
+    assert executor.exec(parser.parse("k / 2\n")).value == 1.5
+
+
+def test_call_checks_argument_types():
+    executor = execute.Executor(unchecked=True)
+
+    executor.exec(parse.Parser().parse("f: num(a: num) = a / 2\n"))
+    body = executor.callables["f"].definition
+    assert executor.call("f", {"a": execute.Num(3.0)}).value == 1.5
+    assert executor.callables["f"].definition is body
+    # The body was rewritten for a num, so is built again.
+    assert executor.call("f", {"a": execute.Int(3)}).value == 1.0
+    assert executor.callables["f"].definition is not body
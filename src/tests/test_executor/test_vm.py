@@ -0,0 +1,104 @@
+from typing import Any
+
+import pytest
+
+import execute
+import parse
+import vm
+
+PROGRAMS = [
+    "x: = 2\necho x * 3 + 1\ny: num = x / 4\necho y\nx = 7.9\necho x\n",
+    "f: int(a: int) = a * a + 1\necho f(a=2) + f(a=3)\n",
+    "f: num(a: int, b: num) = a / b\necho f(a=3, b=2.)\necho f(b=4, a=1)\n",
+    # Bodies see the parameters of their callers.
+    "g: int() = a + 1\nf: int(a: int) = g() * 2\necho f(a=5)\n",
+    "a: = 1\ng: int() = a + 1\nf: int(a: int) = g()\necho f(a=5)\necho g()\n",
+    "x: = 1\nx: int() = 2\necho x()\nx: = 3\necho x\n",
+    "echo 2 ^ 3 ^ 2\necho (1 + 2) * 3 - 4 / 2\n",
+    "echo 1\necho y\n",
+    "echo 1\necho f()\n",
+    "y = 2\n",
+    "x: bool = 1\n",
+    "f: int(a: int) = a\necho f(a=1, a=2)\n",
+    "f: int(a: int) = a\necho f()\n",
+    "f: int(a: int) = a\necho f(a=1, b=2)\n",
+    "f: int(a: bool) = a\n",
+    "f: bool() = 1\n",
+    "f: int() = f()\necho 1\necho f()\n",
+    "f: int(a: int) = a\necho f(a=y, a=2)\n",
+    "x: = 1\necho x + f\n",
+]
+
+
+def run(backend: str, program: str, capsys: pytest.CaptureFixture) -> tuple:
+    parser = parse.Parser()
+    executor = execute.Executor(backend=backend)
+    try:
+        result: Any = executor.exec(parser.parse(program))
+    except SyntaxError as e:
+        result = ("error", str(e))
+    else:
+        result = getattr(result, "value", result)
+    values = {name: val.value for name, val in executor.globals.items()}
+    return capsys.readouterr().out, result, values, sorted(executor.callables)
+
+
+@pytest.mark.parametrize("program", PROGRAMS)
+def test_vm_matches_tree(program, capsys):
+    tree = run("tree", program, capsys)
+    assert run("vm", program, capsys) == tree
+
+
+def test_vm_recursion_error():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="vm")
+
+    with pytest.raises(SyntaxError, match="In call 'f' at line 1, col 18"):
+        executor.exec(parser.parse("f: int(a: int) = f(a=a) + 1\nf(a=1)\n"))
+
+
+def test_vm_unsupported_backend():
+    with pytest.raises(ValueError):
+        execute.Executor(backend="jit")
+
+
+def test_compile_statement():
+    parser = parse.Parser()
+    statement = parser.parse("x: num = y * (2 + y)\n")[0]
+    node = execute.Node.new_node(statement, {}, {})
+    machine = vm.VM()
+    machine.variables["y"] = execute.Int(2)
+
+    code = machine.compile(node)
+    assert [vm.OPNAMES[op] for op in code.ops] == [
+        "LOAD_NAME",
+        "LOAD_CONST",
+        "LOAD_NAME",
+        "ADD",
+        "MUL",
+        "COERCE",
+        "STORE_NAME",
+        "DELETE_CALLABLE",
+        "RETURN",
+    ]
+    assert code.names == ["y", "x"]
+    assert machine.run(code).value == 8.0
+    assert {name: val.value for name, val in machine.variables.items()} == {
+        "y": 2,
+        "x": 8.0,
+    }
+
+
+def test_params_bound_in_slots():
+    parser = parse.Parser()
+    executor = execute.Executor(backend="vm")
+
+    executor.exec(parser.parse("a: = 5\nf: int(a: int) = a / 0\ng: int() = a\n"))
+    with pytest.raises(ZeroDivisionError):
+        executor.exec(parser.parse("f(a=1)\n"))
+    assert executor.globals["a"].value == 5
+
+    result: Any = executor.exec(parser.parse("a = 6\ng()\n"))
+    assert result.value == 6
+    assert sorted(executor.globals) == ["a"]
+    assert sorted(executor.callables) == ["f", "g"]
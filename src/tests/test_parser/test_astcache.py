@@ -0,0 +1,137 @@
+"""Test the on-disk AST cache."""
+
+import os
+
+import pytest
+import pyparsing.exceptions
+
+import astcache
+import parse
+
+PROGRAM = "x: = 3 + 3\nf: int(a: int) = a * x\necho f(a=2)\n"
+
+
+class CountingParser(parse.Parser):
+    """Parser counting how often a file is parsed."""
+
+    def __init__(self):
+        self.parses = 0
+        super().__init__()
+
+    def parse_stream(self, lines):
+        self.parses += 1
+        return super().parse_stream(lines)
+
+
+def write_source(tmp_path, text=PROGRAM):
+    filename = tmp_path / "prog.mi"
+    filename.write_text(text)
+    return str(filename)
+
+
+def test_cache_cold_and_warm(tmp_path):
+    """Test that the second run loads the AST instead of parsing."""
+    filename = write_source(tmp_path)
+    parser = CountingParser()
+
+    cold = list(astcache.parse_cached(parser, filename))
+    assert os.path.exists(tmp_path / astcache.CACHE_DIR_NAME / "prog.mi.ast")
+    warm = list(astcache.parse_cached(parser, filename))
+
+    assert parser.parses == 1
+    assert cold == warm == parse.Parser().parse(PROGRAM)
+
+
+def test_cache_invalidated_by_source(tmp_path):
+    """Test that changing the source parses it again."""
+    filename = write_source(tmp_path)
+    parser = CountingParser()
+    list(astcache.parse_cached(parser, filename))
+
+    write_source(tmp_path, "y: = 1\n")
+    result = list(astcache.parse_cached(parser, filename))
+    assert parser.parses == 2
+    assert result == parse.Parser().parse("y: = 1\n")
+
+
+def test_cache_invalidated_by_grammar_version(tmp_path, monkeypatch):
+    """Test that entries of another grammar version are not used."""
+    filename = write_source(tmp_path)
+    parser = CountingParser()
+    list(astcache.parse_cached(parser, filename))
+
+    monkeypatch.setattr(parse, "GRAMMAR_VERSION", parse.GRAMMAR_VERSION + 1)
+    list(astcache.parse_cached(parser, filename))
+    assert parser.parses == 2
+
+
+def test_cache_corrupt_entry(tmp_path):
+    """Test that an unreadable entry is replaced."""
+    filename = write_source(tmp_path)
+    path = astcache.cache_path(filename)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"garbage")
+
+    parser = CountingParser()
+    assert list(astcache.parse_cached(parser, filename)) == parse.Parser().parse(
+        PROGRAM
+    )
+    list(astcache.parse_cached(parser, filename))
+    assert parser.parses == 1
+
+
+def test_cache_skips_parse_errors(tmp_path):
+    """Test that programs that fail to parse leave no entry behind."""
+    filename = write_source(tmp_path, "x: = 1\ny: = (\n")
+    with pytest.raises(pyparsing.exceptions.ParseBaseException):
+        list(astcache.parse_cached(parse.Parser(), filename))
+
+    assert os.listdir(tmp_path / astcache.CACHE_DIR_NAME) == []
+
+
+def test_cache_completed_when_stopped_early(tmp_path):
+    """Test that the entry is written when the consumer stops reading."""
+    filename = write_source(tmp_path)
+    parser = CountingParser()
+    statements = astcache.parse_cached(parser, filename)
+    next(statements)
+    statements.close()
+
+    warm = list(astcache.parse_cached(parser, filename))
+    assert parser.parses == 1
+    assert warm == parse.Parser().parse(PROGRAM)
+
+
+def test_cache_stopped_early_before_parse_error(tmp_path):
+    """Test that stopping early leaves no entry for a program that fails later."""
+    filename = write_source(tmp_path, "x: = 1\ny: = (\n")
+    statements = astcache.parse_cached(parse.Parser(), filename)
+    next(statements)
+    statements.close()
+
+    assert os.listdir(tmp_path / astcache.CACHE_DIR_NAME) == []
+
+
+def test_cache_dir(tmp_path):
+    """Test that entries can be kept in a separate directory."""
+    filename = write_source(tmp_path)
+    cache_dir = tmp_path / "cache"
+    parser = CountingParser()
+    list(astcache.parse_cached(parser, filename, str(cache_dir)))
+    list(astcache.parse_cached(parser, filename, str(cache_dir)))
+
+    assert parser.parses == 1
+    assert len(os.listdir(cache_dir)) == 1
+    assert not os.path.exists(tmp_path / astcache.CACHE_DIR_NAME)
+
+
+def test_cache_parallel_parse(tmp_path):
+    """Test that entries written by a parallel parse are used."""
+    filename = write_source(tmp_path, PROGRAM * 20)
+    parser = CountingParser()
+    cold = list(astcache.parse_cached(parser, filename, processes=2))
+    warm = list(astcache.parse_cached(parser, filename))
+
+    assert parser.parses == 0
+    assert cold == warm == parse.Parser().parse(PROGRAM * 20)
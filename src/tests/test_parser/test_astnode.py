@@ -0,0 +1,52 @@
+"""Test the AST node class and its dict compatibility view."""
+
+import pytest
+
+import execute
+import parse
+from astnode import AstNode
+
+
+def test_node_is_slotted():
+    """Test that parsed nodes carry no per-instance dict."""
+    (node,) = parse.Parser().parse("x = 1 + 2")
+    assert isinstance(node, AstNode)
+    assert not hasattr(node, "__dict__")
+
+
+def test_node_mapping_view():
+    """Test that nodes can be read and written like the former dicts."""
+    node = parse.Parser().consume_ident("abc")["children"]
+    assert node["type"] == "ident"
+    assert node["children"] == "abc"
+    assert dict(node) == {
+        "col": 1,
+        "children": "abc",
+        "type": "ident",
+        "line": 1,
+        "start": 0,
+        "end": 3,
+    }
+
+    node["line"] = 4
+    assert node.line == 4
+    with pytest.raises(KeyError):
+        node["value"]
+    with pytest.raises(KeyError):
+        node["value"] = 1
+
+
+def test_node_dict_round_trip():
+    """Test that trees convert to plain dicts and back without changes."""
+    ast = parse.Parser().parse("f: int(a: int) = a * 2\necho f(a=3)\n")
+    plain = [node.as_dict() for node in ast]
+    assert all(type(node) is dict for node in plain)
+    assert plain == ast
+    assert [AstNode.from_dict(node) for node in plain] == ast
+
+
+def test_executor_accepts_dicts(capsys):
+    """Test that the executor still runs trees of plain dicts."""
+    ast = parse.Parser().parse("x: = 6\necho x * 7\n")
+    execute.Executor().exec(node.as_dict() for node in ast)
+    assert capsys.readouterr().out == "42\n"
@@ -0,0 +1,43 @@
+"""Test that the pyparsing grammar is shared between parsers."""
+
+import pytest
+import pyparsing.exceptions
+
+import parse
+
+
+def test_grammar_shared():
+    """Test that parsers reuse one grammar."""
+    assert parse.Parser().grammar is parse.Parser().grammar
+    assert parse.Parser(backend="pyparsing").grammar is parse.grammar()
+
+
+def test_grammar_built_lazily(monkeypatch):
+    """Test that creating a parser does not build the grammar."""
+    monkeypatch.setattr(parse, "_grammar", None)
+    parser = parse.Parser(backend="pyparsing")
+    assert parse._grammar is None
+
+    parser.parse("x = 1\n")
+    assert parse._grammar is not None
+
+
+def test_grammar_parsers_independent():
+    """Test that parsers sharing the grammar keep their own state."""
+    first = parse.Parser(backend="pyparsing")
+    second = parse.Parser(backend="pyparsing")
+    first_ast = first.parse("x: = 1\n\ny: = 2\n")
+    second_ast = second.parse("\n\n\n\nz: = 3\n")
+
+    assert first.source.text == "x: = 1\n\ny: = 2\n"
+    assert [node.line for node in first_ast] == [1, 1, 2, 3, 3]
+    assert [node.line for node in second_ast] == [1, 2, 3, 4, 5, 5]
+    assert first.grammar.parser is None
+
+
+def test_grammar_released_after_error():
+    """Test that a failed parse does not leave its parser attached."""
+    parser = parse.Parser(backend="pyparsing")
+    with pytest.raises(pyparsing.exceptions.ParseBaseException):
+        parser.parse("x = (\n")
+    assert parser.grammar.parser is None
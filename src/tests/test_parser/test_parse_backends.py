@@ -0,0 +1,73 @@
+"""Test that the parser backends produce identical ASTs."""
+
+import pyparsing.exceptions
+import pytest
+
+import parse
+
+PROGRAMS = [
+    "x: = 3 + 3\n\nx = x ^ x\n\ny:int = x + 3\n",
+    "func: num(a: int, b: int) = 1. * a / b\n\necho func(a=x, b=y)\n",
+    "f: int() = 3\nf()\n(1+2)^-3\n",
+    "5 + 5 * (4 - 31. ^ 3 ^ 2 / (3 * 10 ^ 8)) / 7 / 3.^-2 + -2*10^5",
+    "\n    x: num = 1e5 - +2 * 5-3\n  echo x\n",
+    "g: int(a: int,) = a\necho g(a=1,)\n",
+]
+
+
+def test_backends_same_ast():
+    """Test that both backends parse programs to the same AST."""
+    for program in PROGRAMS:
+        expected = parse.Parser(backend="pyparsing").parse(program)
+        result = parse.Parser(backend="fast").parse(program)
+        assert result == expected, program
+
+
+def test_backends_same_rule_ast():
+    """Test that both backends parse single rules to the same AST."""
+    rules = [
+        ("consume_paramlist", "a: int, b: num,"),
+        ("consume_callable", "int()"),
+        ("consume_arglist", "a = 1, b = x ^ 2"),
+        ("consume_factor", "(hello) ^ (1234.7890 ^ 4) ^ (my_var)"),
+        ("consume_int", "-5"),
+    ]
+    for method, text in rules:
+        expected = getattr(parse.Parser(backend="pyparsing"), method)(text)
+        result = getattr(parse.Parser(backend="fast"), method)(text)
+        assert result == expected, text
+
+
+def test_fast_backend_rejects_trailing_input():
+    """Test that the fast backend reports unparsable input."""
+    parser = parse.Parser(backend="fast")
+    try:
+        parser.parse("x = (1 + 2")
+    except pyparsing.exceptions.ParseBaseException:
+        return
+
+    assert False
+
+
+def test_deep_nesting(parser_backend):
+    """Test that nesting is only limited by the Python stack with pyparsing."""
+    program = "x: = " + "(" * 3000 + "1" + ")" * 3000 + " ^ 1" * 3000 + "\n"
+    parser = parse.Parser()
+    if parser_backend == "pyparsing":
+        with pytest.raises(SyntaxError, match="Maximum recursion depth"):
+            parser.parse(program)
+        return
+
+    statement = parser.parse(program)[0]
+    assert statement.type == "vardef"
+    assert statement.end == len(program) - 1
+
+
+def test_unknown_backend():
+    """Test that an unknown backend name is rejected."""
+    try:
+        parse.Parser(backend="unknown")
+    except ValueError:
+        return
+
+    assert False
@@ -0,0 +1,77 @@
+"""Test that statements are chosen by lookahead instead of backtracking."""
+
+import pytest
+import pyparsing.exceptions
+
+import parse
+from astnode import AstNode
+
+
+class CountingParser(parse.Parser):
+    """Parser counting how often the ident and expr parse actions run."""
+
+    def __init__(self):
+        self.idents = 0
+        self.exprs = 0
+        super().__init__(backend="pyparsing")
+
+    def consume_ident(self, input_str, position, parse_result=None):
+        self.idents += 1
+        return super().consume_ident(input_str, position, parse_result)
+
+    def consume_expr(self, input_str, position, parse_result=None):
+        self.exprs += 1
+        return super().consume_expr(input_str, position, parse_result)
+
+
+def count_nodes(node, node_type):
+    if not isinstance(node, AstNode):
+        return 0
+    count = int(node.type == node_type)
+    if isinstance(node.children, list):
+        count += sum(count_nodes(child, node_type) for child in node.children)
+    return count
+
+
+def test_statement_parsed_once():
+    """Test that each identifier of a statement is consumed exactly once."""
+    programs = [
+        ("x = a + b\n", 3),
+        ("x: int = a\n", 3),
+        ("x: = a\n", 2),
+        ("f: int(a: int, b: int,) = a\n", 7),
+        ("echo f(a=b, c=d)\n", 5),
+        ("a * b\n", 2),
+    ]
+    for program, idents in programs:
+        parser = CountingParser()
+        parser.parse(program)
+        assert parser.idents == idents, program
+
+
+def test_expressions_parsed_once():
+    """Test that no expression is parsed again after a failed alternative."""
+    program = (
+        "x: = (1 + 2) * 3\n"
+        + "f: int(a: int, b: int) = a * (b - 1) ^ 2\n"
+        + "echo f(a=f(a=1, b=2), b=(x + 1) ^ 2)\n"
+        + "y = x + x * x - x / x ^ x\n"
+    )
+    parser = CountingParser()
+    statements = parser.parse(program)
+    assert parser.exprs == sum(count_nodes(node, "expr") for node in statements)
+
+
+def test_echo_prefixed_identifier():
+    """Test that identifiers starting with echo are not echo statements."""
+    parser = parse.Parser(backend="pyparsing")
+    (statement,) = parser.parse("echoes = 1")
+    assert statement["type"] == "varset"
+
+
+def test_dispatch_reports_errors():
+    """Test that a malformed statement of a chosen kind is an error."""
+    parser = parse.Parser(backend="pyparsing")
+    for program in ("x: int = \n", "f: int(a: int = a\n", "x = \n"):
+        with pytest.raises(pyparsing.exceptions.ParseBaseException):
+            parser.parse(program)
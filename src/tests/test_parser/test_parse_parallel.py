@@ -0,0 +1,36 @@
+"""Test parsing a program in pieces across worker processes."""
+
+import pytest
+import pyparsing.exceptions
+
+import parse
+from tests.test_parser.test_parse_backends import PROGRAMS
+
+PROGRAM = "".join(PROGRAMS) * 3
+
+
+def test_split_lines():
+    """Test that pieces cover the input and end at line ends."""
+    pieces = parse.split_lines(PROGRAM, 7)
+    assert "".join(text for _, _, text in pieces) == PROGRAM
+    for offset, lines, text in pieces:
+        assert PROGRAM.startswith(text, offset)
+        assert PROGRAM.count("\n", 0, offset) == lines
+        assert offset == 0 or PROGRAM[offset - 1] == "\n"
+
+
+def test_parallel_same_ast():
+    """Test that a parallel parse equals a serial parse."""
+    expected = parse.Parser().parse(PROGRAM)
+    assert parse.Parser().parse_parallel(PROGRAM, 2) == expected
+    assert parse.Parser().parse_parallel(PROGRAM, 1) == expected
+
+
+def test_parallel_error_location():
+    """Test that parse errors report their line in the whole input."""
+    program = PROGRAM + "y: = x +\n" + PROGRAM
+    with pytest.raises(pyparsing.exceptions.ParseBaseException) as e:
+        parse.Parser().parse_parallel(program, 2)
+
+    assert e.value.lineno == PROGRAM.count("\n") + 1
+    assert e.value.line == "y: = x +"
@@ -0,0 +1,41 @@
+"""Test parsing a program one statement at a time."""
+
+import io
+
+import pytest
+import pyparsing.exceptions
+
+import parse
+from tests.test_parser.test_parse_backends import PROGRAMS
+
+
+def test_stream_same_ast():
+    """Test that streamed statements equal the statements of a full parse."""
+    for program in PROGRAMS:
+        expected = parse.Parser().parse(program)
+        result = list(parse.Parser().parse_stream(io.StringIO(program)))
+        assert result == expected, program
+
+
+def test_stream_is_lazy():
+    """Test that a statement is yielded before later lines are read."""
+    read = []
+
+    def lines():
+        for line in ("x: = 1\n", "echo x\n"):
+            read.append(line)
+            yield line
+
+    statements = parse.Parser().parse_stream(lines())
+    assert next(statements)["type"] == "vardef"
+    assert read == ["x: = 1\n"]
+
+
+def test_stream_error_location():
+    """Test that parse errors report their line in the whole input."""
+    program = "x: = 1\n\ny: = x +\n"
+    with pytest.raises(pyparsing.exceptions.ParseBaseException) as e:
+        list(parse.Parser().parse_stream(io.StringIO(program)))
+
+    assert e.value.lineno == 3
+    assert e.value.line == "y: = x +"
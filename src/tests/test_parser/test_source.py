@@ -0,0 +1,60 @@
+"""Test the source map and the positions the parser records."""
+
+import parse
+from source import SourceFile
+
+
+def _nodes(node):
+    if isinstance(node, dict):
+        yield node
+        if isinstance(node["children"], list):
+            for child in node["children"]:
+                yield from _nodes(child)
+
+
+def test_source_location():
+    """Test that offsets map to 1-based lines and columns."""
+    source = SourceFile("ab\ncd\n\nef")
+    assert source.location(0) == (1, 1)
+    assert source.location(2) == (1, 3)
+    assert source.location(3) == (2, 1)
+    assert source.location(7) == (4, 1)
+    assert source.location(9) == (4, 3)
+    assert source.offset(2, 2) == 4
+
+
+def test_source_empty():
+    """Test that an empty source has a single line."""
+    source = SourceFile("")
+    assert source.location(0) == (1, 1)
+
+
+def test_node_spans():
+    """Test that every node covers exactly its own text."""
+    text = "x: = 3 + 3\n\n  y:int = x ^\t2\necho f(a=x, b=(y))\n"
+    parser = parse.Parser()
+    source = SourceFile(text)
+    for statement in parser.parse(text):
+        for node in _nodes(statement):
+            segment = text[node["start"] : node["end"]]
+            assert segment == segment.strip(" \t")
+            assert source.location(node["start"]) == (node["line"], node["col"])
+            if isinstance(node["children"], str):
+                assert segment == node["children"]
+
+
+def test_statement_positions():
+    """Test the positions of indented statements on later lines."""
+    parser = parse.Parser()
+    vardef = parser.parse("\n\n   x: = 1")[2]
+    assert (vardef["line"], vardef["col"]) == (3, 4)
+    assert (vardef["start"], vardef["end"]) == (5, 11)
+
+
+def test_lines_restart_per_parse():
+    """Test that each parse counts lines from the start of its input."""
+    parser = parse.Parser()
+    parser.parse("x: = 1\ny: = 2\n")
+    echo = parser.parse("echo 1")[0]
+    assert echo["line"] == 1
+    assert parser.source.text == "echo 1"
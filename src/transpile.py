@@ -0,0 +1,447 @@
+"""Module translating mira to Python source, run with ``compile()``.
+
+Callables become functions that also take the names their bodies read, as
+worked out by ``callcache.read_names``, which keeps the dynamic scoping of
+the interpreter. Statements that fail are run again by the interpreter.
+"""
+
+import math
+from collections.abc import MutableMapping
+from typing import Any, Iterable, Iterator
+
+import callcache
+import execute
+import literals
+
+PRELUDE = """\
+from callcache import key as _key
+from execute import Int as _Int, Num as _Num
+
+
+def _div(left, right):
+    value = left / right
+    if type(left) is int and type(right) is int:
+        return int(value)
+    return value
+
+
+def _exp(left, right):
+    value = left ** right
+    if type(value) is not int:
+        if type(left) is int and type(right) is int:
+            return int(value)
+        # Raises for a complex value, as Num does.
+        return float(value)
+    return value
+
+
+def _fail():
+    raise RuntimeError("Statement fails in mira")
+"""
+
+OPERATORS = {
+    literals.OP_ADD: "+",
+    literals.OP_SUB: "-",
+    literals.OP_MUL: "*",
+}
+CONVERSIONS = {execute.Int: "int", execute.Num: "float"}
+# Cached results are values, as the interpreter reads them too.
+BOXES = {execute.Int: "_Int", execute.Num: "_Num"}
+
+
+def variable(name: str) -> str:
+    return f"v_{name}"
+
+
+def function(name: str) -> str:
+    return f"c_{name}"
+
+
+def failing(name: str) -> str:
+    # A function whose calls fail, leaving them to the interpreter.
+    return f"def {function(name)}(*args):\n    _fail()\n"
+
+
+def literal(value: int | float) -> str:
+    if isinstance(value, float) and not math.isfinite(value):
+        return f"float({str(value)!r})"
+    return repr(value)
+
+
+class Variables(MutableMapping):
+    """The variables of a program, mapping names to ``Int`` and ``Num``."""
+
+    __slots__ = ("namespace",)
+
+    def __init__(self, namespace: dict[str, Any]):
+        self.namespace = namespace
+
+    def __getitem__(self, name: str) -> execute.Val:
+        value = self.namespace[variable(name)]
+        return execute.Int(value) if type(value) is int else execute.Num(value)
+
+    def __setitem__(self, name: str, value: execute.Val):
+        self.namespace[variable(name)] = value.value
+
+    def __delitem__(self, name: str):
+        del self.namespace[variable(name)]
+
+    def __iter__(self) -> Iterator[str]:
+        for key in list(self.namespace):
+            if key.startswith("v_"):
+                yield key[2:]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class Translator:
+    """Translates expressions to Python, given the signatures of functions."""
+
+    def __init__(
+        self,
+        callables: dict[str, execute.Callable],
+        signatures: dict[str, tuple[str, ...] | None],
+    ):
+        self.callables = callables
+        self.signatures = signatures
+        # The temporary of each repeated subexpression, by id of its node.
+        self.temps: dict[int, str] = {}
+
+    def value(self, node: Any) -> str:
+        if isinstance(node, (execute.ExprNode, execute.TermNode)):
+            source = self.value(node.first)
+            for op, operand in node.rest:
+                if op == literals.OP_DIV:
+                    source = f"_div({source}, {self.value(operand)})"
+                else:
+                    source = f"({source} {OPERATORS[op]} {self.value(operand)})"
+            return source
+        if isinstance(node, execute.FactorNode):
+            source = self.value(node.base)
+            for exponent in node.exponents:
+                source = f"_exp({source}, {self.value(exponent)})"
+            return source
+        if isinstance(node, execute.UncheckedNode):
+            # The operand types are known, so no helper has to check them.
+            source = self.value(node.first)
+            for (op, result_type), (_, operand) in zip(node.ops, node.rest):
+                right = self.value(operand)
+                if op == literals.OP_DIV and result_type is execute.Int:
+                    source = f"int({source} / {right})"
+                elif op == literals.OP_DIV:
+                    source = f"({source} / {right})"
+                elif op == literals.OP_EXP:
+                    convert = CONVERSIONS[result_type]
+                    source = f"{convert}(({source}) ** {right})"
+                else:
+                    source = f"({source} {OPERATORS[op]} {right})"
+            return source
+        if isinstance(node, execute.AtomNode):
+            return self.value(node.value)
+        if isinstance(node, execute.IdentNode):
+            return variable(node.value)
+        if isinstance(node, (execute.IntNode, execute.NumNode)):
+            return literal(node.value)
+        if isinstance(node, execute.CallNode):
+            return self.call(node)
+        if isinstance(node, execute.SubexprNode):
+            temp = self.temps[id(node)] = f"_t{len(self.temps)}"
+            return f"({temp} := {self.value(node.value)})"
+        if isinstance(node, execute.SubexprRefNode):
+            # Without a temporary, the call holding it always fails first.
+            return self.temps.get(id(node.source), "_fail()")
+        raise ValueError(f"Cannot translate node: {type(node).__name__}\n")
+
+    def call(self, node: execute.CallNode) -> str:
+        callable_name = node.callable_name()
+        args = dict(node.children[2].items())
+        callable_ = self.callables.get(callable_name)
+        signature = self.signatures.get(callable_name)
+        if (
+            callable_ is None
+            or signature is None
+            or set(args) != set(callable_.type.params)
+        ):
+            return "_fail()"
+
+        # Arguments are passed in the order of the parameters, followed by
+        # the values the caller sees for the other names the callee reads.
+        # Arguments given in another order are passed by name, so they are
+        # still evaluated in order, as a temporary is set before it is read.
+        if list(args) == list(callable_.type.params):
+            values = [self.value(expr) for expr in args.values()]
+            values += [variable(name) for name in signature[len(args) :]]
+        else:
+            values = [
+                f"{variable(name)}={self.value(expr)}" for name, expr in args.items()
+            ]
+            values += [
+                f"{variable(name)}={variable(name)}" for name in signature[len(args) :]
+            ]
+        return f"{function(callable_name)}({', '.join(values)})"
+
+
+class Program:
+    """A mira program run as Python, with the callables of the interpreter.
+
+    ``callables`` is the mapping of ``execute.Callable`` objects the
+    interpreter uses, which stays the definition of each callable.
+    """
+
+    def __init__(self, callables: dict[str, execute.Callable]):
+        self.callables = callables
+        self.namespace: dict[str, Any] = {}
+        self.variables = Variables(self.namespace)
+        self.signatures: dict[str, tuple[str, ...] | None] = {}
+        # The callable and cache each function was generated for, with the
+        # callables its body calls and its source.
+        self.functions: dict[str, tuple[Any, Any, set[str], str]] = {}
+        # The callables calling each name, and the caches of the functions
+        # that have one, by name.
+        self.callers: dict[str, set[str]] = {}
+        self.caches: dict[str, callcache.CallCache] = {}
+        # The statements run so far.
+        self.chunks: list[str] = []
+        self.run(PRELUDE)
+
+    def source(self) -> str:
+        """Return the Python source of the functions and statements run so far."""
+        functions = [source for *_, source in self.functions.values()]
+        return "\n\n".join([PRELUDE, *functions, *self.chunks])
+
+    def run(self, source: str):
+        exec(compile(source, "<mira>", "exec"), self.namespace)
+
+    def define(self, names: Iterable[str] | None = None):
+        """Generate the functions of callables defined, deleted or given a
+        cache since the last call, and of their callers that change with them.
+
+        Only the callables with the given names are checked, or all of them.
+        """
+        if names is None:
+            names = [*self.functions]
+            names += [name for name in self.callables if name not in self.functions]
+        changed = []
+        for name in names:
+            callable_ = self.callables.get(name)
+            generated = self.functions.get(name)
+            if callable_ is None:
+                if generated is not None:
+                    changed.append(name)
+            elif (
+                generated is None
+                or generated[0] is not callable_
+                or generated[1] is not callable_.cache
+            ):
+                changed.append(name)
+        if not changed:
+            return
+
+        # Only callers of a changed callable, directly or not, may read other
+        # names through it.
+        affected = dict.fromkeys(changed)
+        todo = list(changed)
+        while todo:
+            for caller in self.callers.get(todo.pop(), ()):
+                if caller not in affected:
+                    affected[caller] = None
+                    todo.append(caller)
+
+        for name in changed:
+            if name in self.functions:
+                for callee in self.functions[name][2]:
+                    self.callers[callee].discard(name)
+            if name not in self.callables:
+                del self.functions[name]
+                del self.namespace[function(name)]
+                self.namespace.pop(f"_cache_{name}", None)
+                self.caches.pop(name, None)
+
+        # The signatures of the others are known and used as they are.
+        previous = {name: self.signatures.pop(name, None) for name in affected}
+        outdated = set(changed)
+        for name in affected:
+            callable_ = self.callables.get(name)
+            if callable_ is not None:
+                signature = callcache.read_names(
+                    callable_, self.callables, self.signatures
+                )
+                if signature != previous[name]:
+                    outdated.add(name)
+                self.signatures[name] = signature
+
+        # A function is generated again if it or a callable it calls changed.
+        sources = []
+        for name in affected:
+            callable_ = self.callables.get(name)
+            if callable_ is None:
+                continue
+            if name in self.functions and name not in changed:
+                callees = self.functions[name][2]
+            else:
+                try:
+                    callees = callable_.reads()[1]
+                except SyntaxError:
+                    callees = set()
+                for callee in callees:
+                    self.callers.setdefault(callee, set()).add(name)
+            if name not in outdated and not callees & outdated:
+                continue
+            source = self.function(name, callable_)
+            self.functions[name] = (callable_, callable_.cache, callees, source)
+            self.namespace.pop(f"_cache_{name}", None)
+            self.caches.pop(name, None)
+            if callable_.cache is not None:
+                self.namespace[f"_cache_{name}"] = callable_.cache
+                self.caches[name] = callable_.cache
+            sources.append(name)
+        if not sources:
+            return
+        try:
+            self.run("\n\n".join(self.functions[name][3] for name in sources))
+        except (SyntaxError, RecursionError):
+            # Python cannot compile bodies nested too deeply, so those fail
+            # and calls to them are interpreted.
+            for name in sources:
+                try:
+                    self.run(self.functions[name][3])
+                except (SyntaxError, RecursionError):
+                    source = failing(name)
+                    self.functions[name] = (*self.functions[name][:3], source)
+                    self.run(source)
+
+    def function(self, name: str, callable_: execute.Callable) -> str:
+        signature = self.signatures[name]
+        if signature is None:
+            return failing(name)
+
+        params = ", ".join(variable(param) for param in signature)
+        convert = CONVERSIONS[callable_.type.return_type]
+        try:
+            body = Translator(self.callables, self.signatures).value(
+                callable_.definition
+            )
+        except (SyntaxError, RecursionError):
+            # Such as a body nested too deeply to translate.
+            body = "_fail()"
+
+        if callable_.cache is None:
+            return f"def {function(name)}({params}):\n    return {convert}({body})\n"
+
+        # The parameters are the names read by the body, as cache keys are.
+        cache = f"_cache_{name}"
+        key = f"({params},)" if params else "()"
+        box = BOXES[callable_.type.return_type]
+        return (
+            f"def {function(name)}({params}):\n"
+            + f"    key = _key({key})\n"
+            + f"    value = {cache}.get(key)\n"
+            + "    if value is None:\n"
+            + f"        value = {convert}({body})\n"
+            + f"        {cache}.store(key, {box}(value))\n"
+            + "        return value\n"
+            + "    return value.value\n"
+        )
+
+    def statement(self, node: execute.Node) -> str | None:
+        """Translate a statement, or return None to interpret it instead."""
+        translator = Translator(self.callables, self.signatures)
+        if isinstance(node, execute.VarDefNode):
+            var_name, var_type = node.target()
+            value = translator.value(node.children[-1])
+            if var_type is not None and node.converts:
+                value = f"{CONVERSIONS[var_type]}({value})"
+            return f"_result = {variable(var_name)} = {value}\n"
+        if isinstance(node, execute.VarSetNode):
+            target = variable(node.target())
+            value = translator.value(node.children[2])
+            if node.converts:
+                value = f"type({target})({value})"
+            return f"_result = {target} = {value}\n"
+        if isinstance(node, execute.EchoNode):
+            value = translator.value(node.expression())
+            return f"_result = {value}\nprint(_result, flush=True)\n"
+        if isinstance(node, execute.ExprNode):
+            return f"_result = {translator.value(node)}\n"
+        return None
+
+    def exec(self, node: execute.Node, interpret: bool = False) -> Any:
+        """Run a top level statement, returning its result.
+
+        With ``interpret``, the statement is run by the interpreter instead,
+        keeping the generated functions up to date.
+        """
+        try:
+            source = None if interpret else self.statement(node)
+        except (SyntaxError, RecursionError):
+            # Invalid statements fail in the interpreter the same way.
+            return node.exec()
+        if source is None:
+            result = node.exec()
+            if isinstance(node, execute.CallableDefNode):
+                self.define([node.children[0].value])
+            elif isinstance(node, execute.VarDefNode):
+                self.define([node.target()[0]])
+            return result
+
+        saved = self._save_caches()
+        try:
+            exec(compile(source, "<mira>", "exec"), self.namespace)
+        except ArithmeticError:
+            # Raised by the same operations on the same values as in the
+            # interpreter, before anything is assigned.
+            raise
+        except Exception:
+            # Such as a name that is not defined, which the interpreter
+            # reports with its position. Nothing has changed but the caches.
+            self._restore_caches(saved)
+            return node.exec()
+        self.chunks.append(source)
+
+        if isinstance(node, execute.VarDefNode):
+            var_name = node.target()[0]
+            if var_name in self.callables:
+                del self.callables[var_name]
+                self.define([var_name])
+
+        result = self.namespace.pop("_result")
+        return execute.Int(result) if type(result) is int else execute.Num(result)
+
+    def _save_caches(self) -> list[tuple[callcache.CallCache, int, int, Any]]:
+        # Calls made before failing are only counted once, by the interpreter.
+        return [
+            (cache, cache.hits, cache.misses, cache.entries.copy())
+            for cache in self.caches.values()
+        ]
+
+    @staticmethod
+    def _restore_caches(saved: list[tuple[callcache.CallCache, int, int, Any]]):
+        for cache, hits, misses, entries in saved:
+            cache.hits, cache.misses, cache.entries = hits, misses, entries
+
+    def call(self, callable_: execute.Callable, params: dict[str, execute.Val]) -> Any:
+        """Call a callable as top level code would, returning its result."""
+        signature = self.signatures.get(callable_.name)
+        if signature is not None and set(params) == set(callable_.type.params):
+            saved = self._save_caches()
+            try:
+                result = self.namespace[function(callable_.name)](
+                    *(params[name].value for name in callable_.type.params),
+                    *(
+                        self.namespace[variable(name)]
+                        for name in signature[len(params) :]
+                    ),
+                )
+            except ArithmeticError:
+                # Raised by the same operations as in the interpreter.
+                raise
+            except Exception:
+                # Such as a global that is not defined, which the interpreter
+                # reports. Calls made by then are counted by it instead.
+                self._restore_caches(saved)
+            else:
+                return (
+                    execute.Int(result) if type(result) is int else execute.Num(result)
+                )
+        return callable_.call(params)
@@ -0,0 +1,339 @@
+"""Module inferring the types of mira statements to run them unchecked.
+
+``TypeChecker`` rewrites what it proves well typed to skip runtime checks
+and conversions, and leaves the rest to run checked.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Type
+
+import execute
+import literals
+import vm
+
+TYPE_NAMES = {execute.Int: "int", execute.Num: "num"}
+
+
+def result_type(left: Type[execute.Val], right: Type[execute.Val]) -> type:
+    """Return the type of an operator applied to values of the given types."""
+    if left is execute.Int and right is execute.Int:
+        return execute.Int
+    return execute.Num
+
+
+def argument_error(
+    node: execute.CallNode, name: str, param_type: type, arg_type: type
+) -> SyntaxError:
+    return SyntaxError(
+        f"Invalid call at line {node.line}, col {node.col}.\n"
+        + f"Argument {name} must be {TYPE_NAMES[param_type]}, "
+        + f"not {TYPE_NAMES[arg_type]}.\n"
+    )
+
+
+def recursion_error(node: execute.CallNode, name: str) -> SyntaxError:
+    return SyntaxError(
+        f"Invalid call at line {node.line}, col {node.col}.\n"
+        + f"Callable {name} calls itself, which never ends.\n"
+    )
+
+
+def operands(node: Any) -> list[tuple[str | None, Any]] | None:
+    """Return the operators and operands of an operation, None for others.
+
+    The first operand has no operator, and wrappers such as an expression
+    without operators hold one operand.
+    """
+    if isinstance(node, (execute.ExprNode, execute.TermNode)):
+        return [(None, node.first)] + node.rest
+    if isinstance(node, execute.FactorNode):
+        return [(None, node.base)] + [
+            (literals.OP_EXP, exponent) for exponent in node.exponents
+        ]
+    if isinstance(node, execute.UncheckedNode):
+        return [(None, node.first)] + [
+            (op, operand) for (op, _), (_, operand) in zip(node.ops, node.rest)
+        ]
+    if isinstance(node, execute.AtomNode):
+        return [(None, node.value)]
+    return None
+
+
+class TypeChecker:
+    """Check and rewrite statements, following the variables they define.
+
+    ``globals`` holds the type of each defined variable, and ``callables``
+    each defined callable, an ``execute.Callable`` or ``vm.Function``.
+    """
+
+    def __init__(self):
+        self.globals: dict[str, type] = {}
+        self.callables: dict[str, Any] = {}
+        # The types of repeated subexpressions, by id of their first node.
+        self.subexpr_types: dict[int, type | None] = {}
+        # The types of the bodies checked for the current statement, by
+        # callable and the types of the names they see.
+        self.bodies: dict[tuple, type | None] = {}
+        # The definitions whose bodies have been rewritten, by name.
+        self.rewritten: dict[str, execute.CallableDefNode] = {}
+
+    def sync(self, variables: Mapping[str, execute.Val], callables: Mapping):
+        """Follow the variables and callables an executor has defined."""
+        self.globals = {name: type(value) for name, value in variables.items()}
+        self.callables = dict(callables.items())
+
+    def check_all(
+        self,
+        statements: Iterable[execute.Node | None],
+        variables: Mapping[str, execute.Val],
+        callables: Mapping,
+    ) -> Iterator[execute.Node | None]:
+        """Yield statements to run once the given names are defined.
+
+        Each statement is checked as it is taken, once the ones before it
+        have run. A statement that is not well typed is yielded after
+        definitions giving the callables back their original bodies, see
+        ``restore``, so it runs as it would checked.
+        """
+        self.sync(variables, callables)
+        for statement in statements:
+            if statement is not None:
+                try:
+                    self.check(statement)
+                except (SyntaxError, RecursionError):
+                    yield from self.restore()
+                    yield statement
+                    # What it defined is only known once it has run.
+                    self.sync(variables, callables)
+                    continue
+            yield statement
+
+    def restore(self) -> list[execute.CallableDefNode]:
+        """Return definitions giving the rewritten callables their bodies back.
+
+        Bodies are rewritten for the declared types of their parameters, so
+        code that may pass others runs after these definitions.
+        """
+        definitions = []
+        for name, statement in self.rewritten.items():
+            callable_ = self.callables.get(name)
+            if callable_ is not None and callable_.definition is statement.children[4]:
+                definitions.append(
+                    execute.Node.new_node(
+                        statement.ast, statement.varspace, statement.callspace
+                    )
+                )
+        self.rewritten = {}
+        return definitions
+
+    def check_call(
+        self,
+        name: str,
+        params: Mapping[str, execute.Val],
+        variables: Mapping[str, execute.Val],
+        callables: Mapping,
+    ):
+        """Check a call from top level, as ``Executor.call`` makes.
+
+        Raises SyntaxError if it is not well typed.
+        """
+        self.sync(variables, callables)
+        callable_ = self.callables[name]
+        execute.check_params(name, callable_.type, dict(params))
+        for param, value in params.items():
+            param_type = callable_.type.params[param]
+            if type(value) is not param_type:
+                raise SyntaxError(
+                    f"Invalid call to {name}.\n"
+                    + f"Argument {param} must be {TYPE_NAMES[param_type]}, "
+                    + f"not {TYPE_NAMES[type(value)]}.\n"
+                )
+        self.bodies = {}
+        self._body(callable_, {**self.globals, **callable_.type.params}, (name,))
+
+    def check(self, statement: execute.Node) -> execute.Node:
+        """Check a top level statement and rewrite it in place.
+
+        Raises SyntaxError if it is not well typed. What was rewritten by
+        then stays, as each rewrite holds on its own.
+        """
+        self.bodies = {}
+        if isinstance(statement, execute.VarDefNode):
+            var_name, var_type = statement.target()
+            value_type = self._root(statement, len(statement.children) - 1)
+            if var_type is None:
+                var_type = value_type
+            elif var_type is value_type:
+                statement.converts = False
+            self.globals[var_name] = var_type
+            self.callables.pop(var_name, None)
+        elif isinstance(statement, execute.VarSetNode):
+            var_name = statement.target()
+            if var_name not in self.globals:
+                raise vm.undefined_reset(var_name, statement.line, statement.col)
+            if self._root(statement, 2) is self.globals[var_name]:
+                statement.converts = False
+        elif isinstance(statement, execute.EchoNode):
+            statement.expression()
+            self._root(statement, 1)
+        elif isinstance(statement, execute.CallableDefNode):
+            name: str = statement.children[0].value
+            callable_type: execute.CallableType = statement.children[2].exec()
+            # Wherever the body runs, only its parameters have known types.
+            self._root(statement, 4, dict(callable_type.params), strict=False)
+            self.callables[name] = execute.Callable(
+                name, callable_type, statement.children[4]
+            )
+            self.rewritten[name] = statement
+            self.globals.pop(name, None)
+        elif isinstance(statement, execute.ExprNode):
+            _, value = self._value(statement, self.globals, True, True, ())
+            self._unwrap(statement, value)
+        return statement
+
+    def _root(
+        self,
+        statement: Any,
+        index: int,
+        env: dict[str, type] | None = None,
+        strict: bool = True,
+    ) -> type | None:
+        """Check and rewrite the expression of a statement."""
+        expr = statement.children[index]
+        if env is None:
+            env = self.globals
+        value_type, value = self._value(expr, env, strict, True, ())
+        self._unwrap(expr, value)
+        return value_type
+
+    @staticmethod
+    def _unwrap(expr: Any, value: Any):
+        # Statements and arguments hold expressions, so the expression
+        # becomes a wrapper of the rewritten value.
+        if value is not expr and isinstance(expr, execute.ExprNode):
+            expr.first, expr.rest = value, []
+
+    def _value(
+        self,
+        node: Any,
+        env: dict[str, type],
+        strict: bool,
+        rewrite: bool,
+        calling: tuple[str, ...],
+    ) -> tuple[type | None, Any]:
+        """Return the type of a node, None if not known, and its rewrite.
+
+        ``env`` maps the names the node sees to their types. Unless
+        ``strict``, names not in it have types that are not known yet and
+        nothing raises, as the node may never run. ``calling`` holds the
+        callables whose bodies the node is in.
+        """
+        if isinstance(node, execute.IntNode):
+            return execute.Int, node
+        if isinstance(node, execute.NumNode):
+            return execute.Num, node
+        if isinstance(node, execute.IdentNode):
+            if node.value in env:
+                return env[node.value], node
+            if strict:
+                raise vm.undefined_variable(node.value, node.line, node.col)
+            return None, node
+        if isinstance(node, execute.CallNode):
+            return self._call(node, env, strict, rewrite, calling), node
+        if isinstance(node, execute.SubexprNode):
+            value_type, value = self._value(node.value, env, strict, rewrite, calling)
+            if rewrite:
+                node.value = value
+            self.subexpr_types[id(node)] = value_type
+            return value_type, node
+        if isinstance(node, execute.SubexprRefNode):
+            return self.subexpr_types[id(node.source)], node
+
+        children = operands(node)
+        if children is None:
+            return None, node
+        typed = [
+            self._value(operand, env, strict, rewrite, calling)
+            for _, operand in children
+        ]
+        types = [value_type for value_type, _ in typed]
+        value_type = None if None in types else types[0]
+        result_types = []
+        for operand_type in types[1:]:
+            if value_type is not None:
+                value_type = result_type(value_type, operand_type)
+            result_types.append(value_type)
+        if not rewrite:
+            return value_type, node
+
+        values = [value for _, value in typed]
+        ops = [op for op, _ in children[1:]]
+        if len(values) == 1:
+            # Wrappers are dropped, saving a step each time they run.
+            return value_type, values[0]
+        if value_type is not None:
+            return value_type, execute.UncheckedNode(
+                node, values[0], list(zip(ops, values[1:])), result_types
+            )
+        if isinstance(node, execute.FactorNode):
+            node.base, node.exponents = values[0], values[1:]
+        else:
+            node.first, node.rest = values[0], list(zip(ops, values[1:]))
+        return None, node
+
+    def _call(
+        self,
+        node: execute.CallNode,
+        env: dict[str, type],
+        strict: bool,
+        rewrite: bool,
+        calling: tuple[str, ...],
+    ) -> type | None:
+        """Check the arguments of a call, returning the type of its result."""
+        try:
+            name = node.callable_name()
+            args = list(node.children[2].items())
+        except SyntaxError:
+            if strict:
+                raise
+            return None
+
+        arg_types = {}
+        for arg_name, expr in args:
+            arg_types[arg_name], value = self._value(
+                expr, env, strict, rewrite, calling
+            )
+            if rewrite:
+                self._unwrap(expr, value)
+        if not strict:
+            # The callable may be another one by the time the call runs.
+            return None
+
+        callable_ = self.callables.get(name)
+        if callable_ is None:
+            raise vm.undefined_callable(name, node.line, node.col)
+        if name in calling:
+            raise recursion_error(node, name)
+        params = callable_.type.params
+        execute.check_params(name, callable_.type, dict.fromkeys(arg_types))
+        for arg_name, arg_type in arg_types.items():
+            if arg_type is not params[arg_name]:
+                raise argument_error(node, arg_name, params[arg_name], arg_type)
+
+        body_type = self._body(callable_, {**env, **params}, calling + (name,))
+        if rewrite and body_type is callable_.type.return_type:
+            # Only top level calls are rewritten strictly, where the callable
+            # and the names its body sees are known.
+            node.checked = False
+        return callable_.type.return_type
+
+    def _body(
+        self, callable_: Any, env: dict[str, type], calling: tuple[str, ...]
+    ) -> type | None:
+        """Check the body of a callable against the names a call sees."""
+        key = (id(callable_), tuple(sorted(env.items(), key=lambda item: item[0])))
+        if key not in self.bodies:
+            self.bodies[key] = self._value(
+                callable_.definition, env, True, False, calling
+            )[0]
+        return self.bodies[key]
@@ -0,0 +1,692 @@
+"""Module providing a bytecode compiler and virtual machine for mira.
+
+``compile_statement`` turns a top level statement into a ``Code`` object,
+a flat stream of one byte opcodes in ``Code.ops`` with one operand each in
+``Code.args``, which index the constant table or a slot. ``VM`` runs the
+instructions in a single dispatch loop over a value stack, with an
+explicit stack of frames so that calls do not recurse in Python.
+
+Names are resolved while compiling. Every variable or parameter name gets
+a slot, an index into the flat list of values in ``VM.variables``, and
+every callable name one in ``VM.callables``, so running code never looks
+up a name. A call binds its parameters by saving the values in their slots
+and storing the arguments there, and restores the saved values when it
+returns. As with the frames of the interpreter, a body so sees its own
+parameters, then those of its callers, then the globals. A slot that is
+empty when read raises the error the interpreter would.
+
+Numbers are unboxed while the vm runs: the stack and the variable slots
+hold Python ints for ``Int`` values and floats for ``Num`` values. Python
+already promotes an int to a float for ``+``, ``-`` and ``*`` with a
+float, as mira does, so only ``/`` and ``^`` between ints need converting
+back to an int. Values are boxed again where they leave the vm.
+
+The compiler works on the checked tree built by ``execute.Node.new_node``
+and reuses its checks, so both backends print the same output and raise
+the same errors. Errors the interpreter only raises when a node runs, such
+as a repeated argument, are compiled to a ``RAISE`` at the same point.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Iterator
+
+import callcache
+import execute
+import literals
+
+# Opcodes, roughly ordered by how often the dispatch loop sees them.
+LOAD_NAME = 0
+LOAD_CONST = 1
+ADD = 2
+SUB = 3
+MUL = 4
+DIV = 5
+EXP = 6
+LOAD_CALLABLE = 7
+CALL = 8
+RETURN = 9
+COERCE = 10
+STORE_NAME = 11
+STORE_SET = 12
+STORE_CALLABLE = 13
+DELETE_NAME = 14
+DELETE_CALLABLE = 15
+ECHO = 16
+BUILD_ARGS = 17
+RAISE = 18
+LOAD_TEMP = 19
+STORE_TEMP = 20
+
+OPNAMES = (
+    "LOAD_NAME",
+    "LOAD_CONST",
+    "ADD",
+    "SUB",
+    "MUL",
+    "DIV",
+    "EXP",
+    "LOAD_CALLABLE",
+    "CALL",
+    "RETURN",
+    "COERCE",
+    "STORE_NAME",
+    "STORE_SET",
+    "STORE_CALLABLE",
+    "DELETE_NAME",
+    "DELETE_CALLABLE",
+    "ECHO",
+    "BUILD_ARGS",
+    "RAISE",
+    "LOAD_TEMP",
+    "STORE_TEMP",
+)
+# Operands of DIV and EXP when the types of the values are known, see
+# execute.UncheckedNode, so the result type need not be worked out.
+UNKNOWN_TYPES = 0
+INT_RESULT = 1
+NUM_RESULT = 2
+BINARY_OPCODES = {
+    literals.OP_ADD: ADD,
+    literals.OP_SUB: SUB,
+    literals.OP_MUL: MUL,
+    literals.OP_DIV: DIV,
+    literals.OP_EXP: EXP,
+}
+NAME_OPS = (LOAD_NAME, STORE_NAME, STORE_SET, DELETE_NAME)
+CALLABLE_OPS = (LOAD_CALLABLE, STORE_CALLABLE, DELETE_CALLABLE)
+
+# Calls nested deeper than this fail, as in the tree walking interpreter.
+MAX_CALL_DEPTH = execute.MAX_CALL_DEPTH
+
+
+def undefined_variable(name: str, line: int, col: int) -> SyntaxError:
+    return SyntaxError(
+        f"Variable {name} at line {line}, col {col} is not yet defined.\n"
+    )
+
+
+def undefined_callable(name: str, line: int, col: int) -> SyntaxError:
+    return SyntaxError(
+        f"Invalid call at line {line}, col {col}."
+        + f"callable {name} has not yet been defined."
+    )
+
+
+def undefined_reset(name: str, line: int, col: int) -> SyntaxError:
+    return SyntaxError(
+        f"Invalid variable reset at line {line}, col {col}\n"
+        + "Can only reset variable reset it's been defined.\n"
+        + f"{name} has not yet been defined.\n"
+    )
+
+
+def box(value: Any) -> Any:
+    """Return an unboxed number as an ``Int`` or ``Num``."""
+    value_type = type(value)
+    if value_type is int:
+        return execute.Int(value)
+    if value_type is float:
+        return execute.Num(value)
+    return value
+
+
+class Slots(MutableMapping):
+    """Values of names, kept in a flat list at indices fixed when compiling.
+
+    An empty slot holds None. As a mapping, only the names with a value are
+    visible, so slots stand in for the dicts of globals and callables.
+    """
+
+    __slots__ = ("index", "names", "values")
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.names: list[str] = []
+        self.values: list[Any] = []
+
+    def slot(self, name: str) -> int:
+        """Return the slot of a name, adding an empty one if it has none."""
+        slot = self.index.get(name)
+        if slot is None:
+            slot = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.values.append(None)
+        return slot
+
+    def __getitem__(self, name: str) -> Any:
+        slot = self.index.get(name)
+        if slot is None or self.values[slot] is None:
+            raise KeyError(name)
+        return self.values[slot]
+
+    def __setitem__(self, name: str, value: Any):
+        self.values[self.slot(name)] = value
+
+    def __delitem__(self, name: str):
+        self[name]
+        self.values[self.index[name]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for name, value in zip(self.names, self.values):
+            if value is not None:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(value is not None for value in self.values)
+
+
+class Variables(Slots):
+    """Slots holding unboxed numbers, mapping names to ``Int`` and ``Num``."""
+
+    __slots__ = ()
+
+    def __getitem__(self, name: str) -> execute.Val:
+        return box(super().__getitem__(name))
+
+    def __setitem__(self, name: str, value: execute.Val):
+        super().__setitem__(name, value.value)
+
+
+class Code:
+    """A compiled instruction stream.
+
+    Instruction ``ii`` is ``ops[ii]`` with operand ``args[ii]`` and comes
+    from the source position ``lines[ii]``, ``cols[ii]``, which is only
+    read to report errors. ``names`` and ``callable_names`` are the names
+    of the variable and callable slots. The first ``temps`` entries of the
+    value stack hold the values of repeated subexpressions, see
+    ``execute.SubexprNode``.
+    """
+
+    __slots__ = (
+        "ops",
+        "args",
+        "lines",
+        "cols",
+        "consts",
+        "names",
+        "callable_names",
+        "temps",
+    )
+
+    def __init__(
+        self,
+        ops: array,
+        args: array,
+        lines: array,
+        cols: array,
+        consts: list[Any],
+        names: list[str],
+        callable_names: list[str],
+        temps: int = 0,
+    ):
+        self.ops = ops
+        self.args = args
+        self.lines = lines
+        self.cols = cols
+        self.consts = consts
+        self.names = names
+        self.callable_names = callable_names
+        self.temps = temps
+
+    def disassemble(self) -> list[str]:
+        """Return a readable listing of the instructions."""
+        listing = []
+        for ii, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if op in NAME_OPS:
+                operand = self.names[arg]
+            elif op in CALLABLE_OPS:
+                operand = self.callable_names[arg]
+            elif op in (LOAD_CONST, COERCE, CALL, BUILD_ARGS, RAISE):
+                operand = repr(self.consts[arg])
+            elif op in (LOAD_TEMP, STORE_TEMP):
+                operand = str(arg)
+            elif op in (DIV, EXP) and arg:
+                operand = "int" if arg == INT_RESULT else "num"
+            else:
+                operand = ""
+            listing.append(f"{ii:4} {OPNAMES[op]:<16}{operand}".rstrip())
+        return listing
+
+
+class Function:
+    """A callable whose body has been compiled to bytecode."""
+
+    __slots__ = ("name", "type", "code", "params", "convert", "cache", "definition")
+
+    def __init__(
+        self,
+        name: str,
+        callable_type: execute.CallableType,
+        code: Code,
+        definition: Any = None,
+    ):
+        self.name = name
+        self.type = callable_type
+        self.code = code
+        # The body the code was compiled from, as an interpreted callable has.
+        self.definition = definition
+        self.params = frozenset(callable_type.params)
+        # Converts an unboxed result like the return type would.
+        self.convert = int if callable_type.return_type is execute.Int else float
+        # Set by the Executor for functions whose results are cached.
+        self.cache: callcache.CallCache | None = None
+
+    def reads(self) -> tuple[set[str], set[str]]:
+        """Return the variables and callables the body uses directly."""
+        code = self.code
+        names: set[str] = set()
+        callables: set[str] = set()
+        for op, arg in zip(code.ops, code.args):
+            if op == LOAD_NAME:
+                names.add(code.names[arg])
+            elif op == LOAD_CALLABLE:
+                callables.add(code.callable_names[arg])
+            elif op == RAISE:
+                raise SyntaxError(code.consts[arg])
+        return names, callables
+
+
+class Compiler:
+    def __init__(self, variables: Variables, callables: Slots):
+        self.variables = variables
+        self.callables = callables
+        self.ops = array("B")
+        self.args = array("l")
+        self.lines = array("l")
+        self.cols = array("l")
+        self.consts: list[Any] = []
+        # The temporary of each repeated subexpression, by id of its node.
+        self.temps: dict[int, int] = {}
+
+    def code(self) -> Code:
+        return Code(
+            self.ops,
+            self.args,
+            self.lines,
+            self.cols,
+            self.consts,
+            self.variables.names,
+            self.callables.names,
+            len(self.temps),
+        )
+
+    def emit(self, op: int, arg: int = 0, line: int = 0, col: int = 0):
+        self.ops.append(op)
+        self.args.append(arg)
+        self.lines.append(line)
+        self.cols.append(col)
+
+    def const(self, value: Any) -> int:
+        self.consts.append(value)
+        return len(self.consts) - 1
+
+    def raise_(self, error: SyntaxError):
+        self.emit(RAISE, self.const(error.msg))
+
+    def value(self, node: Any):
+        """Compile a node that evaluates to a value."""
+        if isinstance(node, execute.ExprNode):
+            self.value(node.first)
+            for op, operand in node.rest:
+                self.value(operand)
+                self.emit(ADD if op == literals.OP_ADD else SUB)
+        elif isinstance(node, execute.TermNode):
+            self.value(node.first)
+            for op, operand in node.rest:
+                self.value(operand)
+                opcode = MUL if op == literals.OP_MUL else DIV
+                self.emit(opcode, UNKNOWN_TYPES, node.line, node.col)
+        elif isinstance(node, execute.FactorNode):
+            self.value(node.base)
+            for exponent in node.exponents:
+                self.value(exponent)
+                self.emit(EXP, UNKNOWN_TYPES, node.line, node.col)
+        elif isinstance(node, execute.AtomNode):
+            self.value(node.value)
+        elif isinstance(node, execute.IdentNode):
+            slot = self.variables.slot(node.value)
+            self.emit(LOAD_NAME, slot, node.line, node.col)
+        elif isinstance(node, execute.IntNode):
+            self.emit(LOAD_CONST, self.const(node.value))
+        elif isinstance(node, execute.NumNode):
+            self.emit(LOAD_CONST, self.const(node.value))
+        elif isinstance(node, execute.CallNode):
+            self.call(node)
+        elif isinstance(node, execute.UncheckedNode):
+            self.value(node.first)
+            for (op, result_type), (_, operand) in zip(node.ops, node.rest):
+                self.value(operand)
+                known = INT_RESULT if result_type is execute.Int else NUM_RESULT
+                self.emit(BINARY_OPCODES[op], known, node.line, node.col)
+        elif isinstance(node, execute.SubexprNode):
+            self.value(node.value)
+            temp = self.temps[id(node)] = len(self.temps)
+            self.emit(STORE_TEMP, temp)
+        elif isinstance(node, execute.SubexprRefNode):
+            self.emit(LOAD_TEMP, self.temps[id(node.source)])
+        else:
+            raise ValueError(f"Cannot compile node: {type(node).__name__}\n")
+
+    def call(self, node: execute.CallNode):
+        try:
+            callable_name = node.callable_name()
+        except SyntaxError as e:
+            self.raise_(e)
+            return
+
+        slot = self.callables.slot(callable_name)
+        self.emit(LOAD_CALLABLE, slot, node.line, node.col)
+
+        arg_names = self.args_(node.children[2])
+        if arg_names is not None:
+            slots = tuple(self.variables.slot(name) for name in arg_names)
+            self.emit(
+                CALL,
+                self.const((arg_names, frozenset(arg_names), slots)),
+                node.line,
+                node.col,
+            )
+
+    def args_(self, arglist: execute.ArgListNode) -> tuple[str, ...] | None:
+        """Compile the arguments in order and return their names.
+
+        Returns None if the list is invalid, after compiling a ``RAISE``
+        where the interpreter would report it.
+        """
+        arg_names: list[str] = []
+        items = arglist.items()
+        while True:
+            try:
+                item = next(items, None)
+            except SyntaxError as e:
+                self.raise_(e)
+                return None
+            if item is None:
+                break
+            arg_name, arg_expr = item
+            self.value(arg_expr)
+            arg_names.append(arg_name)
+        return tuple(arg_names)
+
+    def statement(self, node: execute.Node):
+        """Compile a top level statement, leaving its result on the stack."""
+        if isinstance(node, execute.VarDefNode):
+            var_name, var_type = node.target()
+            self.value(node.children[-1])
+            if var_type is not None and node.converts:
+                self.emit(COERCE, self.const(var_type), node.line, node.col)
+            self.emit(STORE_NAME, self.variables.slot(var_name))
+            self.emit(DELETE_CALLABLE, self.callables.slot(var_name))
+        elif isinstance(node, execute.VarSetNode):
+            var_name = node.target()
+            slot = self.variables.slot(var_name)
+            if self.variables.values[slot] is None:
+                raise undefined_reset(var_name, node.line, node.col)
+            self.value(node.children[2])
+            if node.converts:
+                self.emit(STORE_SET, slot, node.line, node.col)
+            else:
+                # The variable is defined, as checked above.
+                self.emit(STORE_NAME, slot)
+        elif isinstance(node, execute.EchoNode):
+            self.value(node.expression())
+            self.emit(ECHO)
+        elif isinstance(node, execute.CallableDefNode):
+            callable_name: str = node.children[0].value
+            callable_type: execute.CallableType = node.children[2].exec()
+            body = Compiler(self.variables, self.callables)
+            body.value(node.children[4])
+            body.emit(RETURN)
+            function = Function(
+                callable_name, callable_type, body.code(), node.children[4]
+            )
+            self.emit(LOAD_CONST, self.const(function))
+            self.emit(STORE_CALLABLE, self.callables.slot(callable_name))
+            self.emit(DELETE_NAME, self.variables.slot(callable_name))
+        elif isinstance(node, (execute.ParamListNode, execute.CallableNode)):
+            # Both only describe types, which are known before running.
+            self.emit(LOAD_CONST, self.const(node.exec()))
+        elif isinstance(node, execute.ArgListNode):
+            arg_names = self.args_(node)
+            if arg_names is not None:
+                self.emit(BUILD_ARGS, self.const(arg_names))
+        else:
+            self.value(node)
+
+
+def compile_statement(
+    node: execute.Node, variables: Variables, callables: Slots
+) -> Code:
+    """Compile a top level statement built by ``execute.Node.new_node``.
+
+    Raises SyntaxError if it resets a variable that is not defined in
+    ``variables``, as running it would before evaluating anything.
+    """
+    compiler = Compiler(variables, callables)
+    compiler.statement(node)
+    compiler.emit(RETURN)
+    return compiler.code()
+
+
+class VM:
+    def __init__(self):
+        self.variables = Variables()
+        self.callables = Slots()
+        # The limits of the code running, if any, see execute.Budget.
+        self.budget: execute.Budget | None = None
+
+    def compile(self, node: execute.Node) -> Code:
+        return compile_statement(node, self.variables, self.callables)
+
+    def exec(self, node: execute.Node) -> Any:
+        """Compile and run a top level statement, returning its result."""
+        code = self.compile(node)
+        if self.budget is not None:
+            # As for a call, instructions are spent when their code starts.
+            self.budget.spend(len(code.ops), node.line, node.col)
+        return self.run(code)
+
+    def call(self, function: Function, params: dict[str, execute.Val]) -> Any:
+        """Call a function as top level code would, returning its result."""
+        compiler = Compiler(self.variables, self.callables)
+        compiler.emit(LOAD_CONST, compiler.const(function))
+        for value in params.values():
+            compiler.emit(LOAD_CONST, compiler.const(value.value))
+        arg_names = tuple(params)
+        slots = tuple(self.variables.slot(name) for name in arg_names)
+        compiler.emit(CALL, compiler.const((arg_names, frozenset(arg_names), slots)))
+        compiler.emit(RETURN)
+        return self.run(compiler.code())
+
+    def run(self, code: Code) -> Any:
+        """Run a top level instruction stream and return its result."""
+        values = self.variables.values
+        functions = self.callables.values
+        # Caller states saved while a call runs, with the slots bound by the
+        # call, the values they held before and the key to cache the result
+        # under, if any.
+        frames: list[tuple[Code, int, list[Any], Any, tuple, list[Any], Any]] = []
+        function: Function | None = None
+        ops, args, consts = code.ops, code.args, code.consts
+        stack: list[Any] = [None] * code.temps
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        budget = self.budget
+
+        try:
+            while True:
+                op = ops[pc]
+                arg = args[pc]
+                pc += 1
+
+                if op == LOAD_NAME:
+                    value = values[arg]
+                    if value is None:
+                        raise undefined_variable(
+                            code.names[arg], code.lines[pc - 1], code.cols[pc - 1]
+                        )
+                    push(value)
+                elif op == LOAD_CONST:
+                    push(consts[arg])
+                elif op == ADD:
+                    value = pop()
+                    stack[-1] += value
+                elif op == SUB:
+                    value = pop()
+                    stack[-1] -= value
+                elif op == MUL:
+                    value = pop()
+                    if budget is not None:
+                        budget.check_int(
+                            execute.mul_bits(stack[-1], value),
+                            code.lines[pc - 1],
+                            code.cols[pc - 1],
+                        )
+                    stack[-1] *= value
+                elif op == DIV:
+                    value = pop()
+                    left = stack[-1]
+                    if arg:
+                        if arg == NUM_RESULT:
+                            stack[-1] = left / value
+                        else:
+                            stack[-1] = int(left / value)
+                    elif type(left) is int and type(value) is int:
+                        stack[-1] = int(left / value)
+                    else:
+                        stack[-1] = left / value
+                elif op == EXP:
+                    value = pop()
+                    left = stack[-1]
+                    if budget is not None:
+                        budget.check_int(
+                            execute.exp_bits(left, value),
+                            code.lines[pc - 1],
+                            code.cols[pc - 1],
+                        )
+                    result = left**value
+                    if type(result) is not int:
+                        if arg:
+                            result = int(result) if arg == INT_RESULT else float(result)
+                        elif type(left) is int and type(value) is int:
+                            result = int(result)
+                        else:
+                            # Raises for a complex result, as Num does.
+                            result = float(result)
+                    stack[-1] = result
+                elif op == LOAD_CALLABLE:
+                    value = functions[arg]
+                    if value is None:
+                        raise undefined_callable(
+                            code.callable_names[arg],
+                            code.lines[pc - 1],
+                            code.cols[pc - 1],
+                        )
+                    push(value)
+                elif op == CALL:
+                    arg_names, arg_set, slots = consts[arg]
+                    count = len(slots)
+                    callee: Function = stack[-count - 1]
+                    if callee.params != arg_set:
+                        execute.check_params(
+                            callee.name, callee.type, dict.fromkeys(arg_names)
+                        )
+                    if len(frames) >= MAX_CALL_DEPTH:
+                        raise SyntaxError(
+                            "Maximum recursion depth reached during call.\n"
+                            + f"In call '{callee.name}' at line "
+                            + f"{code.lines[pc - 1]}, col {code.cols[pc - 1]}."
+                        )
+
+                    saved = [values[slot] for slot in slots]
+                    for slot, value in zip(slots, stack[-count:]):
+                        values[slot] = value
+                    del stack[-count - 1 :]
+
+                    key = None
+                    cache = callee.cache
+                    if cache is not None and cache.reads is not None:
+                        key = callcache.key([values[slot] for slot in cache.reads])
+                        value = cache.get(key)
+                        if value is not None:
+                            for slot, saved_value in zip(slots, saved):
+                                values[slot] = saved_value
+                            push(value)
+                            continue
+
+                    frames.append((code, pc, stack, function, slots, saved, key))
+                    if budget is not None:
+                        budget.spend(
+                            len(callee.code.ops), code.lines[pc - 1], code.cols[pc - 1]
+                        )
+                    function = callee
+                    code = callee.code
+                    ops, args, consts = code.ops, code.args, code.consts
+                    stack = [None] * code.temps
+                    push = stack.append
+                    pop = stack.pop
+                    pc = 0
+                elif op == RETURN:
+                    value = pop()
+                    if function is None:
+                        return box(value)
+
+                    value = function.convert(value)
+                    cache = function.cache
+                    code, pc, stack, function, slots, saved, key = frames.pop()
+                    if key is not None:
+                        cache.store(key, value)
+                    for slot, saved_value in zip(slots, saved):
+                        values[slot] = saved_value
+                    ops, args, consts = code.ops, code.args, code.consts
+                    push = stack.append
+                    pop = stack.pop
+                    push(value)
+                elif op == LOAD_TEMP:
+                    push(stack[arg])
+                elif op == STORE_TEMP:
+                    stack[arg] = stack[-1]
+                elif op == COERCE:
+                    stack[-1] = execute.coerce(
+                        consts[arg], stack[-1], code.lines[pc - 1], code.cols[pc - 1]
+                    ).value
+                elif op == STORE_NAME:
+                    values[arg] = stack[-1]
+                elif op == STORE_SET:
+                    if values[arg] is None:
+                        raise undefined_reset(
+                            code.names[arg], code.lines[pc - 1], code.cols[pc - 1]
+                        )
+                    value = type(values[arg])(stack[-1])
+                    values[arg] = value
+                    stack[-1] = value
+                elif op == STORE_CALLABLE:
+                    functions[arg] = stack[-1]
+                elif op == DELETE_NAME:
+                    values[arg] = None
+                elif op == DELETE_CALLABLE:
+                    functions[arg] = None
+                elif op == ECHO:
+                    print(stack[-1], flush=True)
+                elif op == BUILD_ARGS:
+                    arg_names = consts[arg]
+                    count = len(arg_names)
+                    if count:
+                        params = dict(zip(arg_names, map(box, stack[-count:])))
+                        del stack[-count:]
+                    else:
+                        params = {}
+                    push(params)
+                elif op == RAISE:
+                    raise SyntaxError(consts[arg])
+                else:
+                    raise ValueError(f"Unknown opcode: {op}\n")
+        finally:
+            # Unbind the parameters of calls left by an error.
+            while frames:
+                _, _, _, _, slots, saved, _ = frames.pop()
+                for slot, saved_value in zip(slots, saved):
+                    values[slot] = saved_value